@@ -1,46 +1,59 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
+from logging_setup import configure_logging
 from models import db
 from auth import auth_bp
 from bills import bills_bp
+from payments import payments_bp
 from reminders import reminders_bp
 from receipts import receipts_bp
 from scheduler import start_scheduler
+from db_migrations import run_migrations
 from local_storage_service import init_storage
+from http_transport import transport_stats
+from delivery_service import get_delivery_pool
+from change_capture import init_change_capture, change_capture_stats
+from password_hashing import get_password_hasher
+from identity import identity_cache_stats
+from auth_tokens import register_token_callbacks, denylist_stats
+from rate_limit import rate_limit_stats
 import os
 import logging
 from datetime import datetime
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging (level, format and handlers come from Config)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 def create_app():
     logger.info("=" * 80)
     logger.info("[APP INIT] Starting Flask application creation")
-    logger.info(f"[APP INIT] Current time: {datetime.now()}")
+    logger.info("[APP INIT] Current time: %s", datetime.now())
     logger.info("=" * 80)
     
     # This is the corrected version without the duplicated line.
     app = Flask(__name__)
-    logger.info(f"[APP INIT] Flask app created: {app.name}")
+    logger.info("[APP INIT] Flask app created: %s", app.name)
     
     logger.info("[APP CONFIG] Loading configuration from Config object")
     app.config.from_object(Config)
     
     # Log key configuration values (be careful not to log sensitive data)
-    logger.debug(f"[APP CONFIG] Debug mode: {app.config.get('DEBUG')}")
-    logger.debug(f"[APP CONFIG] Database URI: {app.config.get('SQLALCHEMY_DATABASE_URI', 'NOT SET')}")
-    logger.debug(f"[APP CONFIG] JWT Algorithm: {app.config.get('JWT_ALGORITHM', 'NOT SET')}")
+    logger.debug("[APP CONFIG] Debug mode: %s", app.config.get('DEBUG'))
+    logger.debug("[APP CONFIG] Database URI: %s", app.config.get('SQLALCHEMY_DATABASE_URI', 'NOT SET'))
+    logger.debug("[APP CONFIG] JWT Algorithm: %s", app.config.get('JWT_ALGORITHM', 'NOT SET'))
+    
+    # Behind a reverse proxy, take the client IP (used by rate limiting) from X-Forwarded-For
+    if Config.PROXY_FIX_X_FOR:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.PROXY_FIX_X_FOR)
+        logger.info("[APP CONFIG] Trusting X-Forwarded-For from %s proxies", Config.PROXY_FIX_X_FOR)
     
     # Set max file size for uploads
     app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH
-    logger.info(f"[APP CONFIG] Max content length set to: {Config.MAX_CONTENT_LENGTH} bytes ({Config.MAX_CONTENT_LENGTH / 1024 / 1024}MB)")
+    logger.info("[APP CONFIG] Max content length set to: %s bytes (%sMB)", Config.MAX_CONTENT_LENGTH, Config.MAX_CONTENT_LENGTH / 1024 / 1024)
     
     # Initialize extensions
     logger.info("[APP INIT] Initializing extensions")
@@ -48,11 +61,15 @@ def create_app():
     logger.debug("[APP INIT] Initializing database")
     db.init_app(app)
     
+    logger.debug("[APP INIT] Initializing change capture (mode: %s)", Config.CHANGE_CAPTURE)
+    init_change_capture()
+    
     logger.debug("[APP INIT] Initializing CORS")
     CORS(app)
     
     logger.debug("[APP INIT] Initializing JWT Manager")
-    JWTManager(app)
+    jwt = JWTManager(app)
+    register_token_callbacks(jwt)
     
     # Initialize local storage
     logger.info("[APP INIT] Initializing local storage")
@@ -64,13 +81,14 @@ def create_app():
     blueprints = [
         (auth_bp, '/api/auth', 'auth'),
         (bills_bp, '/api/bills', 'bills'),
+        (payments_bp, '/api/payments', 'payments'),
         (reminders_bp, '/api/reminders', 'reminders'),
         (receipts_bp, '/api/receipts', 'receipts')
     ]
     
     for blueprint, prefix, name in blueprints:
         app.register_blueprint(blueprint, url_prefix=prefix)
-        logger.debug(f"[APP INIT] Registered blueprint '{name}' with prefix '{prefix}'")
+        logger.debug("[APP INIT] Registered blueprint '%s' with prefix '%s'", name, prefix)
     
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
@@ -78,31 +96,44 @@ def create_app():
         logger.debug("[HEALTH CHECK] Health check endpoint called")
         return jsonify({'status': 'healthy', 'message': 'Bills Reminder API is running'}), 200
     
+    @app.route('/api/health/transport', methods=['GET'])
+    def transport_health():
+        logger.debug("[HEALTH CHECK] Transport stats endpoint called")
+        return jsonify({
+            'http': transport_stats(),
+            'delivery': get_delivery_pool().stats(),
+            'change_capture': change_capture_stats(),
+            'password_hashing': get_password_hasher().stats(),
+            'identity_cache': identity_cache_stats(),
+            'token_denylist': denylist_stats(),
+            'rate_limit': rate_limit_stats()
+        }), 200
+    
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
-        logger.warning(f"[ERROR 404] Not found: {request.url}")
-        logger.debug(f"[ERROR 404] Method: {request.method}, Path: {request.path}")
+        logger.warning("[ERROR 404] Not found: %s", request.url)
+        logger.debug("[ERROR 404] Method: %s, Path: %s", request.method, request.path)
         return jsonify({'message': 'Resource not found'}), 404
     
     @app.errorhandler(500)
     def internal_error(error):
-        logger.error(f"[ERROR 500] Internal server error: {str(error)}")
-        logger.error(f"[ERROR 500] Request URL: {request.url}")
-        logger.error(f"[ERROR 500] Request method: {request.method}")
+        logger.error("[ERROR 500] Internal server error: %s", str(error))
+        logger.error("[ERROR 500] Request URL: %s", request.url)
+        logger.error("[ERROR 500] Request method: %s", request.method)
         return jsonify({'message': 'Internal server error'}), 500
     
     @app.errorhandler(413)
     def file_too_large(error):
-        logger.warning(f"[ERROR 413] File too large from {request.remote_addr}")
-        logger.debug(f"[ERROR 413] Content length: {request.content_length if request.content_length else 'Unknown'}")
+        logger.warning("[ERROR 413] File too large from %s", request.remote_addr)
+        logger.debug("[ERROR 413] Content length: %s", request.content_length if request.content_length else 'Unknown')
         return jsonify({'message': 'File too large. Maximum size is 16MB'}), 413
     
     # Log all registered routes
     logger.info("[APP INIT] All registered routes:")
     for rule in app.url_map.iter_rules():
         methods = ', '.join(rule.methods - {'HEAD', 'OPTIONS'})
-        logger.debug(f"[APP INIT] Route: {rule.rule} [{methods}] -> {rule.endpoint}")
+        logger.debug("[APP INIT] Route: %s [%s] -> %s", rule.rule, methods, rule.endpoint)
     
     logger.info("[APP INIT] Flask application creation completed successfully")
     return app
@@ -121,11 +152,14 @@ if __name__ == '__main__':
             db.create_all()
             logger.info("[MAIN] Database tables created successfully")
             
+            # Apply schema additions (e.g. new indexes) to tables that already existed
+            run_migrations()
+            
             # Log table information
             tables = db.metadata.tables.keys()
-            logger.debug(f"[MAIN] Created tables: {', '.join(tables)}")
+            logger.debug("[MAIN] Created tables: %s", ', '.join(tables))
         except Exception as e:
-            logger.error(f"[MAIN ERROR] Failed to create database tables: {str(e)}", exc_info=True)
+            logger.error("[MAIN ERROR] Failed to create database tables: %s", str(e), exc_info=True)
             raise
     
     # This is the final fix: Start the scheduler, then run the app with
@@ -135,11 +169,11 @@ if __name__ == '__main__':
         start_scheduler(app)
         logger.info("[MAIN] Scheduler started successfully")
     except Exception as e:
-        logger.error(f"[MAIN ERROR] Failed to start scheduler: {str(e)}", exc_info=True)
+        logger.error("[MAIN ERROR] Failed to start scheduler: %s", str(e), exc_info=True)
         raise
     
     logger.info("[MAIN] Starting Flask development server")
-    logger.info(f"[MAIN] Server configuration - Debug: True, Port: 5000, Reloader: False")
+    logger.info("[MAIN] Server configuration - Debug: True, Port: 5000, Reloader: False")
     logger.info("[MAIN] Application ready to receive requests")
     logger.info("=" * 80)
     
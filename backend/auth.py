@@ -1,42 +1,51 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from models import db, User, ReminderSettings
-import bcrypt
+from password_hashing import get_password_hasher, HasherBusy
+from identity import get_identity, remember_identity, forget_identity
+from auth_tokens import issue_tokens, revoke_token, revoke_family
+from rate_limit import rate_limit
+from config import Config
 from datetime import datetime
 import re
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 auth_bp = Blueprint('auth', __name__)
 
+def hasher_busy_response():
+    """503 for when every password hashing slot is taken"""
+    response = jsonify({'message': 'Server is busy, please try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 def validate_email(email):
     """Validate email format"""
-    logger.debug(f"[VALIDATE EMAIL] Checking email format: {email}")
+    logger.debug("[VALIDATE EMAIL] Checking email format: %s", email)
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     is_valid = re.match(pattern, email) is not None
-    logger.debug(f"[VALIDATE EMAIL] Email valid: {is_valid}")
+    logger.debug("[VALIDATE EMAIL] Email valid: %s", is_valid)
     return is_valid
 
 def validate_phone(phone):
     """Validate phone number format"""
-    logger.debug(f"[VALIDATE PHONE] Checking phone format: {phone}")
+    logger.debug("[VALIDATE PHONE] Checking phone format: %s", phone)
     # Remove all non-digit characters for validation
     digits_only = re.sub(r'\D', '', phone)
-    logger.debug(f"[VALIDATE PHONE] Digits only: {digits_only}, Length: {len(digits_only)}")
+    logger.debug("[VALIDATE PHONE] Digits only: %s, Length: %s", digits_only, len(digits_only))
     # Check if it has at least 10 digits
     is_valid = len(digits_only) >= 10
-    logger.debug(f"[VALIDATE PHONE] Phone valid: {is_valid}")
+    logger.debug("[VALIDATE PHONE] Phone valid: %s", is_valid)
     return is_valid
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limit('register', per_ip=Config.REGISTER_RATE_LIMIT_IP)
 def register():
     logger.info("[REGISTER] New registration request received")
     try:
         data = request.get_json()
-        logger.debug(f"[REGISTER] Request data keys: {list(data.keys()) if data else 'No data'}")
+        logger.debug("[REGISTER] Request data keys: %s", list(data.keys()) if data else 'No data')
         
         if not data:
             logger.warning("[REGISTER] No data provided in request")
@@ -45,64 +54,68 @@ def register():
         required = ['email', 'password', 'name', 'phone_number']
         missing_fields = [field for field in required if field not in data or not data[field]]
         if missing_fields:
-            logger.warning(f"[REGISTER] Missing required fields: {missing_fields}")
+            logger.warning("[REGISTER] Missing required fields: %s", missing_fields)
             return jsonify({'message': f'Missing required fields: {", ".join(missing_fields)}'}), 400
         
-        logger.debug(f"[REGISTER] Registration attempt for email: {data['email']}")
+        logger.debug("[REGISTER] Registration attempt for email: %s", data['email'])
         
         if not validate_email(data['email']):
-            logger.warning(f"[REGISTER] Invalid email format: {data['email']}")
+            logger.warning("[REGISTER] Invalid email format: %s", data['email'])
             return jsonify({'message': 'Invalid email format'}), 400
         
         password_length = len(data['password'])
-        logger.debug(f"[REGISTER] Password length: {password_length}")
+        logger.debug("[REGISTER] Password length: %s", password_length)
         if password_length < 6:
-            logger.warning(f"[REGISTER] Password too short: {password_length} characters")
+            logger.warning("[REGISTER] Password too short: %s characters", password_length)
             return jsonify({'message': 'Password must be at least 6 characters long'}), 400
         
         if not validate_phone(data['phone_number']):
-            logger.warning(f"[REGISTER] Invalid phone number: {data['phone_number']}")
+            logger.warning("[REGISTER] Invalid phone number: %s", data['phone_number'])
             return jsonify({'message': 'Invalid phone number format'}), 400
         
         email_lower = data['email'].lower()
-        logger.debug(f"[REGISTER] Checking if user exists with email: {email_lower}")
+        logger.debug("[REGISTER] Checking if user exists with email: %s", email_lower)
         existing_user = User.query.filter_by(email=email_lower).first()
         if existing_user:
-            logger.warning(f"[REGISTER] Email already registered: {email_lower}")
+            logger.warning("[REGISTER] Email already registered: %s", email_lower)
             return jsonify({'message': 'Email already registered'}), 409
         
-        logger.info(f"[REGISTER] Creating new user for email: {email_lower}")
+        logger.info("[REGISTER] Creating new user for email: %s", email_lower)
         
         logger.debug("[REGISTER] Hashing password")
-        password_hash = bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt())
+        try:
+            password_hash = get_password_hasher().hash_password(data['password'])
+        except HasherBusy:
+            return hasher_busy_response()
         
         user = User(
             email=email_lower,
-            password_hash=password_hash.decode('utf-8'),
+            password_hash=password_hash,
             name=data['name'].strip(),
             phone_number=data['phone_number'].strip()
         )
         
-        logger.debug(f"[REGISTER] User object created - Name: {user.name}, Phone: {user.phone_number}")
+        logger.debug("[REGISTER] User object created - Name: %s, Phone: %s", user.name, user.phone_number)
         
         db.session.add(user)
         db.session.flush()
-        logger.debug(f"[REGISTER] User added to session with ID: {user.id}")
+        logger.debug("[REGISTER] User added to session with ID: %s", user.id)
         
-        logger.debug(f"[REGISTER] Creating default reminder settings for user: {user.id}")
+        logger.debug("[REGISTER] Creating default reminder settings for user: %s", user.id)
         reminder_settings = ReminderSettings(user_id=user.id)
         db.session.add(reminder_settings)
         
-        logger.info(f"[REGISTER] Committing user and settings to database")
+        logger.info("[REGISTER] Committing user and settings to database")
         db.session.commit()
-        logger.info(f"[REGISTER] User successfully registered with ID: {user.id}")
+        logger.info("[REGISTER] User successfully registered with ID: %s", user.id)
+        remember_identity(user)
         
-        logger.debug(f"[REGISTER] Creating JWT token for user: {user.id}")
-        token = create_access_token(identity=user.id)
+        logger.debug("[REGISTER] Creating JWT tokens for user: %s", user.id)
+        tokens = issue_tokens(user.id)
         
-        logger.info(f"[REGISTER] Registration successful for user: {user.email}")
+        logger.info("[REGISTER] Registration successful for user: %s", user.email)
         return jsonify({
-            'token': token,
+            **tokens,
             'user': {
                 'id': user.id,
                 'email': user.email,
@@ -112,51 +125,60 @@ def register():
         }), 201
         
     except Exception as e:
-        logger.error(f"[REGISTER ERROR] Registration failed: {str(e)}", exc_info=True)
+        logger.error("[REGISTER ERROR] Registration failed: %s", str(e), exc_info=True)
         db.session.rollback()
-        print(f"Registration error: {str(e)}")
         return jsonify({'message': 'An error occurred during registration'}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit('login', per_ip=Config.LOGIN_RATE_LIMIT_IP, per_email=Config.LOGIN_RATE_LIMIT_EMAIL)
 def login():
     logger.info("[LOGIN] Login request received")
     try:
         data = request.get_json()
-        logger.debug(f"[LOGIN] Request data keys: {list(data.keys()) if data else 'No data'}")
+        logger.debug("[LOGIN] Request data keys: %s", list(data.keys()) if data else 'No data')
         
         if not data or not data.get('email') or not data.get('password'):
             logger.warning("[LOGIN] Missing email or password")
             return jsonify({'message': 'Email and password required'}), 400
         
         email_lower = data['email'].lower()
-        logger.debug(f"[LOGIN] Login attempt for email: {email_lower}")
+        logger.debug("[LOGIN] Login attempt for email: %s", email_lower)
         
         user = User.query.filter_by(email=email_lower).first()
         
         if not user:
-            logger.warning(f"[LOGIN] User not found: {email_lower}")
+            logger.warning("[LOGIN] User not found: %s", email_lower)
             return jsonify({'message': 'Invalid credentials'}), 401
         
-        logger.debug(f"[LOGIN] User found with ID: {user.id}")
+        logger.debug("[LOGIN] User found with ID: %s", user.id)
         
-        # --- NEW DEBUG LOGGING ---
-        logger.debug(f"--- PASSWORD CHECK ---")
-        logger.debug(f"Password from App: '{data['password']}'")
-        logger.debug(f"Hash from DB:      '{user.password_hash}'")
-        logger.debug(f"----------------------")
-        # --- END NEW DEBUG LOGGING ---
-
-        password_valid = bcrypt.checkpw(data['password'].encode('utf-8'), user.password_hash.encode('utf-8'))
+        try:
+            password_valid, new_hash = get_password_hasher().verify_password(data['password'], user.password_hash)
+        except HasherBusy:
+            return hasher_busy_response()
         
         if not password_valid:
-            logger.warning(f"[LOGIN] Password check FAILED for user: {email_lower}")
+            logger.warning("[LOGIN] Password check FAILED for user: %s", email_lower)
             return jsonify({'message': 'Invalid credentials'}), 401
         
-        logger.info(f"[LOGIN] Password check PASSED for user: {email_lower}")
-        token = create_access_token(identity=user.id)
+        logger.info("[LOGIN] Password check PASSED for user: %s", email_lower)
+        
+        if new_hash:
+            # Stored hash was made with a different cost; upgrade it while we have the password
+            user.password_hash = new_hash
+            try:
+                db.session.commit()
+                logger.info("[LOGIN] Rehashed password for user %s at cost %s", user.id, Config.BCRYPT_ROUNDS)
+            except Exception as e:
+                logger.error("[LOGIN ERROR] Failed to store rehashed password: %s", str(e), exc_info=True)
+                db.session.rollback()
+        
+        # The client asks for its profile right after logging in
+        remember_identity(user)
+        tokens = issue_tokens(user.id)
         
         return jsonify({
-            'token': token,
+            **tokens,
             'user': {
                 'id': user.id,
                 'email': user.email,
@@ -166,8 +188,7 @@ def login():
         }), 200
         
     except Exception as e:
-        logger.error(f"[LOGIN ERROR] Login failed: {str(e)}", exc_info=True)
-        print(f"Login error: {str(e)}")
+        logger.error("[LOGIN ERROR] Login failed: %s", str(e), exc_info=True)
         return jsonify({'message': 'An error occurred during login'}), 500
 
 # ... (the rest of your auth.py file remains the same) ...
@@ -178,26 +199,19 @@ def get_profile():
     logger.info("[GET PROFILE] Profile request received")
     try:
         user_id = get_jwt_identity()
-        logger.debug(f"[GET PROFILE] JWT identity: {user_id}")
+        logger.debug("[GET PROFILE] JWT identity: %s", user_id)
         
-        user = User.query.get(user_id)
+        identity = get_identity(user_id)
         
-        if not user:
-            logger.warning(f"[GET PROFILE] User not found: {user_id}")
+        if not identity:
+            logger.warning("[GET PROFILE] User not found: %s", user_id)
             return jsonify({'message': 'User not found'}), 404
         
-        logger.info(f"[GET PROFILE] Profile retrieved for user: {user.email}")
-        return jsonify({
-            'id': user.id,
-            'email': user.email,
-            'name': user.name,
-            'phone_number': user.phone_number,
-            'created_at': user.created_at.isoformat() if user.created_at else None
-        }), 200
+        logger.info("[GET PROFILE] Profile retrieved for user: %s", identity['email'])
+        return jsonify(identity), 200
         
     except Exception as e:
-        logger.error(f"[GET PROFILE ERROR] Failed to get profile: {str(e)}", exc_info=True)
-        print(f"Get profile error: {str(e)}")
+        logger.error("[GET PROFILE ERROR] Failed to get profile: %s", str(e), exc_info=True)
         return jsonify({'message': 'An error occurred while fetching profile'}), 500
 
 @auth_bp.route('/profile', methods=['PUT'])
@@ -206,12 +220,12 @@ def update_profile():
     logger.info("[UPDATE PROFILE] Profile update request received")
     try:
         user_id = get_jwt_identity()
-        logger.debug(f"[UPDATE PROFILE] JWT identity: {user_id}")
+        logger.debug("[UPDATE PROFILE] JWT identity: %s", user_id)
         
         user = User.query.get(user_id)
         
         if not user:
-            logger.warning(f"[UPDATE PROFILE] User not found: {user_id}")
+            logger.warning("[UPDATE PROFILE] User not found: %s", user_id)
             return jsonify({'message': 'User not found'}), 404
         
         data = request.get_json()
@@ -219,30 +233,31 @@ def update_profile():
             logger.warning("[UPDATE PROFILE] No data provided")
             return jsonify({'message': 'No data provided'}), 400
         
-        logger.debug(f"[UPDATE PROFILE] Update data keys: {list(data.keys())}")
+        logger.debug("[UPDATE PROFILE] Update data keys: %s", list(data.keys()))
         updates = []
         
         if 'name' in data and data['name']:
             old_name = user.name
             user.name = data['name'].strip()
             updates.append(f"name: '{old_name}' -> '{user.name}'")
-            logger.debug(f"[UPDATE PROFILE] Name updated: {old_name} -> {user.name}")
+            logger.debug("[UPDATE PROFILE] Name updated: %s -> %s", old_name, user.name)
         
         if 'phone_number' in data and data['phone_number']:
             if not validate_phone(data['phone_number']):
-                logger.warning(f"[UPDATE PROFILE] Invalid phone number: {data['phone_number']}")
+                logger.warning("[UPDATE PROFILE] Invalid phone number: %s", data['phone_number'])
                 return jsonify({'message': 'Invalid phone number format'}), 400
             old_phone = user.phone_number
             user.phone_number = data['phone_number'].strip()
             updates.append(f"phone: '{old_phone}' -> '{user.phone_number}'")
-            logger.debug(f"[UPDATE PROFILE] Phone updated: {old_phone} -> {user.phone_number}")
+            logger.debug("[UPDATE PROFILE] Phone updated: %s -> %s", old_phone, user.phone_number)
         
         if updates:
-            logger.info(f"[UPDATE PROFILE] Updating user {user_id}: {', '.join(updates)}")
+            logger.info("[UPDATE PROFILE] Updating user %s: %s", user_id, ', '.join(updates))
             db.session.commit()
-            logger.info(f"[UPDATE PROFILE] Profile updated successfully for user: {user.email}")
+            remember_identity(user)
+            logger.info("[UPDATE PROFILE] Profile updated successfully for user: %s", user.email)
         else:
-            logger.info(f"[UPDATE PROFILE] No changes made for user: {user.email}")
+            logger.info("[UPDATE PROFILE] No changes made for user: %s", user.email)
         
         return jsonify({
             'id': user.id,
@@ -252,16 +267,51 @@ def update_profile():
         }), 200
         
     except Exception as e:
-        logger.error(f"[UPDATE PROFILE ERROR] Failed to update profile: {str(e)}", exc_info=True)
+        logger.error("[UPDATE PROFILE ERROR] Failed to update profile: %s", str(e), exc_info=True)
         db.session.rollback()
-        print(f"Update profile error: {str(e)}")
         return jsonify({'message': 'An error occurred while updating profile'}), 500
 
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """Trade a refresh token for a new access/refresh pair; the presented refresh token stops working"""
+    payload = get_jwt()
+    user_id = payload['sub']
+    logger.info("[REFRESH] Token refresh for user: %s", user_id)
+    try:
+        revoke_token(payload)
+        tokens = issue_tokens(user_id, family=payload.get('fam'))
+        db.session.commit()
+    except Exception as e:
+        logger.error("[REFRESH ERROR] Token refresh failed: %s", str(e), exc_info=True)
+        db.session.rollback()
+        return jsonify({'message': 'An error occurred while refreshing the token'}), 500
+    
+    return jsonify(tokens), 200
+
 @auth_bp.route('/logout', methods=['POST'])
-@jwt_required()
+@jwt_required(verify_type=False)
 def logout():
-    user_id = get_jwt_identity()
-    logger.info(f"[LOGOUT] Logout request from user: {user_id}")
+    """
+    Revoke the presented token and every other token of the same login. Takes
+    either token type, so a client whose short-lived access token has expired
+    can still end the session with its refresh token.
+    """
+    payload = get_jwt()
+    user_id = payload['sub']
+    logger.info("[LOGOUT] Logout request from user: %s", user_id)
+    try:
+        revoke_token(payload)
+        if payload.get('fam'):
+            revoke_family(payload['fam'], user_id)
+        db.session.commit()
+        # The session is over; the next login reloads the identity
+        forget_identity(user_id)
+    except Exception as e:
+        logger.error("[LOGOUT ERROR] Failed to revoke tokens: %s", str(e), exc_info=True)
+        db.session.rollback()
+        return jsonify({'message': 'An error occurred during logout'}), 500
+    
     return jsonify({'message': 'Logged out successfully'}), 200
 
 @auth_bp.route('/verify-token', methods=['GET'])
@@ -271,26 +321,25 @@ def verify_token():
     logger.info("[VERIFY TOKEN] Token verification request")
     try:
         user_id = get_jwt_identity()
-        logger.debug(f"[VERIFY TOKEN] JWT identity: {user_id}")
+        logger.debug("[VERIFY TOKEN] JWT identity: %s", user_id)
         
-        user = User.query.get(user_id)
+        identity = get_identity(user_id)
         
-        if not user:
-            logger.warning(f"[VERIFY TOKEN] Invalid token - user not found: {user_id}")
+        if not identity:
+            logger.warning("[VERIFY TOKEN] Invalid token - user not found: %s", user_id)
             return jsonify({'message': 'Invalid token'}), 401
         
-        logger.info(f"[VERIFY TOKEN] Token valid for user: {user.email}")
+        logger.info("[VERIFY TOKEN] Token valid for user: %s", identity['email'])
         return jsonify({
             'valid': True,
             'user': {
-                'id': user.id,
-                'email': user.email,
-                'name': user.name,
-                'phone_number': user.phone_number
+                'id': identity['id'],
+                'email': identity['email'],
+                'name': identity['name'],
+                'phone_number': identity['phone_number']
             }
         }), 200
         
     except Exception as e:
-        logger.error(f"[VERIFY TOKEN ERROR] Token verification failed: {str(e)}", exc_info=True)
-        print(f"Token verification error: {str(e)}")
+        logger.error("[VERIFY TOKEN ERROR] Token verification failed: %s", str(e), exc_info=True)
         return jsonify({'message': 'Invalid token'}), 401
\ No newline at end of file
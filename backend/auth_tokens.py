@@ -0,0 +1,158 @@
+# auth_tokens.py
+#
+# Access/refresh token pairs and their revocation. Access tokens are short-lived
+# (JWT_ACCESS_TOKEN_EXPIRES); POST /api/auth/refresh trades a refresh token for
+# a new pair and revokes the one it was given (rotation). All tokens issued for
+# one login share a "fam" claim. Logging out revokes the family, ending the
+# session everywhere; so does presenting a refresh token that was already
+# rotated, since that means a copy of it is in someone else's hands.
+#
+# Revocations are rows of RevokedToken, mirrored in a per-process in-memory
+# map so the check jwt_required makes on every request is a dict lookup. A
+# revocation enters the map only once its row is committed. Each process pulls
+# revocations made elsewhere every TOKEN_DENYLIST_SYNC_SECONDS, in a session of
+# its own, and drops entries once the tokens they cover would have expired anyway.
+
+from flask_jwt_extended import create_access_token, create_refresh_token
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, RevokedToken
+from config import Config
+from datetime import datetime, timedelta
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Re-read revocations this far back on every sync, to catch transactions that
+# were stamped before the previous sync but committed after it
+SYNC_OVERLAP = timedelta(seconds=60)
+
+class Denylist:
+    """In-memory view of RevokedToken: revoked jti / family id -> expiry."""
+
+    def __init__(self, sync_interval):
+        self._sync_interval = sync_interval
+        self._entries = {}
+        self._synced_until = None
+        self._next_sync = 0.0
+        self._sync_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def add(self, key, expires_at):
+        with self._write_lock:
+            self._entries[key] = expires_at
+
+    def contains(self, key):
+        if time.monotonic() >= self._next_sync:
+            self.sync()
+        return key in self._entries
+
+    def sync(self):
+        """Merge in revocations recorded since the last sync; one thread at a time, the rest read the current map"""
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            now = datetime.utcnow()
+            # Not the request's session: the sync runs inside the JWT check, before the view's own work
+            with Session(db.engine) as session:
+                query = session.query(RevokedToken.jti, RevokedToken.expires_at).filter(RevokedToken.expires_at > now)
+                if self._synced_until is not None:
+                    query = query.filter(RevokedToken.revoked_at >= self._synced_until - SYNC_OVERLAP)
+                rows = query.all()
+
+            with self._write_lock:
+                entries = {key: expires_at for key, expires_at in self._entries.items() if expires_at > now}
+                entries.update(rows)
+                # Swapped in whole; lookups never take a lock
+                self._entries = entries
+            self._synced_until = now
+            logger.debug("[TOKENS] Denylist synced: %s rows read, %s entries", len(rows), len(entries))
+        except Exception as e:
+            # Keep serving from the current map; the next request retries
+            logger.error("[TOKENS ERROR] Denylist sync failed: %s", str(e), exc_info=True)
+        finally:
+            self._next_sync = time.monotonic() + self._sync_interval
+            self._sync_lock.release()
+
+    def __len__(self):
+        return len(self._entries)
+
+_denylist = Denylist(Config.TOKEN_DENYLIST_SYNC_SECONDS)
+
+def issue_tokens(user_id, family=None):
+    """A new access/refresh pair for a user, in the given token family or a new one"""
+    claims = {'fam': family or str(uuid.uuid4())}
+    return {
+        'token': create_access_token(identity=user_id, additional_claims=claims),
+        'refresh_token': create_refresh_token(identity=user_id, additional_claims=claims)
+    }
+
+# session.info key of the revocations a transaction will publish to the denylist when it commits
+_PENDING = 'pending_revocations'
+
+def _revoke(key, token_type, user_id, expires_at, session=None):
+    session = session or db.session
+    session.merge(RevokedToken(jti=key, token_type=token_type, user_id=user_id, expires_at=expires_at))
+    session.info.setdefault(_PENDING, []).append((key, expires_at))
+
+def _publish_revocations(session):
+    for key, expires_at in session.info.pop(_PENDING, ()):
+        _denylist.add(key, expires_at)
+
+def _discard_revocations(session, previous_transaction):
+    # Only a rollback of the whole transaction drops them; a savepoint rollback leaves the outer writes
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING, None)
+
+event.listen(db.session, 'after_commit', _publish_revocations)
+event.listen(db.session, 'after_soft_rollback', _discard_revocations)
+
+def revoke_token(payload):
+    """Revoke one token given its decoded claims (get_jwt()). The caller commits."""
+    _revoke(payload['jti'], payload['type'], payload['sub'], datetime.utcfromtimestamp(payload['exp']))
+
+def revoke_family(family, user_id):
+    """Revoke every token of a login session. The caller commits."""
+    # No token of the family can outlive the longest-lived refresh token issued into it
+    _revoke(family, 'family', user_id, datetime.utcnow() + Config.JWT_REFRESH_TOKEN_EXPIRES)
+    logger.info("[TOKENS] Revoked token family %s of user %s", family, user_id)
+
+def is_token_revoked(payload):
+    family = payload.get('fam')
+    if family and _denylist.contains(family):
+        return True
+    if not _denylist.contains(payload['jti']):
+        return False
+
+    if payload.get('type') == 'refresh' and family:
+        # A refresh token that was already rotated came back: a copy is in someone else's hands
+        logger.warning("[TOKENS] Reuse of rotated refresh token %s of user %s", payload['jti'], payload['sub'])
+        # Written in a session of its own, so the JWT check never commits the request's session
+        try:
+            with Session(db.engine) as session:
+                _revoke(family, 'family', payload['sub'], datetime.utcnow() + Config.JWT_REFRESH_TOKEN_EXPIRES, session=session)
+                session.commit()
+                _publish_revocations(session)
+            logger.info("[TOKENS] Revoked token family %s of user %s", family, payload['sub'])
+        except Exception as e:
+            logger.error("[TOKENS ERROR] Failed to revoke token family %s: %s", family, str(e), exc_info=True)
+    return True
+
+def register_token_callbacks(jwt):
+    """Hook the denylist into flask_jwt_extended's checks"""
+    @jwt.token_in_blocklist_loader
+    def _check_if_token_revoked(jwt_header, jwt_payload):
+        return is_token_revoked(jwt_payload)
+
+def purge_expired_revocations():
+    """Delete revocation rows whose tokens have expired on their own"""
+    deleted = RevokedToken.query.filter(RevokedToken.expires_at <= datetime.utcnow()).delete()
+    db.session.commit()
+    logger.info("[TOKENS] Purged %s expired token revocations", deleted)
+    return deleted
+
+def denylist_stats():
+    return {'entries': len(_denylist), 'sync_seconds': Config.TOKEN_DENYLIST_SYNC_SECONDS}
@@ -0,0 +1,111 @@
+# bench_query_plans.py
+#
+# Query-plan benchmark for the hot Bill/ReminderSettings/Payment queries.
+# Fills a throwaway SQLite database, then prints EXPLAIN plans and timings
+# with the secondary indexes dropped and again after run_migrations()
+# recreates them. Run by hand: python bench_query_plans.py
+
+import os
+import sys
+import time
+import uuid
+import random
+import tempfile
+import logging
+from datetime import datetime, timedelta
+
+# --- Configuration ---
+USERS = int(os.getenv('BENCH_USERS', 1000))
+BILLS_PER_USER = int(os.getenv('BENCH_BILLS_PER_USER', 25))
+REPEAT = int(os.getenv('BENCH_REPEAT', 20))
+
+# Point the app at a throwaway SQLite database before anything imports Config
+_db_dir = tempfile.mkdtemp(prefix='bench_')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_db_dir, 'bench.db')}")
+
+# --- Setup Logging ---
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - [%(levelname)s] - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+# -------------------
+
+from sqlalchemy import text
+from app import create_app
+from models import db, User, Bill, ReminderSettings, Payment
+from db_migrations import run_migrations
+
+def populate():
+    """Insert USERS users with settings and BILLS_PER_USER bills each using bulk inserts"""
+    logging.info("Populating %s users with %s bills each", USERS, BILLS_PER_USER)
+    now = datetime.now()
+    users, settings, bills = [], [], []
+    for n in range(USERS):
+        user_id = str(uuid.uuid4())
+        users.append({'id': user_id, 'email': f'user{n}@example.com', 'password_hash': 'x', 'name': f'User {n}', 'phone_number': f'+9100000{n:05d}'})
+        settings.append({'id': str(uuid.uuid4()), 'user_id': user_id, 'preferred_time': f'{random.randint(6, 21):02d}:00', 'days_before': 3})
+        for _ in range(BILLS_PER_USER):
+            bills.append({
+                'id': str(uuid.uuid4()), 'user_id': user_id, 'name': 'Bill', 'amount': 100.0,
+                'due_date': now + timedelta(days=random.randint(-400, 60)), 'category': 'utilities',
+                'frequency': 'monthly', 'is_paid': random.random() < 0.85, 'enable_whatsapp': True
+            })
+    db.session.execute(User.__table__.insert(), users)
+    db.session.execute(ReminderSettings.__table__.insert(), settings)
+    db.session.execute(Bill.__table__.insert(), bills)
+    db.session.commit()
+    return users[USERS // 2]['id']
+
+def hot_queries(user_id):
+    """The queries issued by bills.py, reminders.py, reminder_jobs.py and scheduler.py"""
+    now = datetime.now()
+    return {
+        'bills.get_bills (per user)': Bill.query.filter_by(user_id=user_id),
+        'bills.get_bills (keyset page)': Bill.query.filter_by(user_id=user_id).order_by(Bill.due_date, Bill.id).limit(50),
+        'reminder_jobs.sync_user_jobs (user unpaid)': Bill.query.filter(Bill.user_id == user_id, Bill.is_paid == False),
+        'reminders settings lookup': ReminderSettings.query.filter_by(user_id=user_id),
+        'reminder_jobs.backfill (unpaid, due >= today)': Bill.query.filter(Bill.is_paid == False, Bill.due_date >= now),
+        'scheduler.check_overdue_bills (unpaid, overdue 7d)': Bill.query.filter(
+            Bill.is_paid == False, Bill.due_date < now, Bill.due_date > now - timedelta(days=8)
+        ),
+        'payments for a bill': Payment.query.filter_by(bill_id=str(uuid.uuid4()))
+    }
+
+def explain(query):
+    compiled = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    prefix = 'EXPLAIN QUERY PLAN ' if db.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    rows = db.session.execute(text(prefix + str(compiled))).fetchall()
+    return ' | '.join(str(row[-1]) for row in rows)
+
+def measure(label, user_id):
+    print(f"\n=== {label} ===")
+    for name, query in hot_queries(user_id).items():
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            query.all()
+        elapsed_ms = (time.perf_counter() - start) * 1000 / REPEAT
+        print(f"{name:<52} {elapsed_ms:8.2f} ms  plan: {explain(query)}")
+
+def main():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user_id = populate()
+
+        # "Before": drop every secondary index; primary keys and unique indexes stay in place
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                if not index.unique:
+                    index.drop(bind=db.engine, checkfirst=True)
+        db.session.execute(text('ANALYZE'))
+        measure('before (primary keys and unique indexes only)', user_id)
+
+        # "After": the migration recreates them on the existing database
+        run_migrations()
+        db.session.execute(text('ANALYZE'))
+        measure('after run_migrations()', user_id)
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.WARNING)
+    sys.exit(main())
@@ -0,0 +1,234 @@
+# bill_import.py
+#
+# Bulk bill import behind POST /api/bills/bulk. Rows arrive as a JSON array,
+# CSV or NDJSON (the latter two read line by line from the request stream),
+# are validated up front, and are then written with executemany inserts and
+# primary-key bulk updates in a single transaction. Rows carrying the id of an
+# existing bill of the user update it (only the given fields, never is_paid);
+# every other row creates a bill. Errors are reported per row, numbered from 1.
+
+from sqlalchemy import update
+from models import db, Bill
+from bill_sync import next_version
+from reminder_jobs import create_jobs_for_new_bills, sync_jobs_for_bills
+from config import Config
+from datetime import datetime
+import csv
+import io
+import json
+import math
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ('name', 'amount', 'due_date', 'category', 'frequency')
+STRING_LIMITS = {'name': 100, 'category': 50, 'frequency': 20}
+PREFERENCE_FIELDS = ('enable_whatsapp', 'enable_call', 'enable_sms', 'enable_local_notification')
+
+# Values for columns a new row may leave out; executemany needs every row to carry the same keys
+INSERT_DEFAULTS = {
+    'notes': None,
+    'is_paid': False,
+    'enable_whatsapp': True,
+    'enable_call': False,
+    'enable_sms': False,
+    'enable_local_notification': True
+}
+
+# Bills looked up per IN (...) query when resolving ids of upserted rows
+ID_LOOKUP_CHUNK = 500
+
+def iter_json_rows(payload):
+    """Rows of a JSON body: a list of bills, or {"bills": [...]}"""
+    if isinstance(payload, dict):
+        payload = payload.get('bills')
+    if not isinstance(payload, list):
+        raise ValueError('Expected a JSON array of bills')
+    return iter(payload)
+
+# Bytes read from the request body at a time while streaming CSV/NDJSON
+STREAM_BUFFER_SIZE = 64 * 1024
+
+def _text_lines(stream):
+    """
+    Decode a request body stream line by line. The WSGI input stream reads
+    lines byte by byte, so it is wrapped in a buffered reader first.
+    """
+    return io.TextIOWrapper(io.BufferedReader(stream, STREAM_BUFFER_SIZE), encoding='utf-8-sig', newline='')
+
+def iter_csv_rows(stream):
+    """Rows of a UTF-8 CSV with a header line, decoded as the request streams in"""
+    for row in csv.DictReader(_text_lines(stream)):
+        # Empty cells mean "not given", not an empty string
+        yield {key: value for key, value in row.items() if key and value not in (None, '')}
+
+def iter_ndjson_rows(stream):
+    """Rows of newline-delimited JSON; a malformed line becomes a per-row error"""
+    for line in _text_lines(stream):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f'Invalid JSON: {str(e)}')
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    lowered = str(value).strip().lower()
+    if lowered in ('true', '1', 'yes'):
+        return True
+    if lowered in ('false', '0', 'no'):
+        return False
+    raise ValueError(f"expected true or false, got '{value}'")
+
+def validate_row(raw):
+    """
+    Convert one raw row into Bill column values, keeping only the fields given.
+    Reminder preferences may be nested under 'reminder_preferences' (JSON) or
+    given as flat enable_* columns (CSV). Raises ValueError with a readable message.
+    """
+    if isinstance(raw, Exception):
+        raise raw
+    if not isinstance(raw, dict):
+        raise ValueError('Expected an object')
+
+    values = {}
+    if raw.get('id') is not None:
+        values['id'] = str(raw['id'])
+        if len(values['id']) > 36:
+            raise ValueError('id is too long')
+
+    for field, limit in STRING_LIMITS.items():
+        if field in raw:
+            value = str(raw[field]).strip()
+            if not value:
+                raise ValueError(f'{field} must not be empty')
+            if len(value) > limit:
+                raise ValueError(f'{field} is longer than {limit} characters')
+            values[field] = value
+
+    if 'amount' in raw:
+        try:
+            values['amount'] = float(raw['amount'])
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid amount '{raw['amount']}'")
+        if not math.isfinite(values['amount']):
+            raise ValueError(f"invalid amount '{raw['amount']}'")
+
+    if 'due_date' in raw:
+        try:
+            values['due_date'] = datetime.fromisoformat(str(raw['due_date']).replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f"invalid due date '{raw['due_date']}'")
+
+    if 'notes' in raw:
+        if raw['notes'] is not None and not isinstance(raw['notes'], str):
+            raise ValueError('notes must be a string')
+        values['notes'] = raw['notes']
+    if 'is_paid' in raw:
+        values['is_paid'] = _parse_bool(raw['is_paid'])
+
+    prefs = raw.get('reminder_preferences')
+    if prefs is not None and not isinstance(prefs, dict):
+        raise ValueError('reminder_preferences must be an object')
+    for field in PREFERENCE_FIELDS:
+        source = prefs if prefs and field in prefs else raw
+        if field in source:
+            values[field] = _parse_bool(source[field])
+
+    return values
+
+def _existing_owners(ids):
+    """Map each id that already exists to the user owning it"""
+    owners = {}
+    for start in range(0, len(ids), ID_LOOKUP_CHUNK):
+        chunk = ids[start:start + ID_LOOKUP_CHUNK]
+        owners.update(db.session.query(Bill.id, Bill.user_id).filter(Bill.id.in_(chunk)).all())
+    return owners
+
+def import_bills(user_id, rows, atomic=False):
+    """
+    Validate and write a stream of raw bill rows for a user, without committing.
+
+    With atomic=True nothing is written when any row fails validation.
+    Returns {'success', 'created', 'updated', 'errors', 'version'}.
+    """
+    errors = []
+    candidates = []
+
+    for number, raw in enumerate(rows, start=1):
+        if number > Config.BULK_IMPORT_MAX_ROWS:
+            errors.append({'row': number, 'message': f'Too many rows (limit {Config.BULK_IMPORT_MAX_ROWS})'})
+            break
+        try:
+            candidates.append((number, validate_row(raw)))
+        except ValueError as e:
+            errors.append({'row': number, 'message': str(e)})
+
+    # Rows with an id of one of the user's bills are updates; everything else is an insert
+    owners = _existing_owners(list({values['id'] for _, values in candidates if 'id' in values}))
+    inserts, updates, seen_ids = [], [], set()
+    now = datetime.utcnow()
+
+    for number, values in candidates:
+        bill_id = values.get('id')
+        if bill_id is not None:
+            if bill_id in seen_ids:
+                errors.append({'row': number, 'message': f'Duplicate id {bill_id} in this import'})
+                continue
+            seen_ids.add(bill_id)
+            owner = owners.get(bill_id)
+            if owner is not None and owner != user_id:
+                errors.append({'row': number, 'message': 'Bill not found'})
+                continue
+            if owner == user_id:
+                # Paying goes through POST /api/bills/<id>/pay, which records the payment and rolls the bill over
+                if 'is_paid' in values:
+                    errors.append({'row': number, 'message': 'is_paid cannot be changed by import; use the pay endpoint'})
+                    continue
+                updates.append(values)
+                continue
+
+        missing = [field for field in REQUIRED_FIELDS if field not in values]
+        if missing:
+            errors.append({'row': number, 'message': f"Missing required fields: {', '.join(missing)}"})
+            continue
+        row = dict(INSERT_DEFAULTS, **values)
+        row.setdefault('id', str(uuid.uuid4()))
+        row['user_id'] = user_id
+        row['created_at'] = now
+        inserts.append(row)
+
+    errors.sort(key=lambda error: error['row'])
+    result = {'success': True, 'created': 0, 'updated': 0, 'errors': errors, 'version': None}
+
+    if atomic and errors:
+        logger.warning("[BULK IMPORT] Rejected import for user %s: %s invalid rows", user_id, len(errors))
+        result['success'] = False
+        return result
+    if not inserts and not updates:
+        return result
+
+    version = next_version(user_id)
+    batch_size = Config.BULK_IMPORT_BATCH_SIZE
+
+    for row in inserts:
+        row['sync_version'] = version
+    for start in range(0, len(inserts), batch_size):
+        db.session.execute(Bill.__table__.insert(), inserts[start:start + batch_size])
+
+    for values in updates:
+        values['sync_version'] = version
+    for start in range(0, len(updates), batch_size):
+        db.session.execute(update(Bill), updates[start:start + batch_size])
+
+    # New bills get their jobs in one vectorized pass; updated ones are resynced individually
+    create_jobs_for_new_bills(user_id, inserts)
+    sync_jobs_for_bills([values['id'] for values in updates])
+
+    result.update(created=len(inserts), updated=len(updates), version=version)
+    logger.info("[BULK IMPORT] User %s: %s created, %s updated, %s errors", user_id, len(inserts), len(updates), len(errors))
+    return result
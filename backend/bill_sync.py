@@ -0,0 +1,72 @@
+# bill_sync.py
+#
+# Per-user bills versioning. Every write path that changes a user's bills calls
+# mark_bills_changed()/mark_bill_deleted() before committing; that bumps the
+# user's BillSyncState.version and stamps the touched bills (or a tombstone)
+# with it. GET /api/bills uses the version as its ETag, and
+# GET /api/bills/changes?since=<version> returns only what moved after it.
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from models import db, BillSyncState, BillTombstone
+import logging
+
+logger = logging.getLogger(__name__)
+
+def current_version(user_id):
+    """The user's bills version; 0 for a user whose bills have never changed"""
+    version = db.session.query(BillSyncState.version).filter_by(user_id=user_id).scalar()
+    return version or 0
+
+def _increment(user_id):
+    result = db.session.execute(
+        update(BillSyncState)
+        .where(BillSyncState.user_id == user_id)
+        .values(version=BillSyncState.version + 1)
+    )
+    return result.rowcount > 0
+
+def next_version(user_id):
+    """Atomically increment and return the user's bills version (within the current transaction)"""
+    if not _increment(user_id):
+        # First change for this user. A concurrent first write may insert the row first;
+        # the savepoint keeps the losing insert from aborting the caller's transaction
+        try:
+            with db.session.begin_nested():
+                db.session.add(BillSyncState(user_id=user_id, version=1))
+            return 1
+        except IntegrityError:
+            logger.debug("[BILL SYNC] Version row for user %s created concurrently, incrementing it", user_id)
+            _increment(user_id)
+    return db.session.query(BillSyncState.version).filter_by(user_id=user_id).scalar()
+
+def mark_bills_changed(user_id, bills):
+    """Stamp created or updated bills with a fresh version for their owner"""
+    version = next_version(user_id)
+    for bill in bills:
+        bill.sync_version = version
+    logger.debug("[BILL SYNC] User %s bills now at version %s", user_id, version)
+    return version
+
+def mark_bill_deleted(bill):
+    """Record a tombstone for a bill about to be deleted"""
+    version = next_version(bill.user_id)
+    # For an occurrence of a recurring series the (series_id, due_date) pair keeps it from being recreated
+    db.session.add(BillTombstone(
+        bill_id=bill.id,
+        user_id=bill.user_id,
+        version=version,
+        series_id=bill.series_id,
+        due_date=bill.due_date if bill.series_id else None
+    ))
+    logger.debug("[BILL SYNC] User %s bill %s deleted at version %s", bill.user_id, bill.id, version)
+    return version
+
+def deleted_since(user_id, since):
+    """Ids of bills deleted after version `since`"""
+    rows = (
+        db.session.query(BillTombstone.bill_id)
+        .filter(BillTombstone.user_id == user_id, BillTombstone.version > since)
+        .all()
+    )
+    return [bill_id for (bill_id,) in rows]
@@ -1,81 +1,311 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, Bill, Payment
-from datetime import datetime
+from reminder_jobs import sync_bill_job
+from bill_sync import current_version, mark_bills_changed, mark_bill_deleted, deleted_since
+from recurrence import rollover_bill
+from pagination import encode_cursor, decode_cursor
+from bill_import import import_bills, iter_json_rows, iter_csv_rows, iter_ndjson_rows
+from local_storage_service import delete_receipt_from_local
+from config import Config
+from sqlalchemy import and_, or_, case, func
+from cache import TTLCache
+from datetime import datetime, timedelta
+import csv
+import hashlib
 import logging
 
 
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 bills_bp = Blueprint('bills', __name__)
 
+# Output field -> the Bill columns it is built from. Single-column fields map to
+# the value itself; multi-column fields become a nested dict keyed by column name.
+BILL_FIELD_COLUMNS = {
+    'id': (Bill.id,),
+    'name': (Bill.name,),
+    'amount': (Bill.amount,),
+    'due_date': (Bill.due_date,),
+    'category': (Bill.category,),
+    'frequency': (Bill.frequency,),
+    'is_paid': (Bill.is_paid,),
+    'notes': (Bill.notes,),
+    'created_at': (Bill.created_at,),
+    'reminder_preferences': (Bill.enable_whatsapp, Bill.enable_call, Bill.enable_sms, Bill.enable_local_notification)
+}
+DEFAULT_BILL_FIELDS = tuple(BILL_FIELD_COLUMNS)
+
+# Dashboard summaries per (user_id, limit), stored with the bills version and day they were computed for
+_summary_cache = TTLCache(Config.SUMMARY_CACHE_SIZE, Config.SUMMARY_CACHE_TTL_SECONDS)
+SUMMARY_BUCKETS = ('overdue', 'this_week', 'this_month', 'later')
+SUMMARY_NEXT_DUE_FIELDS = ('id', 'name', 'amount', 'due_date', 'category')
+
+# Every list query selects these first: they are the keyset of the cursor
+KEYSET_COLUMNS = (Bill.id, Bill.due_date)
+
+def _parse_iso(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def _parse_fields(raw):
+    if not raw:
+        return DEFAULT_BILL_FIELDS
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in BILL_FIELD_COLUMNS]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return tuple(dict.fromkeys(fields))
+
+def _parse_bool(value):
+    lowered = value.lower()
+    if lowered not in ('true', 'false', '1', '0'):
+        raise ValueError(f"expected true or false, got '{value}'")
+    return lowered in ('true', '1')
+
+def _filtered_bills_query(user_id, fields, args):
+    """Column query for the user's bills restricted by the list filters"""
+    columns = list(KEYSET_COLUMNS)
+    for field in fields:
+        columns.extend(BILL_FIELD_COLUMNS[field])
+    
+    query = db.session.query(*columns).filter(Bill.user_id == user_id)
+    if 'is_paid' in args:
+        query = query.filter(Bill.is_paid == _parse_bool(args['is_paid']))
+    if args.get('category'):
+        query = query.filter(Bill.category.in_([c.strip() for c in args['category'].split(',')]))
+    if args.get('due_from'):
+        query = query.filter(Bill.due_date >= _parse_iso(args['due_from']))
+    if args.get('due_to'):
+        query = query.filter(Bill.due_date <= _parse_iso(args['due_to']))
+    return query
+
+def _row_serializer(fields):
+    """Build a function that turns one column tuple from _filtered_bills_query into the JSON dict"""
+    plan = []
+    offset = len(KEYSET_COLUMNS)
+    for field in fields:
+        columns = BILL_FIELD_COLUMNS[field]
+        keys = tuple(column.key for column in columns) if len(columns) > 1 else None
+        plan.append((field, offset, keys))
+        offset += len(columns)
+    
+    def serialize(row):
+        data = {}
+        for field, start, keys in plan:
+            if keys is None:
+                value = row[start]
+                data[field] = value.isoformat() if isinstance(value, datetime) else value
+            else:
+                data[field] = dict(zip(keys, row[start:start + len(keys)]))
+        return data
+    return serialize
+
+def _build_summary(user_id, today, limit):
+    """One grouped aggregate query over (category, bucket) plus one indexed query for the next due bills"""
+    week_end = today + timedelta(days=7)
+    month_end = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+    bucket = case(
+        (Bill.is_paid == True, 'paid'),
+        (Bill.due_date < today, 'overdue'),
+        (Bill.due_date < week_end, 'this_week'),
+        (Bill.due_date < month_end, 'this_month'),
+        else_='later'
+    ).label('bucket')
+    
+    rows = db.session.query(
+        Bill.category, bucket, func.count(Bill.id), func.coalesce(func.sum(Bill.amount), 0.0)
+    ).filter(Bill.user_id == user_id).group_by(Bill.category, bucket).all()
+    
+    def empty():
+        return {'count': 0, 'amount': 0.0}
+    
+    totals = dict(empty(), paid=empty(), unpaid=empty())
+    by_category = {}
+    by_bucket = {name: empty() for name in SUMMARY_BUCKETS}
+    for category, bucket_name, count, amount in rows:
+        category_totals = by_category.setdefault(category, dict(empty(), unpaid_count=0, unpaid_amount=0.0))
+        for target in (totals, category_totals):
+            target['count'] += count
+            target['amount'] += amount
+        if bucket_name == 'paid':
+            totals['paid']['count'] += count
+            totals['paid']['amount'] += amount
+        else:
+            totals['unpaid']['count'] += count
+            totals['unpaid']['amount'] += amount
+            category_totals['unpaid_count'] += count
+            category_totals['unpaid_amount'] += amount
+            by_bucket[bucket_name]['count'] += count
+            by_bucket[bucket_name]['amount'] += amount
+    
+    for entry in [totals, totals['paid'], totals['unpaid'], *by_bucket.values()]:
+        entry['amount'] = round(entry['amount'], 2)
+    for entry in by_category.values():
+        entry['amount'] = round(entry['amount'], 2)
+        entry['unpaid_amount'] = round(entry['unpaid_amount'], 2)
+    
+    next_due = []
+    if limit:
+        rows = (
+            _filtered_bills_query(user_id, SUMMARY_NEXT_DUE_FIELDS, {})
+            .filter(Bill.is_paid == False, Bill.due_date >= today)
+            .order_by(Bill.due_date, Bill.id)
+            .limit(limit)
+            .all()
+        )
+        serialize = _row_serializer(SUMMARY_NEXT_DUE_FIELDS)
+        next_due = [serialize(row) for row in rows]
+    
+    return {
+        'totals': totals,
+        'by_category': by_category,
+        'by_due_bucket': by_bucket,
+        'next_due': next_due
+    }
+
+def _bills_etag(user_id, version):
+    """Weak validator for one user's bills list at a version, distinct per query string"""
+    digest = hashlib.sha1(f"{user_id}?{request.query_string.decode()}".encode()).hexdigest()[:16]
+    return f"bills-{version}-{digest}"
+
+def _with_sync_headers(response, etag, version):
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['X-Bills-Version'] = str(version)
+    return response
+
 @bills_bp.route('', methods=['GET'])
 @jwt_required()
 def get_bills():
+    """
+    List the user's bills ordered by (due_date, id).
+
+    Optional query parameters:
+      is_paid=true|false, category=a,b, due_from/due_to=<ISO date>  filters
+      fields=name,amount,...                                         sparse fieldset ('id' is always returned)
+      limit=<n>, cursor=<token>                                      keyset pagination; the token for the
+                                                                     next page comes back in X-Next-Cursor
+    The body stays a plain JSON array so existing clients keep working.
+    
+    Responses carry an ETag derived from the user's bills version; a matching
+    If-None-Match gets a 304 without touching the bill table.
+    """
     user_id = get_jwt_identity()
-    logger.info(f"[GET BILLS] Request from user_id: {user_id}")
+    logger.info("[GET BILLS] Request from user_id: %s", user_id)
     
-    bills = Bill.query.filter_by(user_id=user_id).all()
-    logger.debug(f"[GET BILLS] Found {len(bills)} bills for user {user_id}")
+    version = current_version(user_id)
+    etag = _bills_etag(user_id, version)
+    if request.if_none_match.contains_weak(etag):
+        logger.info("[GET BILLS] Not modified for user %s (version %s)", user_id, version)
+        return _with_sync_headers(make_response('', 304), etag, version)
     
-    bills_data = []
-    for bill in bills:
-        logger.debug(f"[GET BILLS] Processing bill: {bill.id} - {bill.name}")
-        logger.debug(f"[GET BILLS] Bill details - Amount: {bill.amount}, Due: {bill.due_date}, Paid: {bill.is_paid}")
-        
-        bill_dict = {
-            'id': bill.id,
-            'name': bill.name,
-            'amount': bill.amount,
-            'due_date': bill.due_date.isoformat(),
-            'category': bill.category,
-            'frequency': bill.frequency,
-            'is_paid': bill.is_paid,
-            'notes': bill.notes,
-            'created_at': bill.created_at.isoformat(),
-            'reminder_preferences': {
-                'enable_whatsapp': bill.enable_whatsapp,
-                'enable_call': bill.enable_call,
-                'enable_sms': bill.enable_sms,
-                'enable_local_notification': bill.enable_local_notification
-            }
-        }
-        bills_data.append(bill_dict)
-        
-        logger.debug(f"[GET BILLS] Bill {bill.id} reminder prefs - WhatsApp: {bill.enable_whatsapp}, Call: {bill.enable_call}")
+    args = request.args
+    try:
+        fields = _parse_fields(args.get('fields'))
+        query = _filtered_bills_query(user_id, fields, args)
+        limit = min(int(args['limit']), Config.BILLS_PAGE_MAX) if 'limit' in args else None
+        if limit is not None and limit < 1:
+            raise ValueError('limit must be positive')
+        if args.get('cursor'):
+            due_date, last_id = decode_cursor(args['cursor'])
+            query = query.filter(or_(
+                Bill.due_date > due_date,
+                and_(Bill.due_date == due_date, Bill.id > last_id)
+            ))
+    except ValueError as e:
+        logger.warning("[GET BILLS] Invalid query parameters from user %s: %s", user_id, str(e))
+        return jsonify({'message': f'Invalid query parameters: {str(e)}'}), 400
+    
+    query = query.order_by(Bill.due_date, Bill.id)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    rows = query.all()
+    
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    
+    serialize = _row_serializer(fields)
+    response = _with_sync_headers(jsonify([serialize(row) for row in rows]), etag, version)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    
+    logger.info("[GET BILLS] Returning %s bills for user %s%s", len(rows), user_id, ' (more available)' if next_cursor else '')
+    return response, 200
+
+@bills_bp.route('/changes', methods=['GET'])
+@jwt_required()
+def get_bill_changes():
+    """
+    Delta sync: bills created or updated after ?since=<version> (honouring ?fields=)
+    and the ids of bills deleted after it. Clients store the returned version and
+    pass it as `since` next time; `reset` tells a client that is ahead of the
+    server (e.g. after a database restore) to reload the full list.
+    """
+    user_id = get_jwt_identity()
+    logger.info("[BILL CHANGES] Request from user_id: %s", user_id)
     
-    logger.info(f"[GET BILLS] Returning {len(bills_data)} bills for user {user_id}")
-    return jsonify(bills_data), 200
+    try:
+        since = int(request.args.get('since', 0))
+        if since < 0:
+            raise ValueError('since must not be negative')
+        fields = _parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        logger.warning("[BILL CHANGES] Invalid query parameters from user %s: %s", user_id, str(e))
+        return jsonify({'message': f'Invalid query parameters: {str(e)}'}), 400
+    
+    version = current_version(user_id)
+    if since >= version:
+        changed, deleted = [], []
+    else:
+        rows = (
+            _filtered_bills_query(user_id, fields, {})
+            .filter(Bill.sync_version > since)
+            .order_by(Bill.due_date, Bill.id)
+            .all()
+        )
+        serialize = _row_serializer(fields)
+        changed = [serialize(row) for row in rows]
+        deleted = deleted_since(user_id, since)
+    
+    logger.info("[BILL CHANGES] User %s since %s: %s changed, %s deleted (version %s)", user_id, since, len(changed), len(deleted), version)
+    return jsonify({
+        'version': version,
+        'reset': since > version,
+        'changed': changed,
+        'deleted': deleted
+    }), 200
 
 @bills_bp.route('', methods=['POST'])
 @jwt_required()
 def create_bill():
     user_id = get_jwt_identity()
-    logger.info(f"[CREATE BILL] Request from user_id: {user_id}")
+    logger.info("[CREATE BILL] Request from user_id: %s", user_id)
     
     data = request.get_json()
-    logger.debug(f"[CREATE BILL] Request data keys: {list(data.keys()) if data else 'No data'}")
+    logger.debug("[CREATE BILL] Request data keys: %s", list(data.keys()) if data else 'No data')
     
     # Validate required fields
     required = ['name', 'amount', 'due_date', 'category', 'frequency']
     missing_fields = [field for field in required if field not in data]
     
     if missing_fields:
-        logger.warning(f"[CREATE BILL] Missing required fields: {missing_fields}")
+        logger.warning("[CREATE BILL] Missing required fields: %s", missing_fields)
         return jsonify({'message': 'Missing required fields'}), 400
     
-    logger.debug(f"[CREATE BILL] Creating bill: {data.get('name')} for amount: {data.get('amount')}")
+    logger.debug("[CREATE BILL] Creating bill: %s for amount: %s", data.get('name'), data.get('amount'))
     
     try:
         # Parse due date
         due_date_str = data['due_date']
         due_date = datetime.fromisoformat(due_date_str.replace('Z', '+00:00'))
-        logger.debug(f"[CREATE BILL] Parsed due date: {due_date}")
+        logger.debug("[CREATE BILL] Parsed due date: %s", due_date)
     except Exception as e:
-        logger.error(f"[CREATE BILL ERROR] Failed to parse due date '{due_date_str}': {str(e)}")
+        logger.error("[CREATE BILL ERROR] Failed to parse due date '%s': %s", due_date_str, str(e))
         return jsonify({'message': 'Invalid due date format'}), 400
     
     # Create bill
@@ -89,28 +319,30 @@ def create_bill():
         notes=data.get('notes')
     )
     
-    logger.debug(f"[CREATE BILL] Bill object created - Category: {bill.category}, Frequency: {bill.frequency}")
+    logger.debug("[CREATE BILL] Bill object created - Category: %s, Frequency: %s", bill.category, bill.frequency)
     
     # Set reminder preferences if provided
     if 'reminder_preferences' in data:
         prefs = data['reminder_preferences']
-        logger.debug(f"[CREATE BILL] Setting reminder preferences: {prefs}")
+        logger.debug("[CREATE BILL] Setting reminder preferences: %s", prefs)
         
         bill.enable_whatsapp = prefs.get('enable_whatsapp', True)
         bill.enable_call = prefs.get('enable_call', False)
         bill.enable_sms = prefs.get('enable_sms', False)
         bill.enable_local_notification = prefs.get('enable_local_notification', True)
         
-        logger.debug(f"[CREATE BILL] Reminder prefs set - WhatsApp: {bill.enable_whatsapp}, Call: {bill.enable_call}, SMS: {bill.enable_sms}, Local: {bill.enable_local_notification}")
+        logger.debug("[CREATE BILL] Reminder prefs set - WhatsApp: %s, Call: %s, SMS: %s, Local: %s", bill.enable_whatsapp, bill.enable_call, bill.enable_sms, bill.enable_local_notification)
     else:
         logger.debug("[CREATE BILL] Using default reminder preferences")
     
     try:
         db.session.add(bill)
+        sync_bill_job(bill)
+        mark_bills_changed(user_id, [bill])
         db.session.commit()
-        logger.info(f"[CREATE BILL] Bill created successfully with ID: {bill.id}")
+        logger.info("[CREATE BILL] Bill created successfully with ID: %s", bill.id)
     except Exception as e:
-        logger.error(f"[CREATE BILL ERROR] Failed to save bill: {str(e)}", exc_info=True)
+        logger.error("[CREATE BILL ERROR] Failed to save bill: %s", str(e), exc_info=True)
         db.session.rollback()
         return jsonify({'message': 'Failed to create bill'}), 500
     
@@ -132,25 +364,104 @@ def create_bill():
         }
     }
     
-    logger.debug(f"[CREATE BILL] Returning bill data: {response_data['id']}")
+    logger.debug("[CREATE BILL] Returning bill data: %s", response_data['id'])
     return jsonify(response_data), 201
 
+@bills_bp.route('/summary', methods=['GET'])
+@jwt_required()
+def get_bills_summary():
+    """
+    Dashboard totals without transferring the bill list: counts and amounts by
+    paid status, by category and by due bucket, plus the next ?limit= (default 5)
+    unpaid bills. Unpaid bills fall in exactly one bucket: overdue, this_week
+    (due within 7 days), this_month (later this calendar month) or later.
+    Served from a per-user cache that any bill write invalidates via the version.
+    """
+    user_id = get_jwt_identity()
+    logger.info("[BILLS SUMMARY] Request from user_id: %s", user_id)
+    
+    try:
+        limit = min(max(int(request.args.get('limit', 5)), 0), Config.BILLS_PAGE_MAX)
+    except ValueError:
+        return jsonify({'message': 'Invalid query parameters: limit must be a number'}), 400
+    
+    version = current_version(user_id)
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    cached = _summary_cache.get((user_id, limit))
+    if cached is not None and cached[0] == version and cached[1] == today:
+        logger.debug("[BILLS SUMMARY] Cache hit for user %s (version %s)", user_id, version)
+        return jsonify(cached[2]), 200
+    
+    summary = _build_summary(user_id, today, limit)
+    summary['version'] = version
+    _summary_cache.set((user_id, limit), (version, today, summary))
+    
+    logger.info("[BILLS SUMMARY] Computed summary for user %s: %s bills (version %s)", user_id, summary['totals']['count'], version)
+    return jsonify(summary), 200
+
+@bills_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def bulk_import_bills():
+    """
+    Create or update many bills in one transaction.
+
+    Body: a JSON array (application/json), CSV with a header row (text/csv) or
+    NDJSON (application/x-ndjson). Rows with the id of an existing bill update it.
+    ?atomic=true rejects the whole import when any row is invalid; otherwise
+    valid rows are written and the invalid ones reported.
+    """
+    user_id = get_jwt_identity()
+    content_type = request.mimetype
+    logger.info("[BULK IMPORT] Request from user_id: %s (%s, %s bytes)", user_id, content_type, request.content_length)
+    
+    try:
+        atomic = _parse_bool(request.args.get('atomic', 'false'))
+        if content_type == 'text/csv':
+            rows = iter_csv_rows(request.stream)
+        elif content_type in ('application/x-ndjson', 'application/jsonl'):
+            rows = iter_ndjson_rows(request.stream)
+        elif content_type == 'application/json':
+            rows = iter_json_rows(request.get_json(silent=True))
+        else:
+            return jsonify({'message': 'Unsupported content type, use application/json, text/csv or application/x-ndjson'}), 415
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    try:
+        result = import_bills(user_id, rows, atomic=atomic)
+        if not result['success']:
+            db.session.rollback()
+            return jsonify(dict(result, message='Import rejected, no bills were saved')), 400
+        db.session.commit()
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({'message': 'Body must be UTF-8 encoded'}), 400
+    except csv.Error as e:
+        db.session.rollback()
+        return jsonify({'message': f'Malformed CSV: {str(e)}'}), 400
+    except Exception as e:
+        logger.error("[BULK IMPORT ERROR] Failed to import bills for user %s: %s", user_id, str(e), exc_info=True)
+        db.session.rollback()
+        return jsonify({'message': 'Failed to import bills'}), 500
+    
+    return jsonify(result), 200
+
 @bills_bp.route('/<bill_id>', methods=['PUT'])
 @jwt_required()
 def update_bill(bill_id):
     user_id = get_jwt_identity()
-    logger.info(f"[UPDATE BILL] Request from user_id: {user_id} for bill_id: {bill_id}")
+    logger.info("[UPDATE BILL] Request from user_id: %s for bill_id: %s", user_id, bill_id)
     
     bill = Bill.query.filter_by(id=bill_id, user_id=user_id).first()
     
     if not bill:
-        logger.warning(f"[UPDATE BILL] Bill {bill_id} not found for user {user_id}")
+        logger.warning("[UPDATE BILL] Bill %s not found for user %s", bill_id, user_id)
         return jsonify({'message': 'Bill not found'}), 404
     
-    logger.debug(f"[UPDATE BILL] Found bill: {bill.name}")
+    logger.debug("[UPDATE BILL] Found bill: %s", bill.name)
     
     data = request.get_json()
-    logger.debug(f"[UPDATE BILL] Update data keys: {list(data.keys()) if data else 'No data'}")
+    logger.debug("[UPDATE BILL] Update data keys: %s", list(data.keys()) if data else 'No data')
     
     # Track updates
     updates = []
@@ -172,7 +483,7 @@ def update_bill(bill_id):
             bill.due_date = datetime.fromisoformat(data['due_date'].replace('Z', '+00:00'))
             updates.append(f"due_date: {old_due_date} -> {bill.due_date}")
         except Exception as e:
-            logger.error(f"[UPDATE BILL ERROR] Failed to parse due date: {str(e)}")
+            logger.error("[UPDATE BILL ERROR] Failed to parse due date: %s", str(e))
             return jsonify({'message': 'Invalid due date format'}), 400
             
     if 'category' in data:
@@ -192,7 +503,7 @@ def update_bill(bill_id):
     # Update reminder preferences
     if 'reminder_preferences' in data:
         prefs = data['reminder_preferences']
-        logger.debug(f"[UPDATE BILL] Updating reminder preferences: {prefs}")
+        logger.debug("[UPDATE BILL] Updating reminder preferences: %s", prefs)
         
         reminder_updates = []
         
@@ -224,15 +535,18 @@ def update_bill(bill_id):
             updates.append(f"reminders: {{{', '.join(reminder_updates)}}}")
     
     if updates:
-        logger.info(f"[UPDATE BILL] Updating bill {bill_id}: {'; '.join(updates)}")
+        logger.info("[UPDATE BILL] Updating bill %s: %s", bill_id, '; '.join(updates))
     else:
-        logger.info(f"[UPDATE BILL] No changes for bill {bill_id}")
+        logger.info("[UPDATE BILL] No changes for bill %s", bill_id)
     
     try:
+        sync_bill_job(bill)
+        if updates:
+            mark_bills_changed(user_id, [bill])
         db.session.commit()
-        logger.info(f"[UPDATE BILL] Bill {bill_id} updated successfully")
+        logger.info("[UPDATE BILL] Bill %s updated successfully", bill_id)
     except Exception as e:
-        logger.error(f"[UPDATE BILL ERROR] Failed to update bill {bill_id}: {str(e)}", exc_info=True)
+        logger.error("[UPDATE BILL ERROR] Failed to update bill %s: %s", bill_id, str(e), exc_info=True)
         db.session.rollback()
         return jsonify({'message': 'Failed to update bill'}), 500
     
@@ -248,32 +562,37 @@ def update_bill(bill_id):
         'created_at': bill.created_at.isoformat()
     }
     
-    logger.debug(f"[UPDATE BILL] Returning updated bill data for {bill_id}")
+    logger.debug("[UPDATE BILL] Returning updated bill data for %s", bill_id)
     return jsonify(response_data), 200
 
 @bills_bp.route('/<bill_id>', methods=['DELETE'])
 @jwt_required()
 def delete_bill(bill_id):
     user_id = get_jwt_identity()
-    logger.info(f"[DELETE BILL] Request from user_id: {user_id} for bill_id: {bill_id}")
+    logger.info("[DELETE BILL] Request from user_id: %s for bill_id: %s", user_id, bill_id)
     
     bill = Bill.query.filter_by(id=bill_id, user_id=user_id).first()
     
     if not bill:
-        logger.warning(f"[DELETE BILL] Bill {bill_id} not found for user {user_id}")
+        logger.warning("[DELETE BILL] Bill %s not found for user %s", bill_id, user_id)
         return jsonify({'message': 'Bill not found'}), 404
     
     bill_name = bill.name
     bill_amount = bill.amount
     
-    logger.info(f"[DELETE BILL] Deleting bill: {bill_name} (Amount: {bill_amount})")
+    logger.info("[DELETE BILL] Deleting bill: %s (Amount: %s)", bill_name, bill_amount)
     
     try:
+        # The bill's reminder job and receipt row are removed with it through the relationship cascade;
+        # the receipt's stored file is released here so blob GC can reclaim it
+        if bill.receipt is not None:
+            delete_receipt_from_local(bill.receipt.storage_key)
+        mark_bill_deleted(bill)
         db.session.delete(bill)
         db.session.commit()
-        logger.info(f"[DELETE BILL] Bill {bill_id} deleted successfully")
+        logger.info("[DELETE BILL] Bill %s deleted successfully", bill_id)
     except Exception as e:
-        logger.error(f"[DELETE BILL ERROR] Failed to delete bill {bill_id}: {str(e)}", exc_info=True)
+        logger.error("[DELETE BILL ERROR] Failed to delete bill %s: %s", bill_id, str(e), exc_info=True)
         db.session.rollback()
         return jsonify({'message': 'Failed to delete bill'}), 500
     
@@ -283,23 +602,23 @@ def delete_bill(bill_id):
 @jwt_required()
 def mark_bill_paid(bill_id):
     user_id = get_jwt_identity()
-    logger.info(f"[MARK PAID] Request from user_id: {user_id} for bill_id: {bill_id}")
+    logger.info("[MARK PAID] Request from user_id: %s for bill_id: %s", user_id, bill_id)
     
     bill = Bill.query.filter_by(id=bill_id, user_id=user_id).first()
     
     if not bill:
-        logger.warning(f"[MARK PAID] Bill {bill_id} not found for user {user_id}")
+        logger.warning("[MARK PAID] Bill %s not found for user %s", bill_id, user_id)
         return jsonify({'message': 'Bill not found'}), 404
     
-    logger.debug(f"[MARK PAID] Bill details - Name: {bill.name}, Amount: {bill.amount}, Was paid: {bill.is_paid}")
+    logger.debug("[MARK PAID] Bill details - Name: %s, Amount: %s, Was paid: %s", bill.name, bill.amount, bill.is_paid)
     
     if bill.is_paid:
-        logger.info(f"[MARK PAID] Bill {bill_id} is already marked as paid")
+        logger.info("[MARK PAID] Bill %s is already marked as paid", bill_id)
     
     bill.is_paid = True
     
     # Create payment record
-    logger.debug(f"[MARK PAID] Creating payment record for bill {bill_id}")
+    logger.debug("[MARK PAID] Creating payment record for bill %s", bill_id)
     payment = Payment(
         bill_id=bill.id,
         amount=bill.amount,
@@ -308,12 +627,19 @@ def mark_bill_paid(bill_id):
     
     try:
         db.session.add(payment)
+        # Recurring bills come back: create the next occurrence unless it already exists
+        next_bill = rollover_bill(bill)
+        sync_bill_job(bill)
+        mark_bills_changed(user_id, [bill, next_bill] if next_bill else [bill])
         db.session.commit()
-        logger.info(f"[MARK PAID] Bill {bill_id} marked as paid with payment ID: {payment.id}")
-        logger.debug(f"[MARK PAID] Payment details - Amount: {payment.amount}, Method: {payment.payment_method}")
+        logger.info("[MARK PAID] Bill %s marked as paid with payment ID: %s", bill_id, payment.id)
+        logger.debug("[MARK PAID] Payment details - Amount: %s, Method: %s", payment.amount, payment.payment_method)
     except Exception as e:
-        logger.error(f"[MARK PAID ERROR] Failed to mark bill {bill_id} as paid: {str(e)}", exc_info=True)
+        logger.error("[MARK PAID ERROR] Failed to mark bill %s as paid: %s", bill_id, str(e), exc_info=True)
         db.session.rollback()
         return jsonify({'message': 'Failed to mark bill as paid'}), 500
     
-    return jsonify({'message': 'Bill marked as paid'}), 200
\ No newline at end of file
+    return jsonify({
+        'message': 'Bill marked as paid',
+        'next_bill_id': next_bill.id if next_bill else None
+    }), 200
\ No newline at end of file
@@ -0,0 +1,143 @@
+# change_capture.py
+#
+# Pluggable change capture for the core models, replacing the per-row logging
+# listeners that used to live in models.py. With CHANGE_CAPTURE=off (the
+# default) no listener is registered at all, so flushes pay nothing. When
+# enabled, one session-level after_flush hook collects raw change records and
+# hands them to the configured sink:
+#   table - appended to the AuditLog table in the same transaction
+#   queue - pushed onto a bounded in-memory queue drained by a background thread
+
+from sqlalchemy import event, inspect
+from models import db, User, Bill, Payment, ReminderSettings, AuditLog
+from config import Config
+from datetime import datetime
+import queue
+import threading
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+TRACKED_MODELS = (User, Bill, Payment, ReminderSettings)
+
+# Columns that must never leave the database through the audit trail
+REDACTED_COLUMNS = {'password_hash'}
+
+_change_queue = queue.Queue(maxsize=Config.CHANGE_CAPTURE_QUEUE_SIZE)
+_queue_consumers = []
+_dropped = 0
+_enabled_mode = None
+
+def _column_changes(target):
+    """New (and, when loaded, old) values of the column attributes that changed in this flush"""
+    changes = {}
+    state = inspect(target)
+    # Columns only, read through .history so no relationship or expired attribute is loaded mid-flush
+    for column_attr in state.mapper.column_attrs:
+        key = column_attr.key
+        if key in REDACTED_COLUMNS:
+            continue
+        history = state.attrs[key].history
+        if not history.added:
+            continue
+        change = {'new': history.added[0]}
+        # The old value is only known when it was loaded before the change (not expired by a commit)
+        if history.deleted:
+            change['old'] = history.deleted[0]
+        changes[key] = change
+    return changes
+
+def _collect(session):
+    """Turn the session's pending inserts, updates and deletes into plain records"""
+    records = []
+    now = datetime.utcnow()
+    for action, objects in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for target in objects:
+            if not isinstance(target, TRACKED_MODELS):
+                continue
+            changes = None
+            if action == 'update':
+                if not session.is_modified(target, include_collections=False):
+                    continue
+                changes = _column_changes(target)
+            records.append({
+                'entity': type(target).__name__,
+                'entity_id': target.id,
+                'action': action,
+                'changes': changes,
+                'created_at': now
+            })
+    return records
+
+def _write_to_table(session, records):
+    rows = [
+        dict(record, changes=json.dumps(record['changes'], default=str) if record['changes'] else None)
+        for record in records
+    ]
+    session.connection().execute(AuditLog.__table__.insert(), rows)
+
+def _write_to_queue(session, records):
+    global _dropped
+    for record in records:
+        try:
+            _change_queue.put_nowait(record)
+        except queue.Full:
+            # Never block a flush on a slow consumer
+            _dropped += 1
+
+_SINKS = {
+    'table': _write_to_table,
+    'queue': _write_to_queue
+}
+
+def add_queue_consumer(consumer):
+    """Register a callable that receives every record drained from the change queue"""
+    _queue_consumers.append(consumer)
+
+def _log_consumer(record):
+    logger.info("[CHANGE CAPTURE] %s", json.dumps(record, default=str))
+
+def _drain_queue():
+    while True:
+        record = _change_queue.get()
+        for consumer in _queue_consumers or [_log_consumer]:
+            try:
+                consumer(record)
+            except Exception as e:
+                logger.error("[CHANGE CAPTURE ERROR] Consumer failed: %s", str(e), exc_info=True)
+        _change_queue.task_done()
+
+def init_change_capture(mode=None):
+    """Register the capture hook for the configured sink; does nothing when capture is off"""
+    global _enabled_mode
+    mode = (mode or Config.CHANGE_CAPTURE).lower()
+
+    if mode == 'off':
+        logger.info("[CHANGE CAPTURE] Disabled")
+        return
+    if mode not in _SINKS:
+        raise ValueError(f"Unknown CHANGE_CAPTURE mode '{mode}', expected one of: off, {', '.join(_SINKS)}")
+    if _enabled_mode is not None:
+        return
+
+    sink = _SINKS[mode]
+
+    def _after_flush(session, flush_context):
+        records = _collect(session)
+        if records:
+            sink(session, records)
+
+    event.listen(db.session, 'after_flush', _after_flush)
+    if mode == 'queue':
+        threading.Thread(target=_drain_queue, name='change-capture', daemon=True).start()
+
+    _enabled_mode = mode
+    logger.info("[CHANGE CAPTURE] Enabled with '%s' sink", mode)
+
+def change_capture_stats():
+    return {
+        'mode': _enabled_mode or 'off',
+        'queued': _change_queue.qsize(),
+        'dropped': _dropped
+    }
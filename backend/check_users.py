@@ -19,13 +19,13 @@ def view_registered_users():
     logging.info("Starting the process to view registered users.")
     
     if not os.path.exists(DB_FILE):
-        logging.error(f"Database file '{DB_FILE}' not found.")
+        logging.error("Database file '%s' not found.", DB_FILE)
         logging.warning("Please run the main backend application (app.py) first to create the database.")
         return
 
     conn = None
     try:
-        logging.info(f"Connecting to database: {DB_FILE}")
+        logging.info("Connecting to database: %s", DB_FILE)
         conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
 
@@ -33,7 +33,7 @@ def view_registered_users():
         cursor.execute("SELECT id, name, email, phone_number, created_at FROM user")
         
         users = cursor.fetchall()
-        logging.info(f"Query finished. Found {len(users)} user(s).")
+        logging.info("Query finished. Found %s user(s).", len(users))
 
         if not users:
             logging.info("The 'user' table is empty. No users have been registered yet.")
@@ -41,7 +41,7 @@ def view_registered_users():
             print("\n--- Registered User Details ---")
             for user in users:
                 user_id, name, email, phone, created_at = user
-                logging.info(f"Processing user: Name='{name}', Email='{email}'")
+                logging.info("Processing user: Name='%s', Email='%s'", name, email)
                 print(f"\n  Name: {name}")
                 print(f"  Email: {email}")
                 print(f"  Phone: {phone}")
@@ -49,7 +49,7 @@ def view_registered_users():
                 print("  " + "-" * 20)
 
     except sqlite3.Error as e:
-        logging.error(f"A database error occurred: {e}")
+        logging.error("A database error occurred: %s", e)
     finally:
         if conn:
             logging.info("Closing database connection.")
@@ -11,9 +11,20 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///bills_reminder.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Logging (logging_setup.py): level, 'text' or 'json' lines, and whether records are
+    # written from a background thread instead of the logging thread
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+    LOG_ASYNC = os.getenv('LOG_ASYNC', 'true').lower() == 'true'
+    LOG_LIBRARY_LEVEL = os.getenv('LOG_LIBRARY_LEVEL', 'WARNING').upper()
+    
     # JWT
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-jwt-secret-key')
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=7)
+    # Short-lived access tokens, renewed with rotating refresh tokens at /api/auth/refresh
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', 15)))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_DAYS', 30)))
+    # How often each process pulls revocations made by other processes into its denylist
+    TOKEN_DENYLIST_SYNC_SECONDS = int(os.getenv('TOKEN_DENYLIST_SYNC_SECONDS', 10))
     
     # API Keys
     BLAND_AI_API_KEY = os.getenv('BLAND_AI_API_KEY')
@@ -26,6 +37,89 @@ class Config:
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads/receipts')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf'}
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 64 * 1024))  # bytes hashed and written per read
+    # Unreferenced receipt files (scans never attached to a bill, uploads whose commit failed) are kept this long
+    RECEIPT_BLOB_GRACE_SECONDS = int(os.getenv('RECEIPT_BLOB_GRACE_SECONDS', 24 * 3600))
+    
+    # Receipt previews (thumb/medium derivatives; need Pillow, and PyMuPDF for PDFs)
+    RECEIPT_PREVIEW_FORMAT = os.getenv('RECEIPT_PREVIEW_FORMAT', 'webp').lower()  # 'webp' or 'jpeg'
+    RECEIPT_PREVIEW_QUALITY = int(os.getenv('RECEIPT_PREVIEW_QUALITY', 80))
+    RECEIPT_PREVIEW_WORKERS = int(os.getenv('RECEIPT_PREVIEW_WORKERS', 2))
+    
+    # Receipt serving: 'off' streams files from Flask; 'x-accel' (nginx) or 'x-sendfile' (Apache/lighttpd)
+    # hand the transfer to the reverse proxy. For x-accel, RECEIPT_ACCEL_PREFIX must be an internal
+    # location aliased to UPLOAD_FOLDER.
+    RECEIPT_SENDFILE_MODE = os.getenv('RECEIPT_SENDFILE_MODE', 'off').lower()
+    RECEIPT_ACCEL_PREFIX = os.getenv('RECEIPT_ACCEL_PREFIX', '/protected-receipts/')
+    RECEIPT_CACHE_MAX_AGE = int(os.getenv('RECEIPT_CACHE_MAX_AGE', 365 * 24 * 3600))  # seconds, immutable files only
+    
+    # Bills list: largest page a client may request with ?limit=
+    BILLS_PAGE_MAX = int(os.getenv('BILLS_PAGE_MAX', 500))
+    
+    # Payment analytics: longest from..to range in months
+    PAYMENT_ANALYTICS_MAX_MONTHS = int(os.getenv('PAYMENT_ANALYTICS_MAX_MONTHS', 120))
+    
+    # Dashboard summary cache (entries are also invalidated by any bill write)
+    SUMMARY_CACHE_SIZE = int(os.getenv('SUMMARY_CACHE_SIZE', 10000))
+    SUMMARY_CACHE_TTL_SECONDS = int(os.getenv('SUMMARY_CACHE_TTL_SECONDS', 300))
+    
+    # Identity cache for authenticated endpoints (profile, verify-token, reminder tests)
+    IDENTITY_CACHE_SIZE = int(os.getenv('IDENTITY_CACHE_SIZE', 10000))
+    IDENTITY_CACHE_TTL_SECONDS = int(os.getenv('IDENTITY_CACHE_TTL_SECONDS', 300))
+    
+    # Bulk bill import: rows per request and rows per executemany batch
+    BULK_IMPORT_MAX_ROWS = int(os.getenv('BULK_IMPORT_MAX_ROWS', 50000))
+    BULK_IMPORT_BATCH_SIZE = int(os.getenv('BULK_IMPORT_BATCH_SIZE', 1000))
+    
+    # Recurring bills: the nightly materializer creates occurrences due within this many days
+    RECURRENCE_HORIZON_DAYS = int(os.getenv('RECURRENCE_HORIZON_DAYS', 35))
+    
+    # Reminder queue: how many due jobs the minute tick pulls per batch
+    REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', 500))
+    
+    # Overdue digest job: rows streamed from the database per chunk
+    OVERDUE_CHUNK_SIZE = int(os.getenv('OVERDUE_CHUNK_SIZE', 1000))
+    
+    # Reminder delivery workers (concurrent calls per channel)
+    DELIVERY_COMPOSE_CONCURRENCY = int(os.getenv('DELIVERY_COMPOSE_CONCURRENCY', 4))
+    DELIVERY_WHATSAPP_CONCURRENCY = int(os.getenv('DELIVERY_WHATSAPP_CONCURRENCY', 8))
+    DELIVERY_VOICE_CONCURRENCY = int(os.getenv('DELIVERY_VOICE_CONCURRENCY', 4))
+    
+    # Outbound HTTP (Twilio, Bland AI): keep-alive pools, timeouts and retries
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3.05))
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 20))
+    HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', 4))
+    HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 16))
+    HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+    HTTP_BACKOFF_FACTOR = float(os.getenv('HTTP_BACKOFF_FACTOR', 0.5))
+    
+    # Reminder messages: local templates first, Gemini variants generated in the background
+    DEFAULT_LOCALE = os.getenv('DEFAULT_LOCALE', 'en')
+    LLM_ENRICHMENT_ENABLED = os.getenv('LLM_ENRICHMENT_ENABLED', 'true').lower() == 'true' and bool(GOOGLE_API_KEY)
+    MESSAGE_CACHE_SIZE = int(os.getenv('MESSAGE_CACHE_SIZE', 10000))
+    MESSAGE_CACHE_TTL_SECONDS = int(os.getenv('MESSAGE_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+    MESSAGE_BATCH_SIZE = int(os.getenv('MESSAGE_BATCH_SIZE', 25))  # messages per Gemini prompt
+    
+    # Login/register rate limits ('<count>/<second|minute|hour|day>'), per client IP and per email.
+    # Buckets are kept in memory unless RATE_LIMIT_STORAGE_URL (redis://...) is set.
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    LOGIN_RATE_LIMIT_IP = os.getenv('LOGIN_RATE_LIMIT_IP', '20/minute')
+    LOGIN_RATE_LIMIT_EMAIL = os.getenv('LOGIN_RATE_LIMIT_EMAIL', '5/minute')
+    REGISTER_RATE_LIMIT_IP = os.getenv('REGISTER_RATE_LIMIT_IP', '5/hour')
+    RATE_LIMIT_STORAGE_URL = os.getenv('RATE_LIMIT_STORAGE_URL')
+    RATE_LIMIT_MEMORY_MAX_KEYS = int(os.getenv('RATE_LIMIT_MEMORY_MAX_KEYS', 100000))
+    # Number of reverse proxies in front of the app whose X-Forwarded-For is trusted for the client IP
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 0))
+    
+    # Password hashing: bcrypt cost, worker processes (default one per core) and the
+    # most hashes/checks allowed in flight before logins are answered with 503
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 64))
+    
+    # Change capture for User/Bill/Payment/ReminderSettings: 'off', 'table' (AuditLog) or 'queue'
+    CHANGE_CAPTURE = os.getenv('CHANGE_CAPTURE', 'off').lower()
+    CHANGE_CAPTURE_QUEUE_SIZE = int(os.getenv('CHANGE_CAPTURE_QUEUE_SIZE', 10000))
     
     # ElevenLabs (alternative voice service)
     ELEVENLABS_API_KEY = os.getenv('ELEVENLABS_API_KEY')
@@ -0,0 +1,126 @@
+# db_migrations.py
+#
+# db.create_all() only creates missing tables, so schema additions to tables
+# that already exist (new columns and indexes) are applied here, along with
+# the data moves they need. Every step is idempotent
+# and works on both SQLite and Postgres. Runs at startup from app.py, or by
+# hand with: python db_migrations.py
+
+from sqlalchemy import inspect, text
+from models import db, Bill, Receipt
+from local_storage_service import stored_file_info
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+def add_missing_columns():
+    """
+    Add model columns missing from existing tables. Only columns that are
+    nullable or carry a server default can be added this way, which is how new
+    columns on existing models are declared.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    quote = db.engine.dialect.identifier_preparer.quote
+    added = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable and column.server_default is None:
+                logger.error("[MIGRATION] Cannot add NOT NULL column %s.%s without a server default", table.name, column.name)
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            ddl = f'ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}'
+            if column.server_default is not None:
+                default = column.server_default.arg
+                # Plain string defaults are quoted the same way CREATE TABLE renders them
+                ddl += " DEFAULT '{}'".format(default.replace("'", "''")) if isinstance(default, str) else f" DEFAULT {default.text}"
+            if not column.nullable:
+                ddl += ' NOT NULL'
+            logger.info("[MIGRATION] Adding column %s.%s", table.name, column.name)
+            with db.engine.begin() as connection:
+                connection.execute(text(ddl))
+            added.append(f'{table.name}.{column.name}')
+
+    return added
+
+def create_missing_indexes():
+    """Create every index declared on the models that the database does not have yet"""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            logger.info("[MIGRATION] Creating index %s on %s", index.name, table.name)
+            index.create(bind=db.engine, checkfirst=True)
+            created.append(index.name)
+
+    return created
+
+def _split_receipt_notes(notes):
+    """
+    Receipts used to be recorded in Bill.notes as JSON ({"receipt_filename": ...},
+    with any earlier free-text notes kept under "original_notes"). Returns
+    (receipt filename, notes to keep), or (None, None) for notes in any other shape.
+    """
+    try:
+        notes_data = json.loads(notes)
+    except ValueError:
+        return None, None
+    if not isinstance(notes_data, dict) or not notes_data.get('receipt_filename'):
+        return None, None
+
+    filename = notes_data.pop('receipt_filename')
+    if set(notes_data) == {'original_notes'}:
+        return filename, notes_data['original_notes']
+    return filename, json.dumps(notes_data) if notes_data else None
+
+def migrate_receipt_notes():
+    """Move receipt filenames out of Bill.notes into Receipt rows, restoring the user's notes"""
+    bills = Bill.query.outerjoin(Receipt, Receipt.bill_id == Bill.id).filter(
+        Receipt.id.is_(None),
+        Bill.notes.like('%receipt_filename%')
+    ).all()
+
+    migrated = 0
+    for bill in bills:
+        filename, notes = _split_receipt_notes(bill.notes)
+        if filename is None:
+            continue
+        db.session.add(Receipt(bill_id=bill.id, user_id=bill.user_id, storage_key=filename, **stored_file_info(filename)))
+        bill.notes = notes
+        migrated += 1
+
+    if migrated:
+        db.session.commit()
+        logger.info("[MIGRATION] Moved %s receipts out of bill notes", migrated)
+    return migrated
+
+def run_migrations():
+    """Bring an existing database up to the current schema"""
+    logger.info("[MIGRATION] Checking database schema")
+    added = add_missing_columns()
+    created = create_missing_indexes()
+    receipts = migrate_receipt_notes()
+    logger.info("[MIGRATION] Schema up to date (%s columns added, %s indexes created, %s receipts migrated)", len(added), len(created), receipts)
+    return {'columns_added': added, 'indexes_created': created, 'receipts_migrated': receipts}
+
+if __name__ == '__main__':
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        print(run_migrations())
@@ -0,0 +1,187 @@
+# delivery_service.py
+
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from config import Config
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DeliveryRun:
+    """Collects throughput and latency figures for the deliveries enqueued by one sweep"""
+
+    def __init__(self, name, on_complete=None):
+        self.name = name
+        self.started_at = time.monotonic()
+        self.expected = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.latencies = []
+        self._closed = False
+        self._reported = False
+        self._on_complete = on_complete
+        self._lock = threading.Lock()
+
+    def expect(self, count=1):
+        with self._lock:
+            self.expected += count
+
+    def record(self, success, latency):
+        with self._lock:
+            if success:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            self.latencies.append(latency)
+        self._maybe_report()
+
+    def close(self):
+        """Mark the sweep as done enqueuing; the report is emitted once everything has finished"""
+        with self._lock:
+            self._closed = True
+        self._maybe_report()
+
+    def _maybe_report(self):
+        with self._lock:
+            done = self.succeeded + self.failed
+            if not self._closed or self._reported or done < self.expected:
+                return
+            self._reported = True
+        report = self.report()
+        logger.info(
+            "[DELIVERY RUN] %s: %s deliveries (%s ok, %s failed) in %ss, %s/s, latency p50 %ss p95 %ss max %ss",
+            self.name, report['deliveries'], report['succeeded'], report['failed'], report['elapsed_seconds'],
+            report['throughput_per_second'], report['latency_p50'], report['latency_p95'], report['latency_max']
+        )
+        if self._on_complete:
+            self._on_complete(report)
+
+    def report(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            done = self.succeeded + self.failed
+            elapsed = time.monotonic() - self.started_at
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+
+        return {
+            'run': self.name,
+            'deliveries': done,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'elapsed_seconds': round(elapsed, 3),
+            'throughput_per_second': round(done / elapsed, 2) if elapsed > 0 else 0.0,
+            'latency_p50': percentile(0.50),
+            'latency_p95': percentile(0.95),
+            'latency_max': round(latencies[-1], 3) if latencies else 0.0
+        }
+
+class DeliveryPool:
+    """
+    Bounded executor for outbound reminders. Every channel gets its own worker
+    pool, so a slow provider cannot starve the others and the number of
+    concurrent calls per provider never exceeds its configured limit.
+    """
+
+    def __init__(self, channel_limits):
+        self._limits = dict(channel_limits)
+        self._executors = {
+            channel: ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f'delivery-{channel}')
+            for channel, limit in channel_limits.items()
+        }
+        self._pending = {channel: 0 for channel in channel_limits}
+        self._pending_lock = threading.Lock()
+        self.recent_runs = deque(maxlen=20)
+        logger.info("[DELIVERY POOL] Started with channel limits: %s", channel_limits)
+
+    def start_run(self, name):
+        return DeliveryRun(name, on_complete=self.recent_runs.append)
+
+    def submit(self, channel, func, *args):
+        with self._pending_lock:
+            self._pending[channel] += 1
+        future = self._executors[channel].submit(func, *args)
+        future.add_done_callback(lambda _: self._task_done(channel))
+        return future
+
+    def _task_done(self, channel):
+        with self._pending_lock:
+            self._pending[channel] -= 1
+
+    def _submit_delivery(self, run, channel, sender, args, enqueued_at):
+        def _task():
+            try:
+                result = sender(*args)
+                success = bool(result and result.get('success'))
+            except Exception as e:
+                logger.error("[DELIVERY ERROR] %s delivery failed: %s", channel, str(e), exc_info=True)
+                success = False
+            run.record(success, time.monotonic() - enqueued_at)
+
+        return self.submit(channel, _task)
+
+    def deliver(self, run, channel, sender, *args):
+        """Queue one provider call; the sender is expected to return a {'success': bool} dict"""
+        run.expect()
+        return self._submit_delivery(run, channel, sender, args, time.monotonic())
+
+    def deliver_composed(self, run, compose_many, items):
+        """
+        Compose the messages for a batch of (payload, deliveries) items with one
+        call on the compose workers, then fan each message out to its
+        (channel, sender, recipient) deliveries without blocking the caller.
+        `compose_many` gets the list of payloads and returns one message each.
+        """
+        if not items:
+            return None
+        run.expect(sum(len(deliveries) for _, deliveries in items))
+        enqueued_at = time.monotonic()
+
+        def _fan_out(future):
+            try:
+                messages = future.result()
+            except Exception as e:
+                logger.error("[DELIVERY ERROR] Message composition failed: %s", str(e), exc_info=True)
+                for _, deliveries in items:
+                    for _ in deliveries:
+                        run.record(False, time.monotonic() - enqueued_at)
+                return
+            for message, (_, deliveries) in zip(messages, items):
+                for channel, sender, recipient in deliveries:
+                    self._submit_delivery(run, channel, sender, (recipient, message), enqueued_at)
+
+        future = self.submit('compose', compose_many, [payload for payload, _ in items])
+        future.add_done_callback(_fan_out)
+        return future
+
+    def stats(self):
+        with self._pending_lock:
+            pending = dict(self._pending)
+        return {
+            'channels': {
+                channel: {'workers': limit, 'pending': pending[channel]}
+                for channel, limit in self._limits.items()
+            },
+            'recent_runs': list(self.recent_runs)
+        }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_delivery_pool():
+    """Return the process-wide delivery pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = DeliveryPool({
+                    'compose': Config.DELIVERY_COMPOSE_CONCURRENCY,
+                    'whatsapp': Config.DELIVERY_WHATSAPP_CONCURRENCY,
+                    'voice': Config.DELIVERY_VOICE_CONCURRENCY
+                })
+    return _pool
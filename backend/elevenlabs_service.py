@@ -7,8 +7,6 @@ from dotenv import load_dotenv
 import logging
 
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 # Load environment variables from a .env file
@@ -17,30 +15,30 @@ load_dotenv()
 
 # Set your ElevenLabs API key
 api_key = os.getenv("ELEVENLABS_API_KEY")
-logger.info(f"[ELEVENLABS INIT] API key loaded: {'*' * 30 + api_key[-4:] if api_key else 'NOT SET'}")
+logger.info("[ELEVENLABS INIT] API key loaded: %s", '*' * 30 + api_key[-4:] if api_key else 'NOT SET')
 
 try:
     # Initialize client with API key
     client = ElevenLabs(api_key=api_key)
     logger.info("[ELEVENLABS INIT] Client successfully initialized")
 except Exception as e:
-    logger.error(f"[ELEVENLABS INIT ERROR] Failed to initialize client: {str(e)}")
+    logger.error("[ELEVENLABS INIT ERROR] Failed to initialize client: %s", str(e))
 
 def generate_voice_audio(text: str, voice_id: str = None):
     """Generate voice audio using ElevenLabs API."""
     logger.info("[ELEVENLABS GENERATE] Starting audio generation")
-    logger.debug(f"[ELEVENLABS GENERATE] Text length: {len(text)} characters")
-    logger.debug(f"[ELEVENLABS GENERATE] Text preview: {text[:100]}...")
-    logger.debug(f"[ELEVENLABS GENERATE] Voice ID provided: {voice_id}")
+    logger.debug("[ELEVENLABS GENERATE] Text length: %s characters", len(text))
+    logger.debug("[ELEVENLABS GENERATE] Text preview: %s...", text[:100])
+    logger.debug("[ELEVENLABS GENERATE] Voice ID provided: %s", voice_id)
     
     try:
         # Use default voice ID if none is provided
         if not voice_id:
             default_voice_id = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
             voice_id = default_voice_id
-            logger.info(f"[ELEVENLABS GENERATE] Using default voice ID: {voice_id}")
+            logger.info("[ELEVENLABS GENERATE] Using default voice ID: %s", voice_id)
         else:
-            logger.info(f"[ELEVENLABS GENERATE] Using provided voice ID: {voice_id}")
+            logger.info("[ELEVENLABS GENERATE] Using provided voice ID: %s", voice_id)
         
         # Log voice settings
         voice_settings = VoiceSettings(
@@ -49,7 +47,7 @@ def generate_voice_audio(text: str, voice_id: str = None):
             style=0.5,
             use_speaker_boost=True
         )
-        logger.debug(f"[ELEVENLABS GENERATE] Voice settings - Stability: 0.5, Similarity: 0.75, Style: 0.5, Speaker boost: True")
+        logger.debug("[ELEVENLABS GENERATE] Voice settings - Stability: 0.5, Similarity: 0.75, Style: 0.5, Speaker boost: True")
         
         # Generate audio using new client method
         logger.info("[ELEVENLABS GENERATE] Calling ElevenLabs API to generate audio")
@@ -65,7 +63,7 @@ def generate_voice_audio(text: str, voice_id: str = None):
         logger.debug("[ELEVENLABS GENERATE] Creating temporary file for audio")
         with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmp_file:
             temp_path = tmp_file.name
-            logger.debug(f"[ELEVENLABS GENERATE] Temporary file path: {temp_path}")
+            logger.debug("[ELEVENLABS GENERATE] Temporary file path: %s", temp_path)
             
             logger.info("[ELEVENLABS GENERATE] Saving audio to temporary file")
             save(audio, temp_path)
@@ -73,16 +71,15 @@ def generate_voice_audio(text: str, voice_id: str = None):
             # Verify file was created and get size
             if os.path.exists(temp_path):
                 file_size = os.path.getsize(temp_path)
-                logger.info(f"[ELEVENLABS GENERATE] Audio file saved successfully. Size: {file_size} bytes")
+                logger.info("[ELEVENLABS GENERATE] Audio file saved successfully. Size: %s bytes", file_size)
             else:
-                logger.error(f"[ELEVENLABS GENERATE] Audio file not found after save: {temp_path}")
+                logger.error("[ELEVENLABS GENERATE] Audio file not found after save: %s", temp_path)
             
             return {"success": True, "audio_path": temp_path}
             
     except Exception as e:
-        logger.error(f"[ELEVENLABS GENERATE ERROR] Failed to generate audio: {str(e)}", exc_info=True)
-        logger.debug(f"[ELEVENLABS GENERATE ERROR] Error type: {type(e).__name__}")
-        print(f"Error generating ElevenLabs audio: {e}")
+        logger.error("[ELEVENLABS GENERATE ERROR] Failed to generate audio: %s", str(e), exc_info=True)
+        logger.debug("[ELEVENLABS GENERATE ERROR] Error type: %s", type(e).__name__)
         return {"success": False, "error": str(e)}
 
 def get_available_voices():
@@ -95,7 +92,7 @@ def get_available_voices():
         voices_response = client.voices.search()
         available_voices = voices_response.voices
         
-        logger.info(f"[ELEVENLABS VOICES] Retrieved {len(available_voices)} voices")
+        logger.info("[ELEVENLABS VOICES] Retrieved %s voices", len(available_voices))
         
         voice_list = []
         for voice in available_voices:
@@ -105,21 +102,20 @@ def get_available_voices():
                 "category": voice.category,
             }
             voice_list.append(voice_data)
-            logger.debug(f"[ELEVENLABS VOICES] Voice: {voice.name} (ID: {voice.voice_id}, Category: {voice.category})")
+            logger.debug("[ELEVENLABS VOICES] Voice: %s (ID: %s, Category: %s)", voice.name, voice.voice_id, voice.category)
         
-        logger.info(f"[ELEVENLABS VOICES] Successfully processed {len(voice_list)} voices")
+        logger.info("[ELEVENLABS VOICES] Successfully processed %s voices", len(voice_list))
         
         # Log categories summary
         categories = {}
         for v in voice_list:
             cat = v.get('category', 'unknown')
             categories[cat] = categories.get(cat, 0) + 1
-        logger.debug(f"[ELEVENLABS VOICES] Voice categories: {categories}")
+        logger.debug("[ELEVENLABS VOICES] Voice categories: %s", categories)
         
         return {"success": True, "voices": voice_list}
         
     except Exception as e:
-        logger.error(f"[ELEVENLABS VOICES ERROR] Failed to get voices: {str(e)}", exc_info=True)
-        logger.debug(f"[ELEVENLABS VOICES ERROR] Error type: {type(e).__name__}")
-        print(f"Error getting ElevenLabs voices: {e}")
+        logger.error("[ELEVENLABS VOICES ERROR] Failed to get voices: %s", str(e), exc_info=True)
+        logger.debug("[ELEVENLABS VOICES ERROR] Error type: %s", type(e).__name__)
         return {"success": False, "error": str(e)}
\ No newline at end of file
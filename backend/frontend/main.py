@@ -180,25 +180,81 @@ class APIManager:
         self.base_url = "http://127.0.0.1:5000/api"  # For Android emulator
         # self.base_url = "http://192.168.1.100:5000/api"  # Replace with your IP
         self.token = None
+        self.refresh_token = None
+        self.bills_etag = None  # validator of the last bills list received, for If-None-Match
+        self.refresh_lock = threading.Lock()
         self.store = JsonStore('bills_reminder.json')
         self.load_token()
     
     def load_token(self):
-        """Load saved token from storage"""
+        """Load saved tokens from storage"""
         if self.store.exists('auth'):
-            self.token = self.store.get('auth')['token']
+            auth = self.store.get('auth')
+            self.token = auth['token']
+            self.refresh_token = auth.get('refresh_token')
     
-    def save_token(self, token):
-        """Save token to storage"""
+    def save_token(self, token, refresh_token=None):
+        """Save tokens to storage"""
         self.token = token
-        self.store.put('auth', token=token)
+        self.refresh_token = refresh_token
+        self.bills_etag = None
+        self.store.put('auth', token=token, refresh_token=refresh_token)
     
     def clear_token(self):
-        """Clear saved token"""
+        """Clear saved tokens"""
         self.token = None
+        self.refresh_token = None
+        self.bills_etag = None
         if self.store.exists('auth'):
             self.store.delete('auth')
     
+    def refresh_access_token(self, expired_token):
+        """
+        Trade the refresh token for a new pair. Returns True when a usable access
+        token is available. Concurrent 401s share one refresh: a refresh token
+        works only once, so a second exchange would end the session.
+        """
+        with self.refresh_lock:
+            if self.token != expired_token:
+                # Another request refreshed while this one waited
+                return self.token is not None
+            if not self.refresh_token:
+                return False
+            response = requests.post(
+                f"{self.base_url}/auth/refresh",
+                headers={'Authorization': f'Bearer {self.refresh_token}'}
+            )
+            if response.status_code != 200:
+                self.clear_token()
+                return False
+            data = response.json()
+            # Keep the bills validator; the user has not changed
+            bills_etag = self.bills_etag
+            self.save_token(data['token'], data['refresh_token'])
+            self.bills_etag = bills_etag
+            return True
+    
+    def request(self, method, path, headers=None, **kwargs):
+        """Authenticated request; on 401 the access token is refreshed once and the request retried"""
+        token = self.token
+        response = requests.request(method, f"{self.base_url}{path}", headers=dict(self.get_headers(), **(headers or {})), **kwargs)
+        if response.status_code == 401 and self.refresh_access_token(token):
+            response = requests.request(method, f"{self.base_url}{path}", headers=dict(self.get_headers(), **(headers or {})), **kwargs)
+        return response
+    
+    def logout(self):
+        """Revoke the session on the server (best effort) and forget the tokens"""
+        # The refresh token outlives the access token, so it is the one sure to still be valid
+        token = self.refresh_token or self.token
+        self.clear_token()
+        def _logout():
+            try:
+                requests.post(f"{self.base_url}/auth/logout", headers={'Authorization': f'Bearer {token}'})
+            except Exception:
+                pass
+        if token:
+            threading.Thread(target=_logout).start()
+    
     def get_headers(self):
         """Get headers with authorization"""
         headers = {'Content-Type': 'application/json'}
@@ -242,13 +298,15 @@ class APIManager:
         threading.Thread(target=_login).start()
     
     def get_bills(self, callback):
-        """Get all bills"""
+        """Get all bills; answers 304 when nothing changed since the last successful load"""
         def _get_bills():
             try:
-                response = requests.get(
-                    f"{self.base_url}/bills",
-                    headers=self.get_headers()
-                )
+                headers = {}
+                if self.bills_etag:
+                    headers['If-None-Match'] = self.bills_etag
+                response = self.request('GET', '/bills', headers=headers)
+                if response.status_code == 200:
+                    self.bills_etag = response.headers.get('ETag')
                 Clock.schedule_once(lambda dt: callback(response), 0)
             except Exception as e:
                 Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
@@ -259,11 +317,7 @@ class APIManager:
         """Create new bill"""
         def _create_bill():
             try:
-                response = requests.post(
-                    f"{self.base_url}/bills",
-                    json=bill_data,
-                    headers=self.get_headers()
-                )
+                response = self.request('POST', '/bills', json=bill_data)
                 Clock.schedule_once(lambda dt: callback(response), 0)
             except Exception as e:
                 Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
@@ -274,11 +328,7 @@ class APIManager:
         """Update existing bill"""
         def _update_bill():
             try:
-                response = requests.put(
-                    f"{self.base_url}/bills/{bill_id}",
-                    json=bill_data,
-                    headers=self.get_headers()
-                )
+                response = self.request('PUT', f'/bills/{bill_id}', json=bill_data)
                 Clock.schedule_once(lambda dt: callback(response), 0)
             except Exception as e:
                 Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
@@ -289,10 +339,7 @@ class APIManager:
         """Delete bill"""
         def _delete_bill():
             try:
-                response = requests.delete(
-                    f"{self.base_url}/bills/{bill_id}",
-                    headers=self.get_headers()
-                )
+                response = self.request('DELETE', f'/bills/{bill_id}')
                 Clock.schedule_once(lambda dt: callback(response), 0)
             except Exception as e:
                 Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
@@ -303,10 +350,7 @@ class APIManager:
         """Mark bill as paid"""
         def _mark_paid():
             try:
-                response = requests.post(
-                    f"{self.base_url}/bills/{bill_id}/pay",
-                    headers=self.get_headers()
-                )
+                response = self.request('POST', f'/bills/{bill_id}/pay')
                 Clock.schedule_once(lambda dt: callback(response), 0)
             except Exception as e:
                 Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
@@ -317,11 +361,7 @@ class APIManager:
         """Send test reminder"""
         def _send_reminder():
             try:
-                response = requests.post(
-                    f"{self.base_url}/reminders/test",
-                    json={'type': reminder_type},
-                    headers=self.get_headers()
-                )
+                response = self.request('POST', '/reminders/test', json={'type': reminder_type})
                 Clock.schedule_once(lambda dt: callback(response), 0)
             except Exception as e:
                 Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
@@ -332,10 +372,7 @@ class APIManager:
         """Get reminder settings"""
         def _get_settings():
             try:
-                response = requests.get(
-                    f"{self.base_url}/reminders/settings",
-                    headers=self.get_headers()
-                )
+                response = self.request('GET', '/reminders/settings')
                 Clock.schedule_once(lambda dt: callback(response), 0)
             except Exception as e:
                 Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
@@ -346,11 +383,7 @@ class APIManager:
         """Update reminder settings"""
         def _update_settings():
             try:
-                response = requests.put(
-                    f"{self.base_url}/reminders/settings",
-                    json=settings,
-                    headers=self.get_headers()
-                )
+                response = self.request('PUT', '/reminders/settings', json=settings)
                 Clock.schedule_once(lambda dt: callback(response), 0)
             except Exception as e:
                 Clock.schedule_once(lambda dt, err=str(e): callback(None, err), 0)
@@ -402,6 +435,10 @@ class DashboardScreen(Screen):
             self.show_error("Failed to load bills")
             return
         
+        if response is not None and response.status_code == 304:
+            # Bills unchanged since the last load; the list on screen is current
+            return
+        
         if response and response.status_code == 200:
             self.bills_data = response.json()
             self.update_bills_display()
@@ -675,7 +712,7 @@ class SettingsScreen(Screen):
     def logout(self):
         """Logout user"""
         app = App.get_running_app()
-        app.api.clear_token()
+        app.api.logout()
         app.root.current = 'login'
 
 class BillsReminderApp(App):
@@ -728,7 +765,7 @@ class BillsReminderApp(App):
         
         if response and response.status_code == 200:
             data = response.json()
-            self.api.save_token(data['token'])
+            self.api.save_token(data['token'], data.get('refresh_token'))
             self.root.current = 'dashboard'
         else:
             self.show_popup('Error', 'Invalid credentials')
@@ -749,7 +786,7 @@ class BillsReminderApp(App):
         
         if response and response.status_code == 201:
             data = response.json()
-            self.api.save_token(data['token'])
+            self.api.save_token(data['token'], data.get('refresh_token'))
             self.root.current = 'dashboard'
         elif response and response.status_code == 409:
             self.show_popup('Error', 'Email already registered')
@@ -0,0 +1,129 @@
+# http_transport.py
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import Config
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeout applied to every outbound integration call
+TIMEOUT = (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+
+_sessions = {}
+_adapters = {}
+_counters = {}
+_lock = threading.Lock()
+
+# Statuses retried for idempotent requests; a POST is only retried when it was throttled
+RETRY_STATUSES = (429, 503)
+POST_RETRY_STATUSES = (429,)
+
+class _ProviderRetry(Retry):
+    """Retry that never repeats a POST the provider may have acted on"""
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method and method.upper() == 'POST' and status_code not in POST_RETRY_STATUSES:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+def _build_retry():
+    """
+    Retry connection failures and throttling responses with exponential backoff.
+    Read errors are not retried: the provider may already have queued the
+    message or call, and a retry would send it twice. For the same reason a
+    POST answered with 503 (which may have been processed) is not retried;
+    429 means it was refused, so that one is.
+    """
+    return _ProviderRetry(
+        total=Config.HTTP_MAX_RETRIES,
+        connect=Config.HTTP_MAX_RETRIES,
+        read=0,
+        status=Config.HTTP_MAX_RETRIES,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({'GET', 'POST', 'DELETE'}),
+        backoff_factor=Config.HTTP_BACKOFF_FACTOR,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+
+def _track(name):
+    """Response hook that counts requests and accumulates latency per integration"""
+    def _hook(response, *args, **kwargs):
+        with _lock:
+            counters = _counters[name]
+            counters['requests'] += 1
+            counters['total_seconds'] += response.elapsed.total_seconds()
+            if response.status_code >= 400:
+                counters['errors'] += 1
+        return response
+    return _hook
+
+def get_session(name):
+    """Return the long-lived keep-alive session for an integration, creating it on first use"""
+    session = _sessions.get(name)
+    if session is not None:
+        return session
+
+    with _lock:
+        if name not in _sessions:
+            adapter = HTTPAdapter(
+                pool_connections=Config.HTTP_POOL_CONNECTIONS,
+                pool_maxsize=Config.HTTP_POOL_MAXSIZE,
+                max_retries=_build_retry()
+            )
+            session = Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.hooks['response'].append(_track(name))
+
+            _adapters[name] = adapter
+            _counters[name] = {'requests': 0, 'errors': 0, 'total_seconds': 0.0, 'created_at': time.time()}
+            _sessions[name] = session
+            logger.info("[HTTP TRANSPORT] Created pooled session '%s' (pool size %s, timeout %s)", name, Config.HTTP_POOL_MAXSIZE, TIMEOUT)
+    return _sessions[name]
+
+def get_twilio_http_client():
+    """Twilio HTTP client that sends through the shared pooled 'twilio' session"""
+    from twilio.http.http_client import TwilioHttpClient
+
+    http_client = TwilioHttpClient(pool_connections=True, timeout=Config.HTTP_READ_TIMEOUT)
+    http_client.session = get_session('twilio')
+    # requests accepts a (connect, read) tuple; Twilio only validates the constructor argument
+    http_client.timeout = TIMEOUT
+    return http_client
+
+def transport_stats():
+    """Request counters and connection pool usage for every integration session"""
+    stats = {}
+    with _lock:
+        items = [(name, _adapters[name], dict(_counters[name])) for name in _sessions]
+
+    for name, adapter, counters in items:
+        pools = []
+        manager = adapter.poolmanager
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            # urllib3 pre-fills the queue with None placeholders; only real connections are idle ones
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool is not None else 0
+            pools.append({
+                'host': pool.host,
+                'port': pool.port,
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle_connections': idle,
+                'max_size': pool.pool.maxsize if pool.pool is not None else 0
+            })
+        requests_made = counters['requests']
+        stats[name] = {
+            'requests': requests_made,
+            'errors': counters['errors'],
+            'avg_latency_seconds': round(counters['total_seconds'] / requests_made, 3) if requests_made else 0.0,
+            'pools': pools
+        }
+    return stats
@@ -0,0 +1,52 @@
+# identity.py
+#
+# Per-process cache of users' identity fields (id, email, name, phone number,
+# creation time), read by the jwt_required endpoints that only need to know who
+# the caller is: profile, verify-token and the reminder test/send endpoints.
+# Entries live for IDENTITY_CACHE_TTL_SECONDS. Writes in this process go
+# through remember_identity() after their commit, so they are visible at once;
+# other processes pick them up when their entry expires. Logout evicts the
+# user's entry with forget_identity(); so must anything that deletes a user.
+
+from models import db, User
+from cache import TTLCache
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_COLUMNS = (User.id, User.email, User.name, User.phone_number, User.created_at)
+
+_identity_cache = TTLCache(Config.IDENTITY_CACHE_SIZE, Config.IDENTITY_CACHE_TTL_SECONDS)
+
+def _identity(user):
+    return {
+        'id': user.id,
+        'email': user.email,
+        'name': user.name,
+        'phone_number': user.phone_number,
+        'created_at': user.created_at.isoformat() if user.created_at else None
+    }
+
+def get_identity(user_id):
+    """Identity fields of a user as a dict, or None if there is no such user"""
+    identity = _identity_cache.get(user_id)
+    if identity is None:
+        row = db.session.query(*IDENTITY_COLUMNS).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        identity = _identity(row)
+        _identity_cache.set(user_id, identity)
+        logger.debug("[IDENTITY] Loaded user %s into the cache", user_id)
+    # Callers get their own copy; the cached dict is shared between requests
+    return dict(identity)
+
+def remember_identity(user):
+    """Write-through: store a just-committed user's current identity"""
+    _identity_cache.set(user.id, _identity(user))
+
+def forget_identity(user_id):
+    _identity_cache.pop(user_id)
+
+def identity_cache_stats():
+    return _identity_cache.stats()
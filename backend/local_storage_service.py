@@ -1,132 +1,289 @@
 import os
+import re
 import uuid
-from datetime import datetime
+import hashlib
+import mimetypes
+from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
+from sqlalchemy import func, update, delete
+from sqlalchemy.exc import IntegrityError
 from flask import send_file, current_app
+from models import db, ReceiptBlob, ScannedReceipt
+from config import Config
 import shutil
+import time
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Create uploads directory if it doesn't exist
-UPLOAD_FOLDER = 'uploads/receipts'
+# Create uploads directory if it doesn't exist. From Config, so the X-Accel/X-Sendfile
+# paths handed to the proxy (RECEIPT_ACCEL_PREFIX aliases this folder) match the app's
+UPLOAD_FOLDER = Config.UPLOAD_FOLDER
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf'}
 
-logger.info(f"[STORAGE CONFIG] Upload folder: {UPLOAD_FOLDER}")
-logger.info(f"[STORAGE CONFIG] Allowed extensions: {ALLOWED_EXTENSIONS}")
+# Content-addressed store: blobs/<first two hex digits>/<sha256>.<ext>, one file per distinct content.
+# Uploads are staged in tmp/ on the same filesystem so they can be moved into place atomically.
+BLOB_FOLDER = os.path.join(UPLOAD_FOLDER, 'blobs')
+TMP_FOLDER = os.path.join(UPLOAD_FOLDER, 'tmp')
+
+# Logical receipt names handed to clients: <user_id>/<sha256>.<ext>
+CONTENT_ADDRESSED_NAME = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]+$')
+
+logger.info("[STORAGE CONFIG] Upload folder: %s", UPLOAD_FOLDER)
+logger.info("[STORAGE CONFIG] Allowed extensions: %s", ALLOWED_EXTENSIONS)
 
 def init_storage():
     """Initialize local storage directories"""
-    logger.info(f"[INIT STORAGE] Initializing storage directory: {UPLOAD_FOLDER}")
+    logger.info("[INIT STORAGE] Initializing storage directory: %s", UPLOAD_FOLDER)
     try:
         os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-        logger.debug(f"[INIT STORAGE] Directory created/verified: {os.path.abspath(UPLOAD_FOLDER)}")
-        logger.debug(f"[INIT STORAGE] Directory exists: {os.path.exists(UPLOAD_FOLDER)}")
-        logger.debug(f"[INIT STORAGE] Directory permissions: {oct(os.stat(UPLOAD_FOLDER).st_mode)[-3:]}")
+        os.makedirs(TMP_FOLDER, exist_ok=True)
+        # All 256 shard directories up front, so uploads never have to create directories
+        for shard in range(256):
+            os.makedirs(os.path.join(BLOB_FOLDER, f'{shard:02x}'), exist_ok=True)
+        logger.debug("[INIT STORAGE] Directory created/verified: %s", os.path.abspath(UPLOAD_FOLDER))
+        logger.debug("[INIT STORAGE] Directory exists: %s", os.path.exists(UPLOAD_FOLDER))
+        logger.debug("[INIT STORAGE] Directory permissions: %s", oct(os.stat(UPLOAD_FOLDER).st_mode)[-3:])
     except Exception as e:
-        logger.error(f"[INIT STORAGE ERROR] Failed to create directory: {str(e)}", exc_info=True)
+        logger.error("[INIT STORAGE ERROR] Failed to create directory: %s", str(e), exc_info=True)
         raise
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
-    logger.debug(f"[FILE CHECK] Checking file: {filename}")
+    logger.debug("[FILE CHECK] Checking file: %s", filename)
     
     has_extension = '.' in filename
     if not has_extension:
-        logger.warning(f"[FILE CHECK] File has no extension: {filename}")
+        logger.warning("[FILE CHECK] File has no extension: %s", filename)
         return False
     
     extension = filename.rsplit('.', 1)[1].lower()
     is_allowed = extension in ALLOWED_EXTENSIONS
     
-    logger.debug(f"[FILE CHECK] Extension: {extension}, Allowed: {is_allowed}")
+    logger.debug("[FILE CHECK] Extension: %s, Allowed: %s", extension, is_allowed)
     return has_extension and is_allowed
 
-def upload_receipt_to_local(file, user_id):
-    """Upload receipt image to local storage"""
-    logger.info(f"[UPLOAD] Starting upload for user: {user_id}")
-    logger.debug(f"[UPLOAD] Original filename: {file.filename}")
+def blob_path(sha256, extension):
+    """Location of a content-addressed blob on disk"""
+    return os.path.join(BLOB_FOLDER, sha256[:2], f"{sha256}.{extension}")
+
+def resolve_receipt_path(filename):
+    """Map a logical receipt name (<user_id>/<name>) to its file: a shared blob, or a legacy per-user file"""
+    name = filename.rsplit('/', 1)[-1]
+    if CONTENT_ADDRESSED_NAME.match(name):
+        sha256, extension = name.split('.', 1)
+        return blob_path(sha256, extension)
+    return os.path.join(UPLOAD_FOLDER, filename)
+
+def _stream_to_temp(file):
+    """Copy an upload to a temp file in fixed-size chunks, hashing on the fly. Returns (path, sha256, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    temp_path = os.path.join(TMP_FOLDER, f"{uuid.uuid4()}.part")
+    try:
+        with open(temp_path, 'wb') as out:
+            while True:
+                chunk = file.stream.read(Config.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return temp_path, digest.hexdigest(), size
+
+def upload_receipt_to_local(file, user_id, take_reference=True):
+    """
+    Store an uploaded receipt, keeping identical content only once. The upload
+    is streamed to a temp file while its SHA-256 is computed; if a blob with
+    that hash already exists the temp file is dropped and the blob's refcount
+    goes up, otherwise the temp file becomes the blob. With take_reference=False
+    (files no receipt owns yet, e.g. scans) the refcount is left alone and the
+    blob lives for the GC grace period unless something references it. The
+    caller commits.
+    """
+    logger.info("[UPLOAD] Starting upload for user: %s", user_id)
+    logger.debug("[UPLOAD] Original filename: %s", file.filename)
     
     try:
-        # Initialize storage
-        init_storage()
-        
         # Check if file is allowed
         if not allowed_file(file.filename):
-            logger.warning(f"[UPLOAD] File type not allowed: {file.filename}")
+            logger.warning("[UPLOAD] File type not allowed: %s", file.filename)
             return {
                 "success": False, 
                 "error": "File type not allowed. Allowed types: " + ", ".join(ALLOWED_EXTENSIONS)
             }
         
-        # Create user directory if it doesn't exist
-        user_folder = os.path.join(UPLOAD_FOLDER, str(user_id))
-        logger.info(f"[UPLOAD] Creating user folder: {user_folder}")
-        
-        try:
-            os.makedirs(user_folder, exist_ok=True)
-            logger.debug(f"[UPLOAD] User folder created/verified: {os.path.abspath(user_folder)}")
-        except Exception as e:
-            logger.error(f"[UPLOAD ERROR] Failed to create user folder: {str(e)}")
-            raise
-        
-        # Generate unique filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        original_filename = secure_filename(file.filename)
-        file_extension = original_filename.rsplit('.', 1)[1].lower()
-        unique_id = str(uuid.uuid4())
-        filename = f"{timestamp}_{unique_id}.{file_extension}"
+        file_extension = secure_filename(file.filename).rsplit('.', 1)[1].lower()
+        temp_path, sha256, file_size = _stream_to_temp(file)
+        logger.debug("[UPLOAD] Received %s bytes, sha256: %s", file_size, sha256)
         
-        logger.debug(f"[UPLOAD] Generated filename: {filename}")
-        logger.debug(f"[UPLOAD] Timestamp: {timestamp}, UUID: {unique_id}, Extension: {file_extension}")
-        
-        # Full path for the file
-        file_path = os.path.join(user_folder, filename)
-        logger.info(f"[UPLOAD] Saving file to: {file_path}")
-        
-        # Save file
-        try:
-            file.save(file_path)
-            file_size = os.path.getsize(file_path)
-            logger.info(f"[UPLOAD] File saved successfully. Size: {file_size} bytes")
-            logger.debug(f"[UPLOAD] File exists: {os.path.exists(file_path)}")
-        except Exception as e:
-            logger.error(f"[UPLOAD ERROR] Failed to save file: {str(e)}", exc_info=True)
-            raise
+        delta = 1 if take_reference else 0
+        # The hash is the primary key, so an identical upload is found (and referenced) by one UPDATE
+        if _reference_blob(sha256, delta):
+            os.remove(temp_path)
+            logger.info("[UPLOAD] Identical receipt already stored")
+            logger.debug("[UPLOAD] Deduplicated against blob %s", sha256)
+        else:
+            # The file lands before the caller commits; if that commit fails, the GC's orphan sweep removes it
+            new_path = blob_path(sha256, file_extension)
+            os.replace(temp_path, new_path)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(ReceiptBlob(sha256=sha256, extension=file_extension, size=file_size, refcount=delta))
+                logger.info("[UPLOAD] File saved successfully. Size: %s bytes", file_size)
+            except IntegrityError:
+                # A concurrent first upload of the same content created the row; reference that one
+                _reference_blob(sha256, delta)
+                logger.info("[UPLOAD] Identical receipt stored concurrently")
         
-        # Generate URL path (relative path that will be used to retrieve the file)
+        # The logical name keeps the owner in the path; the blob keeps the extension of its first upload
+        extension = db.session.query(ReceiptBlob.extension).filter_by(sha256=sha256).scalar()
+        if extension != file_extension and os.path.exists(blob_path(sha256, file_extension)):
+            os.remove(blob_path(sha256, file_extension))
+        filename = f"{sha256}.{extension}"
         url_path = f"/api/receipts/view/{user_id}/{filename}"
         stored_filename = f"{user_id}/{filename}"
         
-        logger.info(f"[UPLOAD] Upload successful - Stored as: {stored_filename}")
-        logger.debug(f"[UPLOAD] URL path: {url_path}")
+        logger.info("[UPLOAD] Upload successful - Stored as: %s", stored_filename)
+        logger.debug("[UPLOAD] URL path: %s", url_path)
         
         return {
             "success": True,
             "filename": stored_filename,
             "url": url_path,
-            "full_path": file_path
+            "full_path": blob_path(sha256, extension),
+            "sha256": sha256,
+            "extension": extension,
+            "size": file_size,
+            "mime_type": mimetypes.guess_type(filename)[0] or 'application/octet-stream'
         }
         
     except Exception as e:
-        logger.error(f"[UPLOAD ERROR] Upload failed: {str(e)}", exc_info=True)
+        logger.error("[UPLOAD ERROR] Upload failed: %s", str(e), exc_info=True)
         return {"success": False, "error": str(e)}
 
+def _reference_blob(sha256, delta):
+    """Atomically add delta references to an existing blob and mark it used; False if there is no such blob"""
+    result = db.session.execute(
+        update(ReceiptBlob)
+        .where(ReceiptBlob.sha256 == sha256)
+        .values(refcount=ReceiptBlob.refcount + delta, touched_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+def _remove_blob_files(shard, sha256):
+    """Delete a blob and any derivatives cached next to it (<sha256>.<size>.<ext>)"""
+    for name in os.listdir(shard):
+        if name.startswith(f"{sha256}."):
+            os.remove(os.path.join(shard, name))
+
+def _purge_orphan_files(cutoff_timestamp):
+    """Delete blob files that have no ReceiptBlob row (their upload's commit failed) modified before the cutoff"""
+    removed = 0
+    if not os.path.isdir(BLOB_FOLDER):
+        return removed
+    for shard_name in sorted(os.listdir(BLOB_FOLDER)):
+        shard = os.path.join(BLOB_FOLDER, shard_name)
+        if not os.path.isdir(shard):
+            continue
+        on_disk = {}
+        for name in os.listdir(shard):
+            sha256 = name.split('.', 1)[0]
+            path = os.path.join(shard, name)
+            on_disk[sha256] = max(on_disk.get(sha256, 0), os.path.getmtime(path))
+        if not on_disk:
+            continue
+        known = {
+            sha256 for (sha256,) in
+            db.session.query(ReceiptBlob.sha256).filter(ReceiptBlob.sha256.like(f"{shard_name}%"))
+        }
+        for sha256, modified in on_disk.items():
+            if sha256 not in known and modified < cutoff_timestamp:
+                _remove_blob_files(shard, sha256)
+                removed += 1
+    return removed
+
+def _purge_stale_uploads(cutoff_timestamp):
+    """Delete upload temp files (tmp/*.part) left behind by requests that died mid-upload"""
+    removed = 0
+    if not os.path.isdir(TMP_FOLDER):
+        return removed
+    for name in os.listdir(TMP_FOLDER):
+        path = os.path.join(TMP_FOLDER, name)
+        # Uploads still streaming keep touching their file, so they are never this old
+        if name.endswith('.part') and os.path.getmtime(path) < cutoff_timestamp:
+            os.remove(path)
+            removed += 1
+    return removed
+
+def purge_unreferenced_blobs():
+    """
+    Delete blobs no receipt refers to any more, once RECEIPT_BLOB_GRACE_SECONDS
+    have passed since an upload last stored or matched them, blob files left
+    without a row, and stale upload temp files. Run periodically and after
+    commits, never mid-transaction.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=Config.RECEIPT_BLOB_GRACE_SECONDS)
+    unreferenced = (
+        (ReceiptBlob.refcount <= 0) &
+        (func.coalesce(ReceiptBlob.touched_at, ReceiptBlob.created_at) < cutoff)
+    )
+    candidates = db.session.query(ReceiptBlob.sha256, ReceiptBlob.extension).filter(unreferenced).all()
+    removed = 0
+    for sha256, extension in candidates:
+        # Recheck in the DELETE itself: an upload may have referenced the blob since the select.
+        # The deleted row stays locked until the commit, so a concurrent upload of the same
+        # content waits and then stores a fresh file instead of reusing the one removed here
+        result = db.session.execute(
+            delete(ReceiptBlob)
+            .where(ReceiptBlob.sha256 == sha256, unreferenced)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            _remove_blob_files(os.path.dirname(blob_path(sha256, extension)), sha256)
+            removed += 1
+    # Scans expire with the grace period; past it their files may be gone
+    ScannedReceipt.query.filter(ScannedReceipt.created_at < cutoff).delete()
+    db.session.commit()
+    file_cutoff = time.time() - Config.RECEIPT_BLOB_GRACE_SECONDS
+    orphans = _purge_orphan_files(file_cutoff) + _purge_stale_uploads(file_cutoff)
+    logger.info("[STORAGE GC] Removed %s unreferenced receipt blobs and %s orphaned files", removed, orphans)
+    return removed + orphans
+
 def delete_receipt_from_local(filename):
     """Delete receipt from local storage"""
-    logger.info(f"[DELETE] Attempting to delete file: {filename}")
+    logger.info("[DELETE] Attempting to delete file: %s", filename)
     
     try:
+        name = filename.rsplit('/', 1)[-1]
+        if CONTENT_ADDRESSED_NAME.match(name):
+            # Shared blob: drop one reference; purge_unreferenced_blobs removes the file once nothing uses it
+            sha256 = name.split('.', 1)[0]
+            result = db.session.execute(
+                update(ReceiptBlob)
+                .where(ReceiptBlob.sha256 == sha256, ReceiptBlob.refcount > 0)
+                .values(refcount=ReceiptBlob.refcount - 1)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0 and db.session.get(ReceiptBlob, sha256) is None:
+                logger.warning("[DELETE] Blob not found: %s", name)
+                return {"success": False, "error": "File not found"}
+            logger.info("[DELETE] Released a reference to blob %s", sha256)
+            return {"success": True}
+        
         file_path = os.path.join(UPLOAD_FOLDER, filename)
-        logger.debug(f"[DELETE] Full path: {file_path}")
+        logger.debug("[DELETE] Full path: %s", file_path)
         
         if os.path.exists(file_path):
-            logger.info(f"[DELETE] File found, deleting: {file_path}")
+            logger.info("[DELETE] File found, deleting: %s", file_path)
             file_size = os.path.getsize(file_path)
             os.remove(file_path)
-            logger.info(f"[DELETE] File deleted successfully. Size was: {file_size} bytes")
+            logger.info("[DELETE] File deleted successfully. Size was: %s bytes", file_size)
             
             # Check if parent directory is empty and clean up
             parent_dir = os.path.dirname(file_path)
@@ -134,79 +291,102 @@ def delete_receipt_from_local(filename):
                 try:
                     if not os.listdir(parent_dir):
                         os.rmdir(parent_dir)
-                        logger.info(f"[DELETE] Removed empty directory: {parent_dir}")
+                        logger.info("[DELETE] Removed empty directory: %s", parent_dir)
                 except Exception as e:
-                    logger.debug(f"[DELETE] Could not remove directory {parent_dir}: {str(e)}")
+                    logger.debug("[DELETE] Could not remove directory %s: %s", parent_dir, str(e))
             
             return {"success": True}
         else:
-            logger.warning(f"[DELETE] File not found: {file_path}")
+            logger.warning("[DELETE] File not found: %s", file_path)
             return {"success": False, "error": "File not found"}
             
     except Exception as e:
-        logger.error(f"[DELETE ERROR] Failed to delete file: {str(e)}", exc_info=True)
+        logger.error("[DELETE ERROR] Failed to delete file: %s", str(e), exc_info=True)
         return {"success": False, "error": str(e)}
 
+def stored_file_info(filename):
+    """
+    sha256 (content-addressed names only), size and mime type of a stored
+    receipt, from the blob table or the file system, without reading the file
+    """
+    name = filename.rsplit('/', 1)[-1]
+    info = {
+        "sha256": None,
+        "size": None,
+        "mime_type": mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    }
+    if CONTENT_ADDRESSED_NAME.match(name):
+        blob = db.session.get(ReceiptBlob, name.split('.', 1)[0])
+        if blob is not None:
+            info.update(sha256=blob.sha256, size=blob.size)
+    else:
+        file_path = resolve_receipt_path(filename)
+        if os.path.exists(file_path):
+            info['size'] = os.path.getsize(file_path)
+    return info
+
 def get_receipt_path(filename):
     """Get full path for a receipt file"""
-    logger.debug(f"[GET PATH] Getting path for: {filename}")
+    logger.debug("[GET PATH] Getting path for: %s", filename)
     
     try:
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        logger.debug(f"[GET PATH] Full path: {file_path}")
+        file_path = resolve_receipt_path(filename)
+        logger.debug("[GET PATH] Full path: %s", file_path)
         
         if os.path.exists(file_path):
-            logger.info(f"[GET PATH] File found: {file_path}")
-            file_stats = os.stat(file_path)
-            logger.debug(f"[GET PATH] File size: {file_stats.st_size} bytes")
-            logger.debug(f"[GET PATH] Last modified: {datetime.fromtimestamp(file_stats.st_mtime)}")
-            return {"success": True, "path": file_path}
+            logger.info("[GET PATH] File found: %s", file_path)
+            # The stat is only for the debug lines; skip it when they are off
+            if logger.isEnabledFor(logging.DEBUG):
+                file_stats = os.stat(file_path)
+                logger.debug("[GET PATH] File size: %s bytes", file_stats.st_size)
+                logger.debug("[GET PATH] Last modified: %s", datetime.fromtimestamp(file_stats.st_mtime))
+            return {"success": True, "path": os.path.abspath(file_path)}
         else:
-            logger.warning(f"[GET PATH] File not found: {file_path}")
+            logger.warning("[GET PATH] File not found: %s", file_path)
             return {"success": False, "error": "File not found"}
             
     except Exception as e:
-        logger.error(f"[GET PATH ERROR] Failed to get path: {str(e)}", exc_info=True)
+        logger.error("[GET PATH ERROR] Failed to get path: %s", str(e), exc_info=True)
         return {"success": False, "error": str(e)}
 
 def get_receipt_url(filename):
     """Get URL for receipt (for local storage, returns the view endpoint)"""
-    logger.debug(f"[GET URL] Getting URL for: {filename}")
+    logger.debug("[GET URL] Getting URL for: %s", filename)
     
     try:
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        logger.debug(f"[GET URL] Checking existence of: {file_path}")
+        file_path = resolve_receipt_path(filename)
+        logger.debug("[GET URL] Checking existence of: %s", file_path)
         
         if os.path.exists(file_path):
             # Extract user_id and filename from the path
             parts = filename.split('/')
-            logger.debug(f"[GET URL] Filename parts: {parts}")
+            logger.debug("[GET URL] Filename parts: %s", parts)
             
             if len(parts) == 2:
                 user_id, file_name = parts
                 url = f"/api/receipts/view/{user_id}/{file_name}"
-                logger.debug(f"[GET URL] Generated URL with user_id: {url}")
+                logger.debug("[GET URL] Generated URL with user_id: %s", url)
             else:
                 url = f"/api/receipts/view/{filename}"
-                logger.debug(f"[GET URL] Generated URL without user_id: {url}")
+                logger.debug("[GET URL] Generated URL without user_id: %s", url)
             
-            logger.info(f"[GET URL] URL generated successfully: {url}")
+            logger.info("[GET URL] URL generated successfully: %s", url)
             return {"success": True, "url": url}
         else:
-            logger.warning(f"[GET URL] File not found: {file_path}")
+            logger.warning("[GET URL] File not found: %s", file_path)
             return {"success": False, "error": "File not found"}
             
     except Exception as e:
-        logger.error(f"[GET URL ERROR] Failed to get URL: {str(e)}", exc_info=True)
+        logger.error("[GET URL ERROR] Failed to get URL: %s", str(e), exc_info=True)
         return {"success": False, "error": str(e)}
 
 def cleanup_user_receipts(user_id):
     """Clean up all receipts for a user (useful when deleting user account)"""
-    logger.info(f"[CLEANUP] Starting cleanup for user: {user_id}")
+    logger.info("[CLEANUP] Starting cleanup for user: %s", user_id)
     
     try:
         user_folder = os.path.join(UPLOAD_FOLDER, str(user_id))
-        logger.debug(f"[CLEANUP] User folder path: {user_folder}")
+        logger.debug("[CLEANUP] User folder path: %s", user_folder)
         
         if os.path.exists(user_folder):
             # Count files before deletion
@@ -218,16 +398,16 @@ def cleanup_user_receipts(user_id):
                     file_path = os.path.join(root, file)
                     total_size += os.path.getsize(file_path)
             
-            logger.info(f"[CLEANUP] Found {file_count} files, total size: {total_size} bytes")
+            logger.info("[CLEANUP] Found %s files, total size: %s bytes", file_count, total_size)
             
             # Delete the folder
             shutil.rmtree(user_folder)
-            logger.info(f"[CLEANUP] Successfully deleted user folder: {user_folder}")
-            logger.debug(f"[CLEANUP] Freed {total_size} bytes of storage")
+            logger.info("[CLEANUP] Successfully deleted user folder: %s", user_folder)
+            logger.debug("[CLEANUP] Freed %s bytes of storage", total_size)
         else:
-            logger.warning(f"[CLEANUP] User folder not found: {user_folder}")
+            logger.warning("[CLEANUP] User folder not found: %s", user_folder)
             
         return {"success": True}
     except Exception as e:
-        logger.error(f"[CLEANUP ERROR] Failed to cleanup user receipts: {str(e)}", exc_info=True)
+        logger.error("[CLEANUP ERROR] Failed to cleanup user receipts: %s", str(e), exc_info=True)
         return {"success": False, "error": str(e)}
\ No newline at end of file
@@ -0,0 +1,75 @@
+# logging_setup.py
+#
+# The backend's single logging configuration, applied once by app.py; every
+# other module only creates its logger. Records go through a QueueHandler to
+# a QueueListener thread that does the actual writing, so request threads
+# never wait on stream I/O. Log calls pass %-style arguments, so a message
+# below LOG_LEVEL is never formatted. With LOG_FORMAT=json each record is
+# written as one JSON object per line.
+
+from config import Config
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Chatty third-party loggers, held at LOG_LIBRARY_LEVEL
+LIBRARY_LOGGERS = ('apscheduler', 'urllib3', 'twilio', 'PIL')
+
+_listener = None
+_configured = False
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+def configure_logging(level=None, log_format=None, use_queue=None):
+    """Install the root handlers from Config (arguments override it); later calls do nothing"""
+    global _listener, _configured
+    if _configured:
+        return
+    _configured = True
+
+    level = (level or Config.LOG_LEVEL).upper()
+    log_format = (log_format or Config.LOG_FORMAT).lower()
+    use_queue = Config.LOG_ASYNC if use_queue is None else use_queue
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.setLevel(level)
+
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        # Flush what is still queued when the process exits
+        atexit.register(_listener.stop)
+    else:
+        root.addHandler(handler)
+
+    for name in LIBRARY_LOGGERS:
+        logging.getLogger(name).setLevel(Config.LOG_LIBRARY_LEVEL.upper())
+
+    logging.getLogger(__name__).info("[LOGGING] Level %s, %s format, %s", level, log_format, 'queued' if use_queue else 'synchronous')
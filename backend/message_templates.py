@@ -0,0 +1,73 @@
+# message_templates.py
+
+from config import Config
+import logging
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES = {
+    'en': {
+        'greetings': {
+            'morning': 'Good morning',
+            'afternoon': 'Good afternoon',
+            'evening': 'Good evening'
+        },
+        'reminder': (
+            "Hey {name}, {greeting}. Just a reminder that your {bill} payment of "
+            "₹{amount} is due on {due_date}. Hope you have a nice day."
+        )
+    },
+    'hi': {
+        'greetings': {
+            'morning': 'सुप्रभात',
+            'afternoon': 'नमस्कार',
+            'evening': 'शुभ संध्या'
+        },
+        'reminder': (
+            "नमस्ते {name}, {greeting}। याद दिला दें कि आपके {bill} का ₹{amount} का भुगतान "
+            "{due_date} को देय है। आपका दिन शुभ हो।"
+        )
+    }
+}
+
+def _bucket_for_hour(hour):
+    if 5 <= hour < 12:
+        return 'morning'
+    elif 12 <= hour < 17:
+        return 'afternoon'
+    return 'evening'
+
+# Placeholders every reminder template may use, in positional order
+TEMPLATE_FIELDS = ('name', 'greeting', 'bill', 'amount', 'due_date')
+
+def _compile(template):
+    """Rewrite named placeholders as positional ones and return the bound format method"""
+    positional = template.format(**{field: f'{{{index}}}' for index, field in enumerate(TEMPLATE_FIELDS)})
+    return positional.format
+
+# Precomputed once at import: hour -> bucket, and per-locale compiled templates
+_HOUR_BUCKETS = tuple(_bucket_for_hour(hour) for hour in range(24))
+_COMPILED = {
+    locale: (_compile(spec['reminder']), spec['greetings'])
+    for locale, spec in TEMPLATES.items()
+}
+
+def greeting_bucket(hour):
+    """Return the greeting bucket ('morning', 'afternoon', 'evening') for an hour of the day"""
+    return _HOUR_BUCKETS[hour]
+
+def get_greeting(hour, locale=None):
+    """Return the localized greeting text for an hour of the day"""
+    _, greetings = _COMPILED.get(locale or Config.DEFAULT_LOCALE, _COMPILED['en'])
+    return greetings[_HOUR_BUCKETS[hour]]
+
+def render_reminder(name, bill_data, hour, locale=None):
+    """Render a reminder from the local templates; never touches the network"""
+    render, greetings = _COMPILED.get(locale or Config.DEFAULT_LOCALE, _COMPILED['en'])
+    return render(
+        name,
+        greetings[_HOUR_BUCKETS[hour]],
+        bill_data.get('name'),
+        bill_data.get('amount'),
+        bill_data.get('due_date')
+    )
@@ -3,8 +3,6 @@ from datetime import datetime
 import uuid
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 db = SQLAlchemy()
@@ -22,24 +20,26 @@ class User(db.Model):
     
     def __init__(self, **kwargs):
         super(User, self).__init__(**kwargs)
-        logger.info(f"[USER MODEL] Creating new user with email: {kwargs.get('email')}")
-        logger.debug(f"[USER MODEL] User data: name={kwargs.get('name')}, phone={kwargs.get('phone_number')}")
+        logger.info("[USER MODEL] Creating new user with email: %s", kwargs.get('email'))
+        logger.debug("[USER MODEL] User data: name=%s, phone=%s", kwargs.get('name'), kwargs.get('phone_number'))
     
     def __repr__(self):
         return f'<User {self.id}: {self.email}>'
-    
-    @property
-    def _details(self):
-        """Property for detailed logging"""
-        return {
-            'id': self.id,
-            'email': self.email,
-            'name': self.name,
-            'phone_number': self.phone_number,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
 
 class Bill(db.Model):
+    __table_args__ = (
+        # Per-user listings and the per-user unpaid lookups used by the reminder queue
+        db.Index('ix_bill_user_paid_due', 'user_id', 'is_paid', 'due_date'),
+        # Keyset-paginated bill listing ordered by (due_date, id)
+        db.Index('ix_bill_user_due_id', 'user_id', 'due_date', 'id'),
+        # Delta sync: bills changed after a client's last seen version
+        db.Index('ix_bill_user_sync_version', 'user_id', 'sync_version'),
+        # One occurrence per due date within a recurring series (recurrence.py)
+        db.Index('uq_bill_series_due', 'series_id', 'due_date', unique=True),
+        # Global unpaid-by-date scans: queue backfill and the overdue digest
+        db.Index('ix_bill_paid_due', 'is_paid', 'due_date'),
+    )
+    
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
@@ -50,6 +50,11 @@ class Bill(db.Model):
     is_paid = db.Column(db.Boolean, default=False)
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Value of the owner's BillSyncState.version when this bill last changed
+    sync_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Recurring bills: occurrences of one series share series_id; anchor_day is the series' day of month
+    series_id = db.Column(db.String(36))
+    anchor_day = db.Column(db.Integer)
     
     # Reminder preferences
     enable_whatsapp = db.Column(db.Boolean, default=True)
@@ -58,45 +63,30 @@ class Bill(db.Model):
     enable_local_notification = db.Column(db.Boolean, default=True)
     
     payments = db.relationship('Payment', backref='bill', lazy=True, cascade='all, delete-orphan')
+    reminder_job = db.relationship('ReminderJob', backref='bill', uselist=False, cascade='all, delete-orphan')
+    receipt = db.relationship('Receipt', backref='bill', uselist=False, cascade='all, delete-orphan')
     
     def __init__(self, **kwargs):
         super(Bill, self).__init__(**kwargs)
-        logger.info(f"[BILL MODEL] Creating new bill: {kwargs.get('name')} for user: {kwargs.get('user_id')}")
-        logger.debug(f"[BILL MODEL] Bill details: amount={kwargs.get('amount')}, due_date={kwargs.get('due_date')}, category={kwargs.get('category')}")
-        logger.debug(f"[BILL MODEL] Reminder settings: whatsapp={kwargs.get('enable_whatsapp', True)}, call={kwargs.get('enable_call', False)}")
+        logger.info("[BILL MODEL] Creating new bill: %s for user: %s", kwargs.get('name'), kwargs.get('user_id'))
+        logger.debug("[BILL MODEL] Bill details: amount=%s, due_date=%s, category=%s", kwargs.get('amount'), kwargs.get('due_date'), kwargs.get('category'))
+        logger.debug("[BILL MODEL] Reminder settings: whatsapp=%s, call=%s", kwargs.get('enable_whatsapp', True), kwargs.get('enable_call', False))
     
     def __repr__(self):
         return f'<Bill {self.id}: {self.name}>'
     
-    @property
-    def _details(self):
-        """Property for detailed logging"""
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'name': self.name,
-            'amount': self.amount,
-            'due_date': self.due_date.isoformat() if self.due_date else None,
-            'category': self.category,
-            'frequency': self.frequency,
-            'is_paid': self.is_paid,
-            'enable_whatsapp': self.enable_whatsapp,
-            'enable_call': self.enable_call,
-            'notes': self.notes[:50] + '...' if self.notes and len(self.notes) > 50 else self.notes
-        }
-    
     @property
     def days_until_due(self):
         """Calculate days until due date"""
         if self.due_date:
             days = (self.due_date.date() - datetime.now().date()).days
-            logger.debug(f"[BILL MODEL] Bill {self.id} days until due: {days}")
+            logger.debug("[BILL MODEL] Bill %s days until due: %s", self.id, days)
             return days
         return None
 
 class Payment(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    bill_id = db.Column(db.String(36), db.ForeignKey('bill.id'), nullable=False)
+    bill_id = db.Column(db.String(36), db.ForeignKey('bill.id'), nullable=False, index=True)
     amount = db.Column(db.Float, nullable=False)
     payment_date = db.Column(db.DateTime, default=datetime.utcnow)
     payment_method = db.Column(db.String(50))
@@ -105,27 +95,15 @@ class Payment(db.Model):
     
     def __init__(self, **kwargs):
         super(Payment, self).__init__(**kwargs)
-        logger.info(f"[PAYMENT MODEL] Creating new payment for bill: {kwargs.get('bill_id')}")
-        logger.debug(f"[PAYMENT MODEL] Payment details: amount={kwargs.get('amount')}, method={kwargs.get('payment_method')}")
+        logger.info("[PAYMENT MODEL] Creating new payment for bill: %s", kwargs.get('bill_id'))
+        logger.debug("[PAYMENT MODEL] Payment details: amount=%s, method=%s", kwargs.get('amount'), kwargs.get('payment_method'))
     
     def __repr__(self):
         return f'<Payment {self.id}: {self.amount}>'
-    
-    @property
-    def _details(self):
-        """Property for detailed logging"""
-        return {
-            'id': self.id,
-            'bill_id': self.bill_id,
-            'amount': self.amount,
-            'payment_date': self.payment_date.isoformat() if self.payment_date else None,
-            'payment_method': self.payment_method,
-            'notes': self.notes[:50] + '...' if self.notes and len(self.notes) > 50 else self.notes
-        }
 
 class ReminderSettings(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False, index=True)
     local_notifications = db.Column(db.Boolean, default=True)
     whatsapp_enabled = db.Column(db.Boolean, default=False)
     call_enabled = db.Column(db.Boolean, default=False)
@@ -136,76 +114,130 @@ class ReminderSettings(db.Model):
     
     def __init__(self, **kwargs):
         super(ReminderSettings, self).__init__(**kwargs)
-        logger.info(f"[REMINDER SETTINGS] Creating settings for user: {kwargs.get('user_id')}")
-        logger.debug(f"[REMINDER SETTINGS] Settings: whatsapp={kwargs.get('whatsapp_enabled', False)}, call={kwargs.get('call_enabled', False)}")
-        logger.debug(f"[REMINDER SETTINGS] Timing: days_before={kwargs.get('days_before', 3)}, preferred_time={kwargs.get('preferred_time', '09:00')}")
+        logger.info("[REMINDER SETTINGS] Creating settings for user: %s", kwargs.get('user_id'))
+        logger.debug("[REMINDER SETTINGS] Settings: whatsapp=%s, call=%s", kwargs.get('whatsapp_enabled', False), kwargs.get('call_enabled', False))
+        logger.debug("[REMINDER SETTINGS] Timing: days_before=%s, preferred_time=%s", kwargs.get('days_before', 3), kwargs.get('preferred_time', '09:00'))
     
     def __repr__(self):
         return f'<ReminderSettings {self.id}: User {self.user_id}>'
-    
-    @property
-    def _details(self):
-        """Property for detailed logging"""
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'local_notifications': self.local_notifications,
-            'whatsapp_enabled': self.whatsapp_enabled,
-            'call_enabled': self.call_enabled,
-            'sms_enabled': self.sms_enabled,
-            'days_before': self.days_before,
-            'preferred_time': self.preferred_time,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
 
-# Database event listeners for logging
-from sqlalchemy import event
-
-@event.listens_for(User, 'after_insert')
-def log_user_insert(mapper, connection, target):
-    logger.info(f"[DB EVENT] User created: {target._details}")
-
-@event.listens_for(User, 'after_update')
-def log_user_update(mapper, connection, target):
-    logger.info(f"[DB EVENT] User updated: {target._details}")
-
-@event.listens_for(User, 'after_delete')
-def log_user_delete(mapper, connection, target):
-    logger.info(f"[DB EVENT] User deleted: {target.id}")
-
-@event.listens_for(Bill, 'after_insert')
-def log_bill_insert(mapper, connection, target):
-    logger.info(f"[DB EVENT] Bill created: {target._details}")
-
-@event.listens_for(Bill, 'after_update')
-def log_bill_update(mapper, connection, target):
-    logger.info(f"[DB EVENT] Bill updated: {target._details}")
-    if hasattr(target, '_sa_instance_state'):
-        # Log what changed
-        history = db.inspect(target).attrs
-        changes = {}
-        for attr in history:
-            hist = attr.history
-            if hist.has_changes():
-                changes[attr.key] = {
-                    'from': hist.deleted[0] if hist.deleted else None,
-                    'to': hist.added[0] if hist.added else None
-                }
-        if changes:
-            logger.debug(f"[DB EVENT] Bill {target.id} changes: {changes}")
+class ReminderJob(db.Model):
+    """Precomputed reminder queue entry: one row per unpaid bill that still has a reminder to send."""
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    bill_id = db.Column(db.String(36), db.ForeignKey('bill.id'), nullable=False, unique=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False, index=True)
+    next_fire_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ReminderJob {self.id}: Bill {self.bill_id} at {self.next_fire_at}>'
 
-@event.listens_for(Bill, 'after_delete')
-def log_bill_delete(mapper, connection, target):
-    logger.info(f"[DB EVENT] Bill deleted: {target.id} - {target.name}")
+class BillSyncState(db.Model):
+    """Per-user bills version counter, bumped on every bill write; drives ETags and delta sync."""
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<BillSyncState {self.user_id}: v{self.version}>'
+
+class BillTombstone(db.Model):
+    """Marker left behind by a deleted bill so delta sync can report the deletion."""
+    __table_args__ = (
+        db.Index('ix_bill_tombstone_user_version', 'user_id', 'version'),
+        # Deleted occurrences of recurring series, which recurrence.py must not recreate
+        db.Index('ix_bill_tombstone_series_due', 'series_id', 'due_date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    bill_id = db.Column(db.String(36), nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Set when the deleted bill was an occurrence of a recurring series
+    series_id = db.Column(db.String(36))
+    due_date = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<BillTombstone {self.bill_id}: v{self.version}>'
+
+class ReceiptBlob(db.Model):
+    """One stored receipt file, addressed by the SHA-256 of its content and shared by every upload of it."""
+    sha256 = db.Column(db.String(64), primary_key=True)
+    extension = db.Column(db.String(10), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    refcount = db.Column(db.Integer, nullable=False, default=0, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Last upload that stored or matched this content; unreferenced blobs are kept a grace period after it
+    touched_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ReceiptBlob {self.sha256}: {self.refcount} refs>'
 
-@event.listens_for(Payment, 'after_insert')
-def log_payment_insert(mapper, connection, target):
-    logger.info(f"[DB EVENT] Payment created: {target._details}")
+class Receipt(db.Model):
+    """The receipt attached to a bill (at most one): where it is stored and what it is."""
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    bill_id = db.Column(db.String(36), db.ForeignKey('bill.id'), nullable=False, unique=True, index=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False, index=True)
+    # Logical name understood by local_storage_service: <user_id>/<sha256>.<ext>, or a legacy per-user file
+    storage_key = db.Column(db.String(255), nullable=False, index=True)
+    # NULL for legacy files stored before content addressing
+    sha256 = db.Column(db.String(64), index=True)
+    size = db.Column(db.Integer)
+    mime_type = db.Column(db.String(100))
+    # Pixel dimensions of image receipts; NULL for PDFs and when unknown
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Receipt {self.storage_key} for bill {self.bill_id}>'
 
-@event.listens_for(ReminderSettings, 'after_insert')
-def log_settings_insert(mapper, connection, target):
-    logger.info(f"[DB EVENT] ReminderSettings created: {target._details}")
+class ScannedReceipt(db.Model):
+    """A scanned file not (yet) attached to a bill; lets its uploader view it until the blob GC expires it."""
+    __table_args__ = (
+        db.Index('ix_scanned_receipt_user_sha', 'user_id', 'sha256'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<ScannedReceipt {self.sha256} by {self.user_id}>'
 
-@event.listens_for(ReminderSettings, 'after_update')
-def log_settings_update(mapper, connection, target):
-    logger.info(f"[DB EVENT] ReminderSettings updated: {target._details}")
\ No newline at end of file
+class RevokedToken(db.Model):
+    """A revoked JWT (by jti) or token family (every token of one login, by its "fam" claim)."""
+    jti = db.Column(db.String(36), primary_key=True)
+    token_type = db.Column(db.String(10), nullable=False)  # 'access', 'refresh' or 'family'
+    user_id = db.Column(db.String(36), index=True)
+    # When the revoked token(s) would have expired anyway; the row can be purged after that
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<RevokedToken {self.token_type} {self.jti}>'
+
+class AuditLog(db.Model):
+    """Append-only change log written by change_capture when CHANGE_CAPTURE=table."""
+    __table_args__ = (
+        db.Index('ix_audit_log_entity', 'entity', 'entity_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    entity = db.Column(db.String(50), nullable=False)
+    entity_id = db.Column(db.String(36), nullable=False)
+    action = db.Column(db.String(10), nullable=False)
+    changes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class ReminderMessage(db.Model):
+    """Persistent store behind the in-memory cache of generated reminder messages."""
+    cache_key = db.Column(db.String(64), primary_key=True)
+    message = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<ReminderMessage {self.cache_key}>'
@@ -0,0 +1,21 @@
+# pagination.py
+#
+# Opaque keyset cursors shared by the list endpoints. A cursor encodes the
+# (timestamp, id) of the last row of a page; the next page continues strictly
+# after it in the endpoint's sort order.
+
+from datetime import datetime
+import base64
+
+def encode_cursor(timestamp, row_id):
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (timestamp, id) from a cursor; raises ValueError for anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.split('|', 1)
+        return datetime.fromisoformat(timestamp), row_id
+    except Exception:
+        raise ValueError('invalid cursor')
@@ -0,0 +1,142 @@
+# password_hashing.py
+#
+# bcrypt off the request threads. Hashes and checks run in a process pool
+# sized to the machine's cores, so a burst of logins spreads over every core
+# instead of pinning the Flask workers. The number of outstanding calls is
+# capped at PASSWORD_HASH_MAX_PENDING; beyond that, calls fail fast with
+# HasherBusy, which the auth endpoints answer with 503 + Retry-After rather
+# than queueing unbounded work. If a worker dies (OOM kill, segfault) the pool
+# is replaced and the call retried once. A successful check against a hash whose cost
+# differs from BCRYPT_ROUNDS also returns a fresh hash (computed in the same
+# worker call) for the caller to store.
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import Config
+import multiprocessing
+import threading
+import time
+import bcrypt
+import logging
+
+logger = logging.getLogger(__name__)
+
+class HasherBusy(Exception):
+    """Every hashing slot is taken; the request should be retried shortly."""
+
+def hash_cost(password_hash):
+    """Cost factor of a bcrypt hash ($2b$<cost>$...), or None if it is not one"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+# Worker-side functions; they run in the pool's processes, so they must stay module-level
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+def _check(password, password_hash, rounds):
+    """(valid, new hash if the stored one was made with a different cost, else None)"""
+    if not bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8')):
+        return False, None
+    if hash_cost(password_hash) != rounds:
+        return True, _hash(password, rounds)
+    return True, None
+
+class PasswordHasher:
+    """Bounded process pool for bcrypt with queue-depth and latency counters."""
+
+    def __init__(self, workers, max_pending):
+        self._workers = workers
+        self._max_pending = max_pending
+        self._executor = self._new_executor()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_seconds = 0.0
+        self._restarts = 0
+        logger.info("[PASSWORD HASHER] Started with %s workers, %s pending calls max, cost %s", workers, max_pending, Config.BCRYPT_ROUNDS)
+
+    def _new_executor(self):
+        # spawn rather than fork: the app process runs scheduler and connection-pool threads
+        return ProcessPoolExecutor(max_workers=self._workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def _replace_broken(self, broken):
+        """Swap in a fresh pool for one whose worker died, unless another thread already did"""
+        with self._lock:
+            if self._executor is broken:
+                self._executor = self._new_executor()
+                self._restarts += 1
+                logger.error("[PASSWORD HASHER] Worker process died, pool restarted (%s restarts)", self._restarts)
+        broken.shutdown(wait=False)
+
+    def _submit(self, func, *args):
+        """Run func in the pool, replacing a broken pool and retrying once; HasherBusy if that fails too"""
+        for _ in range(2):
+            executor = self._executor
+            try:
+                return executor.submit(func, *args).result()
+            except BrokenProcessPool:
+                self._replace_broken(executor)
+        raise HasherBusy()
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            logger.warning("[PASSWORD HASHER] Queue full (%s pending), rejecting call", self._max_pending)
+            raise HasherBusy()
+
+        with self._lock:
+            self._pending += 1
+        started = time.monotonic()
+        try:
+            return self._submit(func, *args)
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+                self._total_seconds += elapsed
+            self._slots.release()
+
+    def hash_password(self, password):
+        """bcrypt hash of a password at the configured cost, as a string"""
+        return self._run(_hash, password, Config.BCRYPT_ROUNDS)
+
+    def verify_password(self, password, password_hash):
+        """(valid, replacement hash or None); see _check"""
+        return self._run(_check, password, password_hash, Config.BCRYPT_ROUNDS)
+
+    def stats(self):
+        with self._lock:
+            pending = self._pending
+            completed = self._completed
+            rejected = self._rejected
+            total_seconds = self._total_seconds
+        return {
+            'workers': self._workers,
+            'max_pending': self._max_pending,
+            'in_flight': min(pending, self._workers),
+            'queued': max(pending - self._workers, 0),
+            'completed': completed,
+            'rejected': rejected,
+            'restarts': self._restarts,
+            'avg_ms': round(total_seconds / completed * 1000, 1) if completed else None,
+            'rounds': Config.BCRYPT_ROUNDS
+        }
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+def get_password_hasher():
+    """Return the process-wide password hasher, creating it on first use"""
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = PasswordHasher(Config.PASSWORD_HASH_WORKERS, Config.PASSWORD_HASH_MAX_PENDING)
+    return _hasher
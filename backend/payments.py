@@ -0,0 +1,202 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, Bill, Payment
+from pagination import encode_cursor, decode_cursor
+from config import Config
+from sqlalchemy import and_, or_
+from datetime import datetime, timezone
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+payments_bp = Blueprint('payments', __name__)
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_ANALYTICS_MONTHS = 12
+DEFAULT_ROLLING_WINDOW = 3
+
+def _parse_month(value):
+    """'YYYY-MM' -> numpy month"""
+    try:
+        return np.datetime64(datetime.strptime(value, '%Y-%m'), 'M')
+    except ValueError:
+        raise ValueError(f"expected a month as YYYY-MM, got '{value}'")
+
+def _month_start(month):
+    return month.astype('datetime64[D]').astype(datetime)
+
+def _naive_utc(value):
+    """payment_date is stored as naive UTC; convert offset-carrying datetimes to match"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _parse_utc(value):
+    return _naive_utc(datetime.fromisoformat(value.replace('Z', '+00:00')))
+
+@payments_bp.route('', methods=['GET'])
+@jwt_required()
+def get_payments():
+    """
+    The user's payments, newest first, with the bill they paid.
+
+    Query parameters: bill_id, category, from/to (ISO dates) filters, and
+    limit/cursor keyset pagination on (payment_date, id); the next page's
+    token is returned in X-Next-Cursor.
+    """
+    user_id = get_jwt_identity()
+    logger.info("[GET PAYMENTS] Request from user_id: %s", user_id)
+
+    args = request.args
+    query = db.session.query(
+        Payment.id, Payment.payment_date, Payment.bill_id, Payment.amount, Payment.payment_method,
+        Bill.name, Bill.category
+    ).join(Bill, Bill.id == Payment.bill_id).filter(Bill.user_id == user_id)
+
+    try:
+        limit = min(int(args.get('limit', DEFAULT_PAGE_SIZE)), Config.BILLS_PAGE_MAX)
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        if args.get('bill_id'):
+            query = query.filter(Payment.bill_id == args['bill_id'])
+        if args.get('category'):
+            query = query.filter(Bill.category.in_([c.strip() for c in args['category'].split(',')]))
+        if args.get('from'):
+            query = query.filter(Payment.payment_date >= _parse_utc(args['from']))
+        if args.get('to'):
+            query = query.filter(Payment.payment_date <= _parse_utc(args['to']))
+        if args.get('cursor'):
+            payment_date, last_id = decode_cursor(args['cursor'])
+            payment_date = _naive_utc(payment_date)
+            query = query.filter(or_(
+                Payment.payment_date < payment_date,
+                and_(Payment.payment_date == payment_date, Payment.id < last_id)
+            ))
+    except ValueError as e:
+        logger.warning("[GET PAYMENTS] Invalid query parameters from user %s: %s", user_id, str(e))
+        return jsonify({'message': f'Invalid query parameters: {str(e)}'}), 400
+
+    rows = query.order_by(Payment.payment_date.desc(), Payment.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].payment_date, rows[-1].id)
+
+    response = jsonify([{
+        'id': row.id,
+        'bill_id': row.bill_id,
+        'bill_name': row.name,
+        'category': row.category,
+        'amount': row.amount,
+        'payment_date': row.payment_date.isoformat(),
+        'payment_method': row.payment_method
+    } for row in rows])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+
+    logger.info("[GET PAYMENTS] Returning %s payments for user %s", len(rows), user_id)
+    return response, 200
+
+def monthly_spend(payment_months, amounts, category_codes, n_categories, first_month, n_months):
+    """Category x month spend matrix, accumulated in one vectorized pass"""
+    spend = np.zeros((n_categories, n_months))
+    offsets = (payment_months - first_month).astype('int64')
+    np.add.at(spend, (category_codes, offsets), amounts)
+    return spend
+
+def rolling_mean(spend, window):
+    """Trailing mean over `window` months along the last axis (prefix-sum based)"""
+    cumulative = np.cumsum(spend, axis=-1)
+    shifted = np.zeros_like(cumulative)
+    shifted[..., window:] = cumulative[..., :-window]
+    counts = np.minimum(np.arange(1, spend.shape[-1] + 1), window)
+    return (cumulative - shifted) / counts
+
+def _series(values):
+    return [round(float(value), 2) for value in values]
+
+def _optional_series(values):
+    return [None if np.isnan(value) else round(float(value), 2) for value in values]
+
+@payments_bp.route('/analytics', methods=['GET'])
+@jwt_required()
+def get_payment_analytics():
+    """
+    Monthly spend per category between ?from= and ?to= (YYYY-MM, default the
+    last 12 months) with a trailing ?window=-month average and year-over-year
+    deltas. Payments are pulled with one column query, starting early enough to
+    cover the rolling window and the previous year, and aggregated in NumPy.
+    """
+    user_id = get_jwt_identity()
+    logger.info("[PAYMENT ANALYTICS] Request from user_id: %s", user_id)
+
+    try:
+        this_month = np.datetime64(datetime.now(), 'M')
+        last = _parse_month(request.args['to']) if request.args.get('to') else this_month
+        first = _parse_month(request.args['from']) if request.args.get('from') else last - (DEFAULT_ANALYTICS_MONTHS - 1)
+        window = int(request.args.get('window', DEFAULT_ROLLING_WINDOW))
+        n_months = int((last - first).astype('int64')) + 1
+        if n_months < 1:
+            raise ValueError('from must not be after to')
+        if n_months > Config.PAYMENT_ANALYTICS_MAX_MONTHS:
+            raise ValueError(f'range is limited to {Config.PAYMENT_ANALYTICS_MAX_MONTHS} months')
+        if not 1 <= window <= 24:
+            raise ValueError('window must be between 1 and 24')
+    except ValueError as e:
+        logger.warning("[PAYMENT ANALYTICS] Invalid query parameters from user %s: %s", user_id, str(e))
+        return jsonify({'message': f'Invalid query parameters: {str(e)}'}), 400
+
+    # Look back far enough for the first month's rolling average and year-over-year comparison
+    lookback = max(window - 1, 12)
+    fetch_first = first - lookback
+    total_months = n_months + lookback
+
+    rows = db.session.query(Payment.payment_date, Payment.amount, Bill.category).join(
+        Bill, Bill.id == Payment.bill_id
+    ).filter(
+        Bill.user_id == user_id,
+        Payment.payment_date >= _month_start(fetch_first),
+        Payment.payment_date < _month_start(last + 1)
+    ).all()
+    logger.debug("[PAYMENT ANALYTICS] Aggregating %s payments over %s months", len(rows), total_months)
+
+    if rows:
+        dates, amounts, categories = zip(*rows)
+        payment_months = np.array(dates, dtype='datetime64[s]').astype('datetime64[M]')
+        amounts = np.array(amounts, dtype='float64')
+        names, codes = np.unique(np.array(categories, dtype=object).astype(str), return_inverse=True)
+    else:
+        payment_months = np.array([], dtype='datetime64[M]')
+        amounts = np.array([], dtype='float64')
+        names, codes = np.array([], dtype=str), np.array([], dtype='int64')
+
+    spend = monthly_spend(payment_months, amounts, codes, len(names), fetch_first, total_months)
+    # Row 0 of the stacked matrix is the all-categories total
+    spend = np.vstack([spend.sum(axis=0, keepdims=True), spend])
+    averages = rolling_mean(spend, window)
+
+    visible = slice(lookback, None)
+    previous_year = spend[:, lookback - 12:total_months - 12]
+    current = spend[:, visible]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        yoy_pct = np.where(previous_year > 0, (current - previous_year) / previous_year * 100, np.nan)
+
+    def describe(index):
+        return {
+            'spend': _series(current[index]),
+            'rolling_average': _series(averages[index, visible]),
+            'yoy_delta': _series(current[index] - previous_year[index]),
+            'yoy_percent': _optional_series(yoy_pct[index])
+        }
+
+    months = np.arange(first, last + 1)
+    result = {
+        'months': [str(month) for month in months],
+        'window': window,
+        'total': describe(0),
+        'categories': {str(name): describe(index + 1) for index, name in enumerate(names)}
+    }
+
+    logger.info("[PAYMENT ANALYTICS] Returning %s months across %s categories for user %s", n_months, len(names), user_id)
+    return jsonify(result), 200
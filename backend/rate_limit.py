@@ -0,0 +1,204 @@
+# rate_limit.py
+#
+# Token-bucket rate limiting for the credential endpoints. Each limit is a
+# bucket of `capacity` requests refilled evenly over its period, kept per
+# client IP and per submitted email. The check runs before the view, so a
+# throttled request costs a dict (or Redis) lookup and never reaches bcrypt.
+#
+# Buckets live in a store: in process memory by default (one node), or in
+# Redis when RATE_LIMIT_STORAGE_URL is set, so every node shares one budget.
+# Any object with take(buckets) -> (allowed, retry_after_seconds), where
+# buckets is a list of (key, capacity, refill_per_second), can be installed
+# with set_rate_limit_store(). A take draws one token from every bucket only
+# when all of them have one, so a request rejected by its email bucket does
+# not also spend its IP token. If the store fails (e.g. Redis is down) the
+# request is checked against a process-local memory store instead.
+
+from flask import request, jsonify
+from collections import OrderedDict
+from functools import wraps
+from config import Config
+import math
+import threading
+import time
+import logging
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+def parse_limit(value):
+    """'20/minute' -> (capacity 20, refill rate in tokens per second)"""
+    count, _, period = value.partition('/')
+    if period not in PERIODS or not count.strip().isdigit() or int(count) < 1:
+        raise ValueError(f"Invalid rate limit '{value}', expected <count>/<{'|'.join(PERIODS)}>")
+    return int(count), int(count) / PERIODS[period]
+
+class MemoryTokenBucketStore:
+    """Buckets in this process; least recently used keys are dropped beyond maxsize."""
+
+    def __init__(self, maxsize):
+        self._maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, buckets):
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key, capacity, refill_per_second in buckets:
+                tokens, updated_at = self._buckets.get(key, (capacity, now))
+                levels.append(min(capacity, tokens + (now - updated_at) * refill_per_second))
+            allowed = all(tokens >= 1 for tokens in levels)
+            retry_after = 0
+            for (key, capacity, refill_per_second), tokens in zip(buckets, levels):
+                if allowed:
+                    tokens -= 1
+                elif tokens < 1:
+                    retry_after = max(retry_after, (1 - tokens) / refill_per_second)
+                self._buckets[key] = (tokens, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self._maxsize:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def __len__(self):
+        return len(self._buckets)
+
+class RedisTokenBucketStore:
+    """Buckets shared by every node through Redis; each take is one atomic script call."""
+
+    # KEYS buckets; ARGV now (seconds), then capacity and refill per second for each key
+    TAKE_SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local levels = {}
+    local allowed = 1
+    for i, key in ipairs(KEYS) do
+        local capacity = tonumber(ARGV[i * 2])
+        local rate = tonumber(ARGV[i * 2 + 1])
+        local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+        local tokens = tonumber(bucket[1]) or capacity
+        local ts = tonumber(bucket[2]) or now
+        levels[i] = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+        if levels[i] < 1 then
+            allowed = 0
+        end
+    end
+    local retry_after = 0
+    for i, key in ipairs(KEYS) do
+        local capacity = tonumber(ARGV[i * 2])
+        local rate = tonumber(ARGV[i * 2 + 1])
+        local tokens = levels[i]
+        if allowed == 1 then
+            tokens = tokens - 1
+        elseif tokens < 1 then
+            retry_after = math.max(retry_after, (1 - tokens) / rate)
+        end
+        redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+        redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000))
+    end
+    return {allowed, tostring(retry_after)}
+    """
+
+    def __init__(self, url, prefix='ratelimit:'):
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_STORAGE_URL is set but the redis package is not installed")
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(self.TAKE_SCRIPT)
+        self._prefix = prefix
+
+    def take(self, buckets):
+        args = [time.time()]
+        for _, capacity, refill_per_second in buckets:
+            args.extend((capacity, refill_per_second))
+        allowed, retry_after = self._take(keys=[self._prefix + key for key, _, _ in buckets], args=args)
+        return bool(allowed), float(retry_after)
+
+_store = None
+_store_lock = threading.Lock()
+_fallback_store = None
+_store_errors = 0
+_rejected = {}
+
+def get_rate_limit_store():
+    """Return the process-wide bucket store, creating it from Config on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if Config.RATE_LIMIT_STORAGE_URL:
+                    _store = RedisTokenBucketStore(Config.RATE_LIMIT_STORAGE_URL)
+                else:
+                    _store = MemoryTokenBucketStore(Config.RATE_LIMIT_MEMORY_MAX_KEYS)
+                logger.info("[RATE LIMIT] Using %s", type(_store).__name__)
+    return _store
+
+def set_rate_limit_store(store):
+    """Install a different bucket store (e.g. another shared backend)"""
+    global _store
+    _store = store
+
+def _take(buckets):
+    """Draw from the buckets in the configured store, or in a process-local one if that store fails"""
+    global _fallback_store, _store_errors
+    try:
+        return get_rate_limit_store().take(buckets)
+    except Exception as e:
+        _store_errors += 1
+        logger.error("[RATE LIMIT] Store failed, limiting in process memory: %s", str(e))
+        if _fallback_store is None:
+            with _store_lock:
+                if _fallback_store is None:
+                    _fallback_store = MemoryTokenBucketStore(Config.RATE_LIMIT_MEMORY_MAX_KEYS)
+        return _fallback_store.take(buckets)
+
+def _submitted_email():
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and isinstance(data.get('email'), str):
+        return data['email'].strip().lower() or None
+    return None
+
+def rate_limit(name, per_ip, per_email=None):
+    """
+    Throttle a view per client IP and, when given, per the email in its JSON
+    body. Limits are '<count>/<second|minute|hour|day>' strings. Rejected
+    requests get 429 with Retry-After and never reach the view.
+    """
+    ip_limit = parse_limit(per_ip)
+    email_limit = parse_limit(per_email) if per_email else None
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not Config.RATE_LIMIT_ENABLED:
+                return view(*args, **kwargs)
+
+            buckets = [(f"{name}:ip:{request.remote_addr}", *ip_limit)]
+            email = _submitted_email() if email_limit else None
+            if email:
+                buckets.append((f"{name}:email:{email}", *email_limit))
+
+            allowed, retry_after = _take(buckets)
+            if not allowed:
+                _rejected[name] = _rejected.get(name, 0) + 1
+                logger.warning("[RATE LIMIT] %s limit hit for ip %s / email %s, retry in %.1fs", name, request.remote_addr, email, retry_after)
+                response = jsonify({'message': 'Too many attempts, please try again later'})
+                response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                return response, 429
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def rate_limit_stats():
+    store = _store
+    return {
+        'store': type(store).__name__ if store else None,
+        'keys': len(store) if isinstance(store, MemoryTokenBucketStore) else None,
+        'store_errors': _store_errors,
+        'rejected': dict(_rejected)
+    }
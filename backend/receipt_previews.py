@@ -0,0 +1,155 @@
+# receipt_previews.py
+#
+# Small derivatives of receipt blobs for the mobile client: a thumbnail and a
+# medium preview per stored file, rendered in the background after upload and
+# cached next to the blob as blobs/<aa>/<sha256>.<size>.<webp|jpg>. Because
+# blobs are content-addressed, each distinct file is rendered once no matter
+# how many receipts share it. Images need Pillow, PDF first pages need PyMuPDF;
+# without them previews are skipped and the original is served instead.
+
+from concurrent.futures import ThreadPoolExecutor
+from local_storage_service import blob_path
+from config import Config
+import io
+import os
+import uuid
+import threading
+import logging
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import pymupdf
+except ImportError:
+    try:
+        import fitz as pymupdf
+    except ImportError:
+        pymupdf = None
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels per preview size; 'full' always means the original
+PREVIEW_SIZES = {
+    'thumb': 256,
+    'medium': 1024
+}
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+_executor = ThreadPoolExecutor(max_workers=Config.RECEIPT_PREVIEW_WORKERS, thread_name_prefix='receipt-preview')
+_in_flight = set()
+_lock = threading.Lock()
+
+if Image is None:
+    logger.warning("[PREVIEWS] Pillow is not installed; receipt previews are disabled")
+
+def _detect_output_format():
+    """WebP when configured and this Pillow build can encode it, JPEG otherwise"""
+    if Image is not None and Config.RECEIPT_PREVIEW_FORMAT == 'webp':
+        Image.init()
+        if 'WEBP' in Image.SAVE:
+            return 'WEBP', 'webp'
+    return 'JPEG', 'jpg'
+
+# (Pillow format name, file suffix) of every derivative
+OUTPUT_FORMAT = _detect_output_format()
+
+def can_preview(extension):
+    if Image is None:
+        return False
+    return extension in IMAGE_EXTENSIONS or (extension == 'pdf' and pymupdf is not None)
+
+def image_dimensions(sha256, extension):
+    """(width, height) of an image blob from its header, or (None, None) for PDFs or without Pillow"""
+    if Image is None or extension not in IMAGE_EXTENSIONS:
+        return None, None
+    try:
+        with Image.open(blob_path(sha256, extension)) as image:
+            return image.size
+    except Exception as e:
+        logger.warning("[PREVIEWS] Could not read dimensions of blob %s: %s", sha256, str(e))
+        return None, None
+
+def preview_path(sha256, size):
+    """Where the derivative of a blob for a preview size lives (whether or not it exists yet)"""
+    return os.path.join(os.path.dirname(blob_path(sha256, 'x')), f"{sha256}.{size}.{OUTPUT_FORMAT[1]}")
+
+def _open_source(sha256, extension):
+    """Load a blob as a Pillow image; PDFs are rasterized from their first page"""
+    source = blob_path(sha256, extension)
+    if extension != 'pdf':
+        image = Image.open(source)
+        image.seek(0)  # first frame of animated GIFs
+        return image
+
+    with pymupdf.open(source) as document:
+        page = document[0]
+        # Render just large enough for the biggest preview
+        scale = max(PREVIEW_SIZES.values()) / max(page.rect.width, page.rect.height)
+        pixmap = page.get_pixmap(matrix=pymupdf.Matrix(scale, scale), alpha=False)
+        return Image.open(io.BytesIO(pixmap.tobytes('png')))
+
+def render_previews(sha256, extension):
+    """Render every missing preview size of a blob; returns the sizes written"""
+    if not can_preview(extension):
+        return []
+
+    pil_format = OUTPUT_FORMAT[0]
+    missing = [size for size in PREVIEW_SIZES if not os.path.exists(preview_path(sha256, size))]
+    if not missing:
+        return []
+
+    image = _open_source(sha256, extension)
+    image = image.convert('RGB')
+    written = []
+    # Largest first, so each smaller size is resampled from an already reduced image
+    for size in sorted(missing, key=PREVIEW_SIZES.get, reverse=True):
+        image.thumbnail((PREVIEW_SIZES[size], PREVIEW_SIZES[size]))
+        target = preview_path(sha256, size)
+        temp_path = f"{target}.{uuid.uuid4()}.part"
+        image.save(temp_path, pil_format, quality=Config.RECEIPT_PREVIEW_QUALITY)
+        os.replace(temp_path, target)
+        written.append(size)
+
+    logger.info("[PREVIEWS] Rendered %s for blob %s", ', '.join(written), sha256)
+    return written
+
+def _render_in_background(sha256, extension):
+    try:
+        render_previews(sha256, extension)
+    except Exception as e:
+        logger.error("[PREVIEWS ERROR] Failed to render previews for %s: %s", sha256, str(e), exc_info=True)
+    finally:
+        with _lock:
+            _in_flight.discard(sha256)
+
+def schedule_previews(sha256, extension):
+    """Queue preview rendering for a freshly stored blob; never blocks the upload request"""
+    if not can_preview(extension):
+        return False
+    with _lock:
+        if sha256 in _in_flight:
+            return False
+        _in_flight.add(sha256)
+    _executor.submit(_render_in_background, sha256, extension)
+    return True
+
+def get_preview_path(sha256, extension, size):
+    """
+    Path of the derivative to serve for ?size=, or None to fall back to the
+    original. A preview requested before the background job got to it is
+    rendered on the spot.
+    """
+    if size not in PREVIEW_SIZES or not can_preview(extension):
+        return None
+    path = preview_path(sha256, size)
+    if not os.path.exists(path):
+        try:
+            render_previews(sha256, extension)
+        except Exception as e:
+            logger.error("[PREVIEWS ERROR] On-demand render failed for %s: %s", sha256, str(e), exc_info=True)
+            return None
+    # send_file resolves relative paths against the app root, not the working directory
+    return os.path.abspath(path)
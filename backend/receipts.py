@@ -1,52 +1,148 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from local_storage_service import (
     upload_receipt_to_local, 
     get_receipt_path, 
-    get_receipt_url,
-    delete_receipt_from_local
+    delete_receipt_from_local,
+    CONTENT_ADDRESSED_NAME,
+    UPLOAD_FOLDER
 )
-from models import db, Bill
-import json
+from models import db, Bill, Receipt, ScannedReceipt
+from bill_sync import mark_bills_changed
+from receipt_previews import schedule_previews, get_preview_path, image_dimensions, PREVIEW_SIZES, OUTPUT_FORMAT
+from config import Config
+import mimetypes
+from datetime import datetime
 import os
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 receipts_bp = Blueprint('receipts', __name__)
 
+# Not in every platform's mime.types
+mimetypes.add_type('image/webp', '.webp')
+
+def _can_read_blob(user_id, sha256):
+    """Blobs are shared between users, so reading one needs a receipt or scan of the caller's with that content"""
+    if db.session.query(Receipt.id).filter_by(user_id=user_id, sha256=sha256).first() is not None:
+        return True
+    return db.session.query(ScannedReceipt.id).filter_by(user_id=user_id, sha256=sha256).first() is not None
+
+def _send_receipt_file(file_path, etag, immutable):
+    """
+    Serve a receipt file with validators and caching headers. Conditional GETs
+    (If-None-Match / If-Modified-Since) are answered with 304 here in every mode;
+    Range requests are handled by Werkzeug, or by the proxy in sendfile modes.
+    Immutable files (content-addressed blobs and their previews) may be cached
+    for RECEIPT_CACHE_MAX_AGE; anything else must be revalidated.
+    """
+    mimetype = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+    stat = os.stat(file_path)
+    etag = etag or f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    mode = Config.RECEIPT_SENDFILE_MODE
+
+    if mode in ('x-accel', 'x-sendfile'):
+        response = current_app.response_class(mimetype=mimetype)
+        if mode == 'x-accel':
+            relative = os.path.relpath(file_path, os.path.abspath(UPLOAD_FOLDER)).replace(os.sep, '/')
+            response.headers['X-Accel-Redirect'] = f"{Config.RECEIPT_ACCEL_PREFIX.rstrip('/')}/{relative}"
+        else:
+            response.headers['X-Sendfile'] = file_path
+        response.set_etag(etag)
+        response.last_modified = stat.st_mtime
+        response.make_conditional(request)
+        if response.status_code == 304:
+            # Nothing for the proxy to send
+            response.headers.pop('X-Accel-Redirect', None)
+            response.headers.pop('X-Sendfile', None)
+    else:
+        response = send_file(file_path, mimetype=mimetype, etag=etag, conditional=True)
+
+    if immutable:
+        response.headers['Cache-Control'] = f"private, max-age={Config.RECEIPT_CACHE_MAX_AGE}, immutable"
+    else:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    logger.debug("[VIEW RECEIPT] %s %s via %s (etag: %s)", response.status_code, mimetype, mode, etag)
+    return response
+
+def _serialize_receipt(receipt):
+    # Built from the storage key alone; the Receipt row is the record, so no disk check per receipt
+    url = f"/api/receipts/view/{receipt.storage_key}"
+    return {
+        'bill_id': receipt.bill_id,
+        'receipt_url': url,
+        # Previews are only rendered for content-addressed blobs
+        'thumbnail_url': f"{url}?size=thumb" if receipt.sha256 else None,
+        'sha256': receipt.sha256,
+        'size': receipt.size,
+        'mime_type': receipt.mime_type,
+        'width': receipt.width,
+        'height': receipt.height,
+        'uploaded_at': receipt.uploaded_at.isoformat() if receipt.uploaded_at else None
+    }
+
+@receipts_bp.route('', methods=['GET'])
+@jwt_required()
+def get_receipts():
+    """
+    Receipts of many bills in one query: ?bill_ids=<id>,<id>,... Returns a map
+    of bill id to receipt; bills without a receipt (or not the user's) are left out.
+    """
+    user_id = get_jwt_identity()
+    bill_ids = [bill_id.strip() for bill_id in request.args.get('bill_ids', '').split(',') if bill_id.strip()]
+    logger.info("[GET RECEIPTS] Request from user_id: %s for %s bills", user_id, len(bill_ids))
+    
+    if not bill_ids:
+        return jsonify({'message': 'bill_ids is required'}), 400
+    if len(bill_ids) > Config.BILLS_PAGE_MAX:
+        return jsonify({'message': f'At most {Config.BILLS_PAGE_MAX} bill_ids per request'}), 400
+    
+    receipts = Receipt.query.filter(Receipt.user_id == user_id, Receipt.bill_id.in_(bill_ids)).all()
+    logger.info("[GET RECEIPTS] Found %s receipts for user %s", len(receipts), user_id)
+    return jsonify({receipt.bill_id: _serialize_receipt(receipt) for receipt in receipts}), 200
+
 @receipts_bp.route('/scan-receipt', methods=['POST'])
 @jwt_required()
 def scan_receipt():
     """Upload and process receipt using local storage"""
     user_id = get_jwt_identity()
-    logger.info(f"[SCAN RECEIPT] Request from user_id: {user_id}")
+    logger.info("[SCAN RECEIPT] Request from user_id: %s", user_id)
     
     if 'receipt' not in request.files:
-        logger.warning(f"[SCAN RECEIPT] No receipt file in request from user {user_id}")
+        logger.warning("[SCAN RECEIPT] No receipt file in request from user %s", user_id)
         return jsonify({'message': 'No receipt file provided'}), 400
     
     file = request.files['receipt']
-    logger.debug(f"[SCAN RECEIPT] File received: {file.filename}")
-    logger.debug(f"[SCAN RECEIPT] File content type: {file.content_type}")
+    logger.debug("[SCAN RECEIPT] File received: %s", file.filename)
+    logger.debug("[SCAN RECEIPT] File content type: %s", file.content_type)
     
     if file.filename == '':
-        logger.warning(f"[SCAN RECEIPT] Empty filename from user {user_id}")
+        logger.warning("[SCAN RECEIPT] Empty filename from user %s", user_id)
         return jsonify({'message': 'No file selected'}), 400
     
-    # Upload to local storage
-    logger.info(f"[SCAN RECEIPT] Uploading file '{file.filename}' to local storage")
-    result = upload_receipt_to_local(file, user_id)
-    logger.debug(f"[SCAN RECEIPT] Upload result: {result}")
+    # Upload to local storage. No bill owns a scan, so it takes no blob reference: attaching
+    # it later as a bill's receipt does, and otherwise the GC drops it after its grace period
+    logger.info("[SCAN RECEIPT] Uploading file '%s' to local storage", file.filename)
+    result = upload_receipt_to_local(file, user_id, take_reference=False)
+    logger.debug("[SCAN RECEIPT] Upload result: %s", result)
     
     if not result['success']:
-        logger.error(f"[SCAN RECEIPT] Failed to upload receipt: {result.get('error')}")
+        logger.error("[SCAN RECEIPT] Failed to upload receipt: %s", result.get('error'))
         return jsonify({'message': 'Failed to upload receipt', 'error': result.get('error')}), 500
     
-    logger.info(f"[SCAN RECEIPT] Successfully uploaded as: {result['filename']}")
-    logger.debug(f"[SCAN RECEIPT] File URL: {result['url']}")
+    try:
+        # The scan is how its uploader may view the file before attaching it to a bill
+        db.session.add(ScannedReceipt(user_id=user_id, sha256=result['sha256']))
+        db.session.commit()
+    except Exception as e:
+        logger.error("[SCAN RECEIPT ERROR] Failed to record receipt: %s", str(e), exc_info=True)
+        db.session.rollback()
+        return jsonify({'message': 'Failed to upload receipt'}), 500
+    
+    schedule_previews(result['sha256'], result['extension'])
+    logger.info("[SCAN RECEIPT] Successfully uploaded as: %s", result['filename'])
+    logger.debug("[SCAN RECEIPT] File URL: %s", result['url'])
     
     # Mock OCR processing (in real app, you'd use Tesseract OCR or similar)
     # For now, return a sample bill structure
@@ -59,11 +155,12 @@ def scan_receipt():
         'frequency': 'once',
         'is_paid': False,
         'notes': f"Receipt uploaded: {result['filename']}",
-        'receipt_url': result['url']
+        'receipt_url': result['url'],
+        'thumbnail_url': f"{result['url']}?size=thumb"
     }
     
-    logger.info(f"[SCAN RECEIPT] Returning mock bill data for user {user_id}")
-    logger.debug(f"[SCAN RECEIPT] Mock bill data: {mock_bill_data}")
+    logger.info("[SCAN RECEIPT] Returning mock bill data for user %s", user_id)
+    logger.debug("[SCAN RECEIPT] Mock bill data: %s", mock_bill_data)
     
     return jsonify(mock_bill_data), 200
 
@@ -72,214 +169,187 @@ def scan_receipt():
 def upload_bill_receipt(bill_id):
     """Upload receipt for existing bill"""
     user_id = get_jwt_identity()
-    logger.info(f"[UPLOAD RECEIPT] Request from user_id: {user_id} for bill_id: {bill_id}")
+    logger.info("[UPLOAD RECEIPT] Request from user_id: %s for bill_id: %s", user_id, bill_id)
     
     # Verify bill ownership
     bill = Bill.query.filter_by(id=bill_id, user_id=user_id).first()
-    logger.debug(f"[UPLOAD RECEIPT] Bill found: {bill is not None}")
+    logger.debug("[UPLOAD RECEIPT] Bill found: %s", bill is not None)
     
     if not bill:
-        logger.warning(f"[UPLOAD RECEIPT] Bill {bill_id} not found for user {user_id}")
+        logger.warning("[UPLOAD RECEIPT] Bill %s not found for user %s", bill_id, user_id)
         return jsonify({'message': 'Bill not found'}), 404
     
-    logger.debug(f"[UPLOAD RECEIPT] Bill details - Name: {bill.name}, Amount: {bill.amount}")
+    logger.debug("[UPLOAD RECEIPT] Bill details - Name: %s, Amount: %s", bill.name, bill.amount)
     
     if 'receipt' not in request.files:
-        logger.warning(f"[UPLOAD RECEIPT] No receipt file in request")
+        logger.warning("[UPLOAD RECEIPT] No receipt file in request")
         return jsonify({'message': 'No receipt file provided'}), 400
     
     file = request.files['receipt']
-    logger.debug(f"[UPLOAD RECEIPT] File received: {file.filename}")
-    logger.debug(f"[UPLOAD RECEIPT] File content type: {file.content_type}")
+    logger.debug("[UPLOAD RECEIPT] File received: %s", file.filename)
+    logger.debug("[UPLOAD RECEIPT] File content type: %s", file.content_type)
     
     if file.filename == '':
-        logger.warning(f"[UPLOAD RECEIPT] Empty filename")
+        logger.warning("[UPLOAD RECEIPT] Empty filename")
         return jsonify({'message': 'No file selected'}), 400
     
     # Upload to local storage
-    logger.info(f"[UPLOAD RECEIPT] Uploading file '{file.filename}' for bill {bill_id}")
+    logger.info("[UPLOAD RECEIPT] Uploading file '%s' for bill %s", file.filename, bill_id)
     result = upload_receipt_to_local(file, user_id)
-    logger.debug(f"[UPLOAD RECEIPT] Upload result: {result}")
+    logger.debug("[UPLOAD RECEIPT] Upload result: %s", result)
     
     if not result['success']:
-        logger.error(f"[UPLOAD RECEIPT] Failed to upload receipt: {result.get('error')}")
+        logger.error("[UPLOAD RECEIPT] Failed to upload receipt: %s", result.get('error'))
         return jsonify({'message': 'Failed to upload receipt'}), 500
     
-    logger.info(f"[UPLOAD RECEIPT] Successfully uploaded as: {result['filename']}")
+    logger.info("[UPLOAD RECEIPT] Successfully uploaded as: %s", result['filename'])
     
-    # Update bill notes with receipt info
-    notes_data = {}
-    if bill.notes:
-        logger.debug(f"[UPLOAD RECEIPT] Existing notes: {bill.notes}")
-        try:
-            notes_data = json.loads(bill.notes)
-            logger.debug(f"[UPLOAD RECEIPT] Parsed notes data: {notes_data}")
-        except Exception as e:
-            logger.warning(f"[UPLOAD RECEIPT] Failed to parse notes as JSON: {str(e)}")
-            notes_data = {'original_notes': bill.notes}
-    
-    # Delete old receipt if exists
-    old_receipt = notes_data.get('receipt_filename')
-    if old_receipt:
-        logger.info(f"[UPLOAD RECEIPT] Deleting old receipt: {old_receipt}")
-        delete_result = delete_receipt_from_local(old_receipt)
-        logger.debug(f"[UPLOAD RECEIPT] Old receipt deletion result: {delete_result}")
-    
-    notes_data['receipt_filename'] = result['filename']
-    bill.notes = json.dumps(notes_data)
-    logger.debug(f"[UPLOAD RECEIPT] Updated notes: {bill.notes}")
+    # Replace the bill's previous receipt, if any, releasing its file
+    receipt = bill.receipt
+    if receipt is not None:
+        logger.info("[UPLOAD RECEIPT] Deleting old receipt: %s", receipt.storage_key)
+        delete_result = delete_receipt_from_local(receipt.storage_key)
+        logger.debug("[UPLOAD RECEIPT] Old receipt deletion result: %s", delete_result)
+    else:
+        receipt = Receipt(bill_id=bill.id, user_id=user_id)
+        db.session.add(receipt)
+    
+    width, height = image_dimensions(result['sha256'], result['extension'])
+    receipt.storage_key = result['filename']
+    receipt.sha256 = result['sha256']
+    receipt.size = result['size']
+    receipt.mime_type = result['mime_type']
+    receipt.width = width
+    receipt.height = height
+    receipt.uploaded_at = datetime.utcnow()
     
     try:
+        mark_bills_changed(user_id, [bill])
         db.session.commit()
-        logger.info(f"[UPLOAD RECEIPT] Successfully updated bill {bill_id} with receipt")
+        logger.info("[UPLOAD RECEIPT] Successfully updated bill %s with receipt", bill_id)
     except Exception as e:
-        logger.error(f"[UPLOAD RECEIPT ERROR] Failed to commit changes: {str(e)}", exc_info=True)
+        logger.error("[UPLOAD RECEIPT ERROR] Failed to commit changes: %s", str(e), exc_info=True)
         db.session.rollback()
         return jsonify({'message': 'Failed to update bill'}), 500
     
-    return jsonify({
-        'message': 'Receipt uploaded successfully',
-        'receipt_url': result['url']
-    }), 200
+    schedule_previews(result['sha256'], result['extension'])
+    
+    return jsonify(dict(_serialize_receipt(receipt), message='Receipt uploaded successfully')), 200
 
 @receipts_bp.route('/<bill_id>/receipt', methods=['GET'])
 @jwt_required()
 def get_bill_receipt(bill_id):
     """Get receipt URL for a bill"""
     user_id = get_jwt_identity()
-    logger.info(f"[GET RECEIPT] Request from user_id: {user_id} for bill_id: {bill_id}")
+    logger.info("[GET RECEIPT] Request from user_id: %s for bill_id: %s", user_id, bill_id)
     
     # Verify bill ownership
     bill = Bill.query.filter_by(id=bill_id, user_id=user_id).first()
-    logger.debug(f"[GET RECEIPT] Bill found: {bill is not None}")
+    logger.debug("[GET RECEIPT] Bill found: %s", bill is not None)
     
     if not bill:
-        logger.warning(f"[GET RECEIPT] Bill {bill_id} not found for user {user_id}")
+        logger.warning("[GET RECEIPT] Bill %s not found for user %s", bill_id, user_id)
         return jsonify({'message': 'Bill not found'}), 404
     
-    # Get receipt filename from notes
-    try:
-        logger.debug(f"[GET RECEIPT] Bill notes: {bill.notes}")
-        notes_data = json.loads(bill.notes or '{}')
-        receipt_filename = notes_data.get('receipt_filename')
-        logger.debug(f"[GET RECEIPT] Receipt filename from notes: {receipt_filename}")
-        
-        if not receipt_filename:
-            logger.info(f"[GET RECEIPT] No receipt filename in notes for bill {bill_id}")
-            return jsonify({'message': 'No receipt found for this bill'}), 404
-        
-        # Get URL
-        logger.info(f"[GET RECEIPT] Getting URL for receipt: {receipt_filename}")
-        result = get_receipt_url(receipt_filename)
-        logger.debug(f"[GET RECEIPT] URL result: {result}")
-        
-        if result['success']:
-            logger.info(f"[GET RECEIPT] Successfully retrieved receipt URL for bill {bill_id}")
-            return jsonify({'receipt_url': result['url']}), 200
-        else:
-            logger.error(f"[GET RECEIPT] Failed to get receipt URL: {result.get('error')}")
-            return jsonify({'message': 'Failed to get receipt URL'}), 500
-            
-    except Exception as e:
-        logger.error(f"[GET RECEIPT ERROR] Error processing receipt: {str(e)}", exc_info=True)
+    receipt = bill.receipt
+    if receipt is None:
+        logger.info("[GET RECEIPT] No receipt for bill %s", bill_id)
         return jsonify({'message': 'No receipt found for this bill'}), 404
+    
+    logger.info("[GET RECEIPT] Successfully retrieved receipt for bill %s: %s", bill_id, receipt.storage_key)
+    return jsonify(_serialize_receipt(receipt)), 200
 
 @receipts_bp.route('/<bill_id>/receipt', methods=['DELETE'])
 @jwt_required()
 def delete_bill_receipt(bill_id):
     """Delete receipt for a bill"""
     user_id = get_jwt_identity()
-    logger.info(f"[DELETE RECEIPT] Request from user_id: {user_id} for bill_id: {bill_id}")
+    logger.info("[DELETE RECEIPT] Request from user_id: %s for bill_id: %s", user_id, bill_id)
     
     # Verify bill ownership
     bill = Bill.query.filter_by(id=bill_id, user_id=user_id).first()
-    logger.debug(f"[DELETE RECEIPT] Bill found: {bill is not None}")
+    logger.debug("[DELETE RECEIPT] Bill found: %s", bill is not None)
     
     if not bill:
-        logger.warning(f"[DELETE RECEIPT] Bill {bill_id} not found for user {user_id}")
+        logger.warning("[DELETE RECEIPT] Bill %s not found for user %s", bill_id, user_id)
         return jsonify({'message': 'Bill not found'}), 404
     
-    # Get receipt filename from notes
+    receipt = bill.receipt
+    if receipt is None:
+        logger.info("[DELETE RECEIPT] No receipt for bill %s", bill_id)
+        return jsonify({'message': 'No receipt found for this bill'}), 404
+    
+    # Delete file
+    logger.info("[DELETE RECEIPT] Deleting receipt file: %s", receipt.storage_key)
+    result = delete_receipt_from_local(receipt.storage_key)
+    logger.debug("[DELETE RECEIPT] Deletion result: %s", result)
+    
+    if not result['success']:
+        logger.error("[DELETE RECEIPT] Failed to delete receipt file: %s", result.get('error'))
+        return jsonify({'message': 'Failed to delete receipt'}), 500
+    
     try:
-        logger.debug(f"[DELETE RECEIPT] Bill notes: {bill.notes}")
-        notes_data = json.loads(bill.notes or '{}')
-        receipt_filename = notes_data.get('receipt_filename')
-        logger.debug(f"[DELETE RECEIPT] Receipt filename from notes: {receipt_filename}")
-        
-        if not receipt_filename:
-            logger.info(f"[DELETE RECEIPT] No receipt filename in notes for bill {bill_id}")
-            return jsonify({'message': 'No receipt found for this bill'}), 404
-        
-        # Delete file
-        logger.info(f"[DELETE RECEIPT] Deleting receipt file: {receipt_filename}")
-        result = delete_receipt_from_local(receipt_filename)
-        logger.debug(f"[DELETE RECEIPT] Deletion result: {result}")
-        
-        if result['success']:
-            # Update bill notes
-            del notes_data['receipt_filename']
-            bill.notes = json.dumps(notes_data) if notes_data else None
-            logger.debug(f"[DELETE RECEIPT] Updated notes after deletion: {bill.notes}")
-            
-            try:
-                db.session.commit()
-                logger.info(f"[DELETE RECEIPT] Successfully deleted receipt for bill {bill_id}")
-            except Exception as e:
-                logger.error(f"[DELETE RECEIPT ERROR] Failed to commit changes: {str(e)}", exc_info=True)
-                db.session.rollback()
-                return jsonify({'message': 'Failed to update bill'}), 500
-            
-            return jsonify({'message': 'Receipt deleted successfully'}), 200
-        else:
-            logger.error(f"[DELETE RECEIPT] Failed to delete receipt file: {result.get('error')}")
-            return jsonify({'message': 'Failed to delete receipt'}), 500
-            
+        db.session.delete(receipt)
+        mark_bills_changed(user_id, [bill])
+        db.session.commit()
+        logger.info("[DELETE RECEIPT] Successfully deleted receipt for bill %s", bill_id)
     except Exception as e:
-        logger.error(f"[DELETE RECEIPT ERROR] Error processing request: {str(e)}", exc_info=True)
-        return jsonify({'message': 'Error processing request'}), 500
+        logger.error("[DELETE RECEIPT ERROR] Failed to commit changes: %s", str(e), exc_info=True)
+        db.session.rollback()
+        return jsonify({'message': 'Failed to update bill'}), 500
+    
+    return jsonify({'message': 'Receipt deleted successfully'}), 200
 
 @receipts_bp.route('/view/<user_id>/<filename>', methods=['GET'])
 @jwt_required()
 def view_receipt(user_id, filename):
-    """Serve receipt file"""
+    """Serve receipt file; ?size=thumb|medium returns a small preview instead of the original (?size=full)"""
     current_user_id = get_jwt_identity()
-    logger.info(f"[VIEW RECEIPT] Request from user_id: {current_user_id} to view {user_id}/{filename}")
+    size = request.args.get('size', 'full')
+    logger.info("[VIEW RECEIPT] Request from user_id: %s to view %s/%s (size: %s)", current_user_id, user_id, filename, size)
+    
+    if size != 'full' and size not in PREVIEW_SIZES:
+        return jsonify({'message': f"Invalid size, expected one of: full, {', '.join(PREVIEW_SIZES)}"}), 400
     
     # Security check - users can only view their own receipts
     if current_user_id != user_id:
-        logger.warning(f"[VIEW RECEIPT] Unauthorized access attempt - user {current_user_id} trying to access {user_id}'s receipt")
+        logger.warning("[VIEW RECEIPT] Unauthorized access attempt - user %s trying to access %s's receipt", current_user_id, user_id)
         return jsonify({'message': 'Unauthorized'}), 403
     
+    # The user segment does not select the file for content-addressed names, so ownership is checked on the content
+    if CONTENT_ADDRESSED_NAME.match(filename) and not _can_read_blob(current_user_id, filename.split('.', 1)[0]):
+        logger.warning("[VIEW RECEIPT] User %s has no receipt with content %s", current_user_id, filename)
+        return jsonify({'message': 'File not found'}), 404
+    
     # Get file path
     full_filename = f"{user_id}/{filename}"
-    logger.info(f"[VIEW RECEIPT] Getting path for file: {full_filename}")
+    logger.info("[VIEW RECEIPT] Getting path for file: %s", full_filename)
     result = get_receipt_path(full_filename)
-    logger.debug(f"[VIEW RECEIPT] Path result: {result}")
+    logger.debug("[VIEW RECEIPT] Path result: %s", result)
     
     if result['success']:
         file_path = result['path']
-        logger.info(f"[VIEW RECEIPT] File found at: {file_path}")
+        logger.info("[VIEW RECEIPT] File found at: %s", file_path)
         
-        # Determine file type
-        file_extension = filename.rsplit('.', 1)[1].lower()
-        logger.debug(f"[VIEW RECEIPT] File extension: {file_extension}")
-        
-        if file_extension in ['jpg', 'jpeg']:
-            mimetype = 'image/jpeg'
-        elif file_extension == 'png':
-            mimetype = 'image/png'
-        elif file_extension == 'pdf':
-            mimetype = 'application/pdf'
-        else:
-            mimetype = 'application/octet-stream'
-        
-        logger.info(f"[VIEW RECEIPT] Serving file with mimetype: {mimetype}")
+        # Content-addressed blobs (<sha256>.<ext>) never change, and neither do their previews
+        content_addressed = bool(CONTENT_ADDRESSED_NAME.match(filename))
+        etag = filename.split('.', 1)[0] if content_addressed else None
         
         try:
-            return send_file(file_path, mimetype=mimetype)
+            if size != 'full' and content_addressed:
+                sha256, extension = filename.split('.', 1)
+                preview = get_preview_path(sha256, extension, size)
+                if preview:
+                    logger.info("[VIEW RECEIPT] Serving %s preview", size)
+                    return _send_receipt_file(preview, f"{sha256}-{size}-{OUTPUT_FORMAT[1]}", immutable=True)
+                logger.debug("[VIEW RECEIPT] No %s preview available, serving the original", size)
+                # The preview may exist later, so this fallback must not be cached under the preview URL
+                return _send_receipt_file(file_path, etag, immutable=False)
+            
+            return _send_receipt_file(file_path, etag, immutable=content_addressed)
         except Exception as e:
-            logger.error(f"[VIEW RECEIPT ERROR] Failed to send file: {str(e)}", exc_info=True)
+            logger.error("[VIEW RECEIPT ERROR] Failed to send file: %s", str(e), exc_info=True)
             return jsonify({'message': 'Error serving file'}), 500
     else:
-        logger.warning(f"[VIEW RECEIPT] File not found: {full_filename}")
+        logger.warning("[VIEW RECEIPT] File not found: %s", full_filename)
         return jsonify({'message': 'File not found'}), 404
\ No newline at end of file
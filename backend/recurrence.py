@@ -0,0 +1,203 @@
+# recurrence.py
+#
+# Recurring bills. Each occurrence of a recurring bill is its own Bill row; the
+# occurrences of one series share series_id (the id of the first occurrence)
+# and anchor_day (the day of month the series was created on, so a bill due on
+# the 31st lands on Feb 28/29 and returns to the 31st in March).
+#
+# New occurrences come from two places:
+#   rollover_bill()           - when an occurrence is paid, its successor is created
+#   materialize_upcoming()    - nightly, every series is extended up to the horizon
+# Both check for an existing (series_id, due_date) row first, and the unique
+# index on those columns backs that up, so re-running either never duplicates.
+# Neither recreates an occurrence the user deleted: its BillTombstone keeps the
+# (series_id, due_date) pair, so deleting an occurrence skips that date and the
+# series goes on. A series ends when its latest occurrence is switched to a
+# non-recurring frequency ('once').
+
+from sqlalchemy import func, update
+from models import db, Bill, BillTombstone, ReminderSettings
+from bill_sync import next_version
+from reminder_jobs import sync_bill_job, create_jobs_for_new_bills
+from config import Config
+from datetime import datetime, timedelta
+import calendar
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Frequency -> (months, days) between consecutive occurrences
+RECURRENCE_STEPS = {
+    'weekly': (0, 7),
+    'monthly': (1, 0),
+    'quarterly': (3, 0),
+    'yearly': (12, 0)
+}
+
+# Columns copied from an occurrence to its successor
+TEMPLATE_COLUMNS = (
+    'user_id', 'name', 'amount', 'category', 'frequency',
+    'enable_whatsapp', 'enable_call', 'enable_sms', 'enable_local_notification'
+)
+
+def is_recurring(frequency):
+    return (frequency or '').strip().lower() in RECURRENCE_STEPS
+
+def _add_months(value, months, anchor_day):
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(anchor_day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+def next_due_date(due_date, frequency, anchor_day=None):
+    """Due date of the occurrence after `due_date`, or None for a non-recurring frequency"""
+    step = RECURRENCE_STEPS.get((frequency or '').strip().lower())
+    if step is None:
+        return None
+    months, days = step
+    if months:
+        return _add_months(due_date, months, anchor_day or due_date.day)
+    return due_date + timedelta(days=days)
+
+def _occurrence_exists(series_id, due_date):
+    return db.session.query(Bill.id).filter(
+        Bill.series_id == series_id,
+        Bill.due_date == due_date
+    ).first() is not None
+
+def _occurrence_deleted(series_id, due_date):
+    return db.session.query(BillTombstone.id).filter(
+        BillTombstone.series_id == series_id,
+        BillTombstone.due_date == due_date
+    ).first() is not None
+
+def _deleted_occurrences(start, end):
+    """(series_id, due_date) of every deleted occurrence due in [start, end)"""
+    rows = db.session.query(BillTombstone.series_id, BillTombstone.due_date).filter(
+        BillTombstone.series_id.isnot(None),
+        BillTombstone.due_date >= start,
+        BillTombstone.due_date < end
+    )
+    return {(series_id, due_date) for series_id, due_date in rows}
+
+def rollover_bill(bill):
+    """
+    Create the occurrence following a just-paid recurring bill, unless it
+    already exists. Returns the new Bill (added to the session, not committed)
+    or None. The caller stamps it with mark_bills_changed.
+    """
+    if not is_recurring(bill.frequency):
+        return None
+
+    if bill.series_id is None:
+        bill.series_id = bill.id
+    if bill.anchor_day is None:
+        bill.anchor_day = bill.due_date.day
+
+    due_date = next_due_date(bill.due_date, bill.frequency, bill.anchor_day)
+    if _occurrence_exists(bill.series_id, due_date):
+        logger.info("[RECURRENCE] Next occurrence of series %s on %s already exists", bill.series_id, due_date)
+        return None
+    if _occurrence_deleted(bill.series_id, due_date):
+        logger.info("[RECURRENCE] Next occurrence of series %s on %s was deleted", bill.series_id, due_date)
+        return None
+
+    next_bill = Bill(
+        series_id=bill.series_id,
+        anchor_day=bill.anchor_day,
+        due_date=due_date,
+        **{column: getattr(bill, column) for column in TEMPLATE_COLUMNS}
+    )
+    db.session.add(next_bill)
+    sync_bill_job(next_bill)
+    logger.info("[RECURRENCE] Rolled series %s over to %s", bill.series_id, due_date)
+    return next_bill
+
+def _latest_occurrences(horizon_end):
+    """
+    The latest occurrence of every recurring series that ends before the horizon,
+    found with one grouped subquery. A bill that was never rolled over is its
+    own series (series_id NULL, keyed by its id).
+    """
+    series_key = func.coalesce(Bill.series_id, Bill.id)
+    latest = db.session.query(
+        series_key.label('series_key'),
+        func.max(Bill.due_date).label('due_date')
+    ).filter(
+        (Bill.series_id.isnot(None)) | (Bill.frequency.in_(tuple(RECURRENCE_STEPS)))
+    ).group_by(series_key).subquery()
+
+    columns = [getattr(Bill, column) for column in TEMPLATE_COLUMNS]
+    return db.session.query(Bill.id, Bill.series_id, Bill.anchor_day, Bill.due_date, *columns).join(
+        latest,
+        (func.coalesce(Bill.series_id, Bill.id) == latest.c.series_key) & (Bill.due_date == latest.c.due_date)
+    ).filter(
+        latest.c.due_date < horizon_end,
+        Bill.frequency.in_(tuple(RECURRENCE_STEPS))
+    ).order_by(Bill.user_id).yield_per(Config.OVERDUE_CHUNK_SIZE)
+
+def materialize_upcoming(now=None, horizon_days=None):
+    """
+    Pre-create every occurrence due between today and the horizon for all
+    recurring series, in bulk: executemany inserts, one version bump and one
+    vectorized reminder-job pass per user. Past occurrences a series skipped
+    (e.g. while the app was unused) are not back-filled, and deleted
+    occurrences are not recreated. Commits.
+    """
+    now = now or datetime.now()
+    horizon_days = Config.RECURRENCE_HORIZON_DAYS if horizon_days is None else horizon_days
+    today = datetime.combine(now.date(), datetime.min.time())
+    horizon_end = today + timedelta(days=horizon_days + 1)
+    created_at = datetime.utcnow()
+    deleted = _deleted_occurrences(today, horizon_end)
+
+    new_rows_by_user = {}
+    new_roots = []
+    for row in _latest_occurrences(horizon_end):
+        template = {column: getattr(row, column) for column in TEMPLATE_COLUMNS}
+        series_id = row.series_id or row.id
+        anchor_day = row.anchor_day or row.due_date.day
+        if row.series_id is None:
+            new_roots.append({'id': row.id, 'series_id': series_id, 'anchor_day': anchor_day})
+
+        due_date = next_due_date(row.due_date, row.frequency, anchor_day)
+        while due_date < horizon_end:
+            if due_date >= today and (series_id, due_date) not in deleted:
+                new_rows_by_user.setdefault(row.user_id, []).append(dict(
+                    template,
+                    id=str(uuid.uuid4()),
+                    series_id=series_id,
+                    anchor_day=anchor_day,
+                    due_date=due_date,
+                    is_paid=False,
+                    notes=None,
+                    created_at=created_at
+                ))
+            due_date = next_due_date(due_date, row.frequency, anchor_day)
+
+    if new_roots:
+        db.session.execute(update(Bill), new_roots)
+
+    user_ids = list(new_rows_by_user)
+    settings_by_user = {}
+    for start in range(0, len(user_ids), 500):
+        chunk = user_ids[start:start + 500]
+        settings_by_user.update(
+            (settings.user_id, settings)
+            for settings in ReminderSettings.query.filter(ReminderSettings.user_id.in_(chunk))
+        )
+
+    created = 0
+    for user_id, rows in new_rows_by_user.items():
+        version = next_version(user_id)
+        for row in rows:
+            row['sync_version'] = version
+        db.session.execute(Bill.__table__.insert(), rows)
+        create_jobs_for_new_bills(user_id, rows, settings=settings_by_user.get(user_id), now=now)
+        created += len(rows)
+
+    db.session.commit()
+    logger.info("[RECURRENCE] Materialized %s occurrences for %s users up to %s", created, len(new_rows_by_user), horizon_end.date())
+    return created
@@ -0,0 +1,225 @@
+# reminder_jobs.py
+
+from datetime import datetime, time
+from models import db, Bill, User, ReminderSettings, ReminderJob
+from sqlalchemy.orm import selectinload
+import numpy as np
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Used when a user has no reminder settings yet
+DEFAULT_DAYS_BEFORE = 3
+DEFAULT_PREFERRED_TIME = '09:00'
+
+def parse_preferred_time(preferred_time):
+    """Parse an 'HH:MM' string into minutes after midnight, falling back to the default reminder time"""
+    try:
+        hour, minute = (int(part) for part in (preferred_time or DEFAULT_PREFERRED_TIME).split(':'))
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(preferred_time)
+        return hour * 60 + minute
+    except (ValueError, TypeError):
+        logger.warning("[REMINDER JOBS] Invalid preferred time '%s', using %s", preferred_time, DEFAULT_PREFERRED_TIME)
+        return 9 * 60
+
+def _settings_timing(settings):
+    """Return (days_before, minutes after midnight) for a user's settings row"""
+    if settings is None:
+        return DEFAULT_DAYS_BEFORE, parse_preferred_time(DEFAULT_PREFERRED_TIME)
+    days_before = settings.days_before if settings.days_before is not None else DEFAULT_DAYS_BEFORE
+    return max(int(days_before), 0), parse_preferred_time(settings.preferred_time)
+
+def compute_fire_times(due_dates, days_before, fire_minutes, after):
+    """
+    Vectorized reminder slot computation. For every bill, return the first
+    slot strictly after `after` at the user's preferred time on a day within
+    `days_before` days of the due date, or None when no reminder is left.
+    All bills are evaluated in one pass over NumPy arrays.
+    """
+    if len(due_dates) == 0:
+        return []
+
+    due_days = np.array(due_dates, dtype='datetime64[s]').astype('datetime64[D]')
+    window = np.array(days_before, dtype='int64').astype('timedelta64[D]')
+    minutes = np.array(fire_minutes, dtype='int64').astype('timedelta64[m]')
+    after_s = np.datetime64(after, 's')
+
+    first_day = np.maximum(due_days - window, after_s.astype('datetime64[D]'))
+    candidates = first_day.astype('datetime64[s]') + minutes
+    candidates = np.where(candidates <= after_s, candidates + np.timedelta64(1, 'D'), candidates)
+    valid = candidates.astype('datetime64[D]') <= due_days
+
+    return [fire_at if ok else None for fire_at, ok in zip(candidates.tolist(), valid.tolist())]
+
+def compute_next_fire_at(due_date, settings, after):
+    """Scalar convenience wrapper around compute_fire_times for a single bill"""
+    days_before, fire_minutes = _settings_timing(settings)
+    return compute_fire_times([due_date], [days_before], [fire_minutes], after)[0]
+
+def _apply_fire_time(bill, next_fire_at):
+    """Create, move or drop a bill's job so it matches the computed fire time"""
+    job = bill.reminder_job
+    if next_fire_at is None:
+        if job is not None:
+            logger.debug("[REMINDER JOBS] Removing job for bill %s", bill.id)
+            bill.reminder_job = None
+        return None
+
+    if job is None:
+        job = ReminderJob(user_id=bill.user_id, next_fire_at=next_fire_at)
+        bill.reminder_job = job
+        logger.debug("[REMINDER JOBS] Scheduled bill %s for %s", bill.id, next_fire_at)
+    elif job.next_fire_at != next_fire_at:
+        logger.debug("[REMINDER JOBS] Rescheduled bill %s: %s -> %s", bill.id, job.next_fire_at, next_fire_at)
+        job.next_fire_at = next_fire_at
+    return job
+
+def _sync_bills(bills_with_settings, now):
+    """Recompute the jobs of many (bill, settings) pairs with a single vectorized call"""
+    if not bills_with_settings:
+        return
+
+    timings = [_settings_timing(settings) for _, settings in bills_with_settings]
+    fire_times = compute_fire_times(
+        [bill.due_date for bill, _ in bills_with_settings],
+        [days_before for days_before, _ in timings],
+        [fire_minutes for _, fire_minutes in timings],
+        now
+    )
+
+    # Callers preload Bill.reminder_job; without autoflush each new job is not flushed on the next access
+    with db.session.no_autoflush:
+        for (bill, _), next_fire_at in zip(bills_with_settings, fire_times):
+            _apply_fire_time(bill, None if bill.is_paid else next_fire_at)
+
+def sync_bill_job(bill, settings=None, now=None):
+    """
+    Bring a bill's queue entry in line with its current state. Must be called
+    before the commit whenever a bill is created, updated or paid; deleting a
+    bill removes its job through the relationship cascade.
+    """
+    now = now or datetime.now()
+
+    if settings is None:
+        settings = ReminderSettings.query.filter_by(user_id=bill.user_id).first()
+
+    next_fire_at = None
+    if not bill.is_paid:
+        next_fire_at = compute_next_fire_at(bill.due_date, settings, now)
+    return _apply_fire_time(bill, next_fire_at)
+
+def sync_user_jobs(user_id, settings=None, now=None):
+    """Recompute the jobs of every unpaid bill of a user, e.g. after a settings change"""
+    now = now or datetime.now()
+
+    if settings is None:
+        settings = ReminderSettings.query.filter_by(user_id=user_id).first()
+
+    bills = Bill.query.options(selectinload(Bill.reminder_job)).filter(
+        Bill.user_id == user_id,
+        Bill.is_paid == False
+    ).all()
+
+    logger.info("[REMINDER JOBS] Syncing %s jobs for user %s", len(bills), user_id)
+    _sync_bills([(bill, settings) for bill in bills], now)
+
+def sync_jobs_for_bills(bill_ids, now=None, chunk_size=500):
+    """Recompute the jobs of specific bills (paid or not) after a bulk update"""
+    now = now or datetime.now()
+    for start in range(0, len(bill_ids), chunk_size):
+        rows = db.session.query(Bill, ReminderSettings).options(selectinload(Bill.reminder_job)).outerjoin(
+            ReminderSettings, ReminderSettings.user_id == Bill.user_id
+        ).filter(Bill.id.in_(bill_ids[start:start + chunk_size])).all()
+        _sync_bills(rows, now)
+
+def create_jobs_for_new_bills(user_id, bill_rows, settings=None, now=None):
+    """
+    Bulk counterpart of sync_bill_job for bills just inserted with Core
+    (dicts with id, due_date and is_paid) that cannot have a job yet: one
+    vectorized fire-time pass and one executemany insert, no ORM objects.
+    """
+    now = now or datetime.now()
+    unpaid = [row for row in bill_rows if not row['is_paid']]
+    if not unpaid:
+        return 0
+
+    if settings is None:
+        settings = ReminderSettings.query.filter_by(user_id=user_id).first()
+    days_before, fire_minutes = _settings_timing(settings)
+    fire_times = compute_fire_times(
+        [row['due_date'] for row in unpaid],
+        [days_before] * len(unpaid),
+        [fire_minutes] * len(unpaid),
+        now
+    )
+
+    created_at = datetime.utcnow()
+    jobs = [
+        {'id': str(uuid.uuid4()), 'bill_id': row['id'], 'user_id': user_id,
+         'next_fire_at': fire_at, 'created_at': created_at, 'updated_at': created_at}
+        for row, fire_at in zip(unpaid, fire_times) if fire_at is not None
+    ]
+    if jobs:
+        db.session.execute(ReminderJob.__table__.insert(), jobs)
+    logger.info("[REMINDER JOBS] Created %s jobs for %s new bills of user %s", len(jobs), len(bill_rows), user_id)
+    return len(jobs)
+
+def fetch_due_jobs(now, limit):
+    """Select up to `limit` jobs whose fire time has passed, with everything needed to deliver them"""
+    return db.session.query(ReminderJob, Bill, User, ReminderSettings).join(
+        Bill, Bill.id == ReminderJob.bill_id
+    ).join(
+        User, User.id == ReminderJob.user_id
+    ).outerjoin(
+        ReminderSettings, ReminderSettings.user_id == ReminderJob.user_id
+    ).filter(
+        ReminderJob.next_fire_at <= now
+    ).order_by(
+        ReminderJob.next_fire_at
+    ).limit(limit).all()
+
+def advance_jobs(rows, now):
+    """Move a batch of fired (job, bill, settings) rows to their next slot, dropping finished jobs"""
+    if not rows:
+        return
+
+    timings = [_settings_timing(settings) for _, _, settings in rows]
+    fire_times = compute_fire_times(
+        [bill.due_date for _, bill, _ in rows],
+        [days_before for days_before, _ in timings],
+        [fire_minutes for _, fire_minutes in timings],
+        now
+    )
+
+    for (job, bill, _), next_fire_at in zip(rows, fire_times):
+        if next_fire_at is None:
+            logger.debug("[REMINDER JOBS] Window over for bill %s, removing job", bill.id)
+            db.session.delete(job)
+        else:
+            job.next_fire_at = next_fire_at
+
+def backfill_reminder_jobs(now=None):
+    """
+    Backfill the queue for unpaid bills that have no job yet, e.g. bills
+    created before the queue existed. Safe to run on every start.
+    """
+    now = now or datetime.now()
+    earliest_due = datetime.combine(now.date(), time.min)
+
+    rows = db.session.query(Bill, ReminderSettings).options(selectinload(Bill.reminder_job)).outerjoin(
+        ReminderJob, ReminderJob.bill_id == Bill.id
+    ).outerjoin(
+        ReminderSettings, ReminderSettings.user_id == Bill.user_id
+    ).filter(
+        ReminderJob.id.is_(None),
+        Bill.is_paid == False,
+        Bill.due_date >= earliest_due
+    ).all()
+
+    logger.info("[REMINDER JOBS] Backfilling jobs for %s bills", len(rows))
+    _sync_bills(rows, now)
+
+    db.session.commit()
+    return len(rows)
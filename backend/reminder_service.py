@@ -1,97 +1,226 @@
 import os
+import json
+import hashlib
 import requests
-from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
 from twilio.rest import Client
 import google.generativeai as genai
 from config import Config
+from cache import TTLCache
+from http_transport import TIMEOUT, get_session, get_twilio_http_client
+from message_templates import greeting_bucket, get_greeting, render_reminder
+from models import db, ReminderMessage
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 # Configure Gemini
 logger.info("[GEMINI CONFIG] Configuring Gemini AI")
 genai.configure(api_key=Config.GOOGLE_API_KEY)
-logger.debug(f"[GEMINI CONFIG] API key configured: {'*' * 10 + Config.GOOGLE_API_KEY[-4:] if Config.GOOGLE_API_KEY else 'NOT SET'}")
+logger.debug("[GEMINI CONFIG] API key configured: %s", '*' * 10 + Config.GOOGLE_API_KEY[-4:] if Config.GOOGLE_API_KEY else 'NOT SET')
 
-def generate_reminder_message(name, bill_data):
-    """Generate reminder message using Gemini AI"""
-    logger.info(f"[MESSAGE GEN] Starting message generation for user: {name}")
-    logger.debug(f"[MESSAGE GEN] Bill data received: {bill_data}")
+# LLM-personalized variants are cached in memory and persisted in the ReminderMessage table
+_message_cache = TTLCache(Config.MESSAGE_CACHE_SIZE, Config.MESSAGE_CACHE_TTL_SECONDS)
+_gemini_model = None
+
+# Background enrichment: one worker, so Gemini never sees more than one prompt at a time
+_enrichment_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='llm-enrich')
+_enrichment_in_flight = set()
+_enrichment_lock = threading.Lock()
+
+def _get_gemini_model():
+    """Build the Gemini model once and reuse it for every prompt"""
+    global _gemini_model
+    if _gemini_model is None:
+        _gemini_model = genai.GenerativeModel('gemini-1.5-flash-latest')
+    return _gemini_model
+
+def message_cache_key(name, bill_data, bucket, locale):
+    """Cache key for (user name, bill name, amount, due date, greeting bucket, locale)"""
+    raw = '|'.join(str(part) for part in (
+        name, bill_data.get('name'), bill_data.get('amount'), bill_data.get('due_date'), bucket, locale
+    ))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def _load_persisted_messages(keys):
+    """Fetch unexpired messages for many keys with one query; needs an app context"""
+    if not keys or not has_app_context():
+        return {}
+    rows = ReminderMessage.query.filter(
+        ReminderMessage.cache_key.in_(keys),
+        ReminderMessage.expires_at > datetime.utcnow()
+    ).all()
+    return {row.cache_key: row.message for row in rows}
+
+def _persist_messages(messages):
+    """Upsert generated messages into the persistent store; needs an app context"""
+    if not messages or not has_app_context():
+        return
+    expires_at = datetime.utcnow() + timedelta(seconds=Config.MESSAGE_CACHE_TTL_SECONDS)
+    try:
+        for key, message in messages.items():
+            db.session.merge(ReminderMessage(cache_key=key, message=message, expires_at=expires_at))
+        db.session.commit()
+    except Exception as e:
+        logger.error("[MESSAGE CACHE ERROR] Failed to persist messages: %s", str(e), exc_info=True)
+        db.session.rollback()
+
+def purge_expired_messages():
+    """Delete expired rows from the persistent message store"""
+    deleted = ReminderMessage.query.filter(ReminderMessage.expires_at <= datetime.utcnow()).delete()
+    db.session.commit()
+    logger.info("[MESSAGE CACHE] Purged %s expired messages", deleted)
+    return deleted
+
+def _generate_batch_with_gemini(items, greeting, locale):
+    """Generate messages for many (name, bill_data) pairs with a single Gemini prompt"""
+    reminders = "\n".join(
+        f"{index + 1}. Name: {name}; Bill: {bill_data.get('name')}; "
+        f"Amount: ₹{bill_data.get('amount')}; Due Date: {bill_data.get('due_date')}"
+        for index, (name, bill_data) in enumerate(items)
+    )
+    prompt = f"""
+    You are a friendly financial assistant creating reminder messages.
     
-    gemini_model = genai.GenerativeModel('gemini-1.5-flash-latest')
+    For each numbered reminder below, create a natural, friendly reminder with this structure:
+    1. Start with: "Hey <name>, {greeting}."
+    2. Remind about the bill payment with its bill name, amount and due date.
+    3. End with: "Hope you have a nice day."
     
-    current_hour = datetime.now().hour
-    logger.debug(f"[MESSAGE GEN] Current hour: {current_hour}")
+    Keep each one brief and friendly, and write it in the language with code '{locale}'.
+    Reply with only a JSON array of {len(items)} strings, in the same order as the reminders.
     
-    if 5 <= current_hour < 12:
-        greeting = "Good morning"
-    elif 12 <= current_hour < 17:
-        greeting = "Good afternoon"
-    else:
-        greeting = "Good evening"
+    {reminders}
+    """
     
-    logger.debug(f"[MESSAGE GEN] Selected greeting: {greeting}")
+    logger.info("[MESSAGE GEN] Calling Gemini AI to generate %s messages", len(items))
+    response = _get_gemini_model().generate_content(prompt)
     
-    prompt = f"""
-    You are a friendly financial assistant creating a reminder message.
-    
-    Create a natural, friendly reminder with this structure:
-    1. Start with: "Hey {name}, {greeting}."
-    2. Remind about the bill payment:
-       - Bill: {bill_data.get('name')}
-       - Amount: ₹{bill_data.get('amount')}
-       - Due Date: {bill_data.get('due_date')}
-    3. End with: "Hope you have a nice day."
+    # Gemini sometimes wraps the JSON in a code fence, so parse just the array
+    text = response.text
+    messages = json.loads(text[text.find('['):text.rfind(']') + 1])
     
-    Keep it brief and friendly.
+    if not isinstance(messages, list) or len(messages) != len(items):
+        raise ValueError(f"Expected {len(items)} messages, got {len(messages) if isinstance(messages, list) else type(messages).__name__}")
+    return [str(message).strip() for message in messages]
+
+def _enrich_messages(app, misses, greeting, locale):
+    """Background task: generate LLM variants for cache misses and store them for later sends"""
+    try:
+        miss_keys = list(misses)
+        for start in range(0, len(miss_keys), Config.MESSAGE_BATCH_SIZE):
+            batch_keys = miss_keys[start:start + Config.MESSAGE_BATCH_SIZE]
+            try:
+                messages = _generate_batch_with_gemini([misses[key] for key in batch_keys], greeting, locale)
+            except Exception as e:
+                logger.error("[MESSAGE GEN ERROR] Gemini enrichment failed: %s", str(e), exc_info=True)
+                continue
+            
+            generated = dict(zip(batch_keys, messages))
+            for key, message in generated.items():
+                _message_cache.set(key, message)
+            if app is not None:
+                with app.app_context():
+                    _persist_messages(generated)
+            logger.info("[MESSAGE GEN] Stored %s LLM-personalized messages", len(generated))
+    finally:
+        with _enrichment_lock:
+            _enrichment_in_flight.difference_update(misses)
+
+def _schedule_enrichment(misses, greeting, locale):
+    """Queue LLM generation for messages nobody is generating yet"""
+    with _enrichment_lock:
+        misses = {key: item for key, item in misses.items() if key not in _enrichment_in_flight}
+        _enrichment_in_flight.update(misses)
+    if not misses:
+        return
+    app = current_app._get_current_object() if has_app_context() else None
+    logger.debug("[MESSAGE GEN] Queueing %s messages for background enrichment", len(misses))
+    _enrichment_executor.submit(_enrich_messages, app, misses, greeting, locale)
+
+def generate_reminder_messages(items, locale=None):
+    """
+    Render reminder messages for a list of (name, bill_data) pairs. The local
+    template is the primary path; an LLM-personalized variant is used when one
+    is already cached, and missing variants are generated in the background so
+    that delivery never waits on Gemini.
     """
+    locale = locale or Config.DEFAULT_LOCALE
+    hour = datetime.now().hour
+    bucket = greeting_bucket(hour)
+    keys = [message_cache_key(name, bill_data, bucket, locale) for name, bill_data in items]
     
-    logger.debug(f"[MESSAGE GEN] Generated prompt for Gemini: {prompt[:200]}...")
+    if not Config.LLM_ENRICHMENT_ENABLED:
+        return [render_reminder(name, bill_data, hour, locale) for name, bill_data in items]
     
-    try:
-        logger.info("[MESSAGE GEN] Calling Gemini AI to generate message")
-        response = gemini_model.generate_content(prompt)
-        generated_message = response.text.strip()
-        logger.info(f"[MESSAGE GEN] Successfully generated message via Gemini")
-        logger.debug(f"[MESSAGE GEN] Generated message: {generated_message}")
-        return generated_message
-    except Exception as e:
-        logger.error(f"[MESSAGE GEN ERROR] Gemini generation failed: {str(e)}", exc_info=True)
-        # Fallback message
-        fallback_message = (
-            f"Hi {name}, this is a reminder that your payment for '{bill_data.get('name')}' "
-            f"is due on {bill_data.get('due_date')}. Amount due: ₹{bill_data.get('amount')}."
-        )
-        logger.info("[MESSAGE GEN] Using fallback message due to Gemini error")
-        logger.debug(f"[MESSAGE GEN] Fallback message: {fallback_message}")
-        return fallback_message
+    results = {}
+    for key in set(keys):
+        message = _message_cache.get(key)
+        if message is not None:
+            results[key] = message
+    
+    persisted = _load_persisted_messages([key for key in set(keys) if key not in results])
+    for key, message in persisted.items():
+        _message_cache.set(key, message)
+    results.update(persisted)
+    
+    misses = {}
+    for key, item in zip(keys, items):
+        if key not in results:
+            misses.setdefault(key, item)
+    
+    logger.info("[MESSAGE GEN] %s messages requested, %s without an LLM variant yet", len(items), len(misses))
+    if misses:
+        _schedule_enrichment(misses, get_greeting(hour, locale), locale)
+    
+    return [
+        results.get(key) or render_reminder(name, bill_data, hour, locale)
+        for key, (name, bill_data) in zip(keys, items)
+    ]
+
+def generate_reminder_message(name, bill_data, locale=None):
+    """Render a reminder message, preferring a cached Gemini variant over the template"""
+    logger.info("[MESSAGE GEN] Starting message generation for user: %s", name)
+    logger.debug("[MESSAGE GEN] Bill data received: %s", bill_data)
+    return generate_reminder_messages([(name, bill_data)], locale)[0]
+
+_twilio_client = None
+_twilio_lock = threading.Lock()
+
+def _get_twilio_client():
+    """Create the Twilio client once; it sends through the pooled keep-alive session"""
+    global _twilio_client
+    if _twilio_client is None:
+        with _twilio_lock:
+            if _twilio_client is None:
+                logger.info("[WHATSAPP] Creating Twilio client")
+                _twilio_client = Client(
+                    Config.TWILIO_ACCOUNT_SID,
+                    Config.TWILIO_AUTH_TOKEN,
+                    http_client=get_twilio_http_client()
+                )
+    return _twilio_client
 
 #................added by me (satvik kesarwani)................
 def send_whatsapp_reminder(phone_number, message_body):
     """Send WhatsApp reminder using Twilio"""
-    logger.info(f"[WHATSAPP] Starting WhatsApp reminder to: {phone_number}")
-    logger.debug(f"[WHATSAPP] Message length: {len(message_body)} characters")
-    logger.debug(f"[WHATSAPP] Message preview: {message_body[:100]}...")
+    logger.info("[WHATSAPP] Starting WhatsApp reminder to: %s", phone_number)
+    logger.debug("[WHATSAPP] Message length: %s characters", len(message_body))
+    logger.debug("[WHATSAPP] Message preview: %s...", message_body[:100])
     
     try:
-        # --- NEW DEBUG CODE ---
-        print("--- DEBUG: CHECKING TWILIO KEYS ---")
-        print(f"Account SID from Config: {Config.TWILIO_ACCOUNT_SID}")
-        print(f"Auth Token from Config: {Config.TWILIO_AUTH_TOKEN}")
-        print("-----------------------------------")
-        # --- END OF NEW DEBUG CODE ---
-        
-        logger.debug(f"[WHATSAPP] Twilio Account SID: {'*' * 30 + Config.TWILIO_ACCOUNT_SID[-4:] if Config.TWILIO_ACCOUNT_SID else 'NOT SET'}")
-        logger.debug(f"[WHATSAPP] Twilio Auth Token: {'*' * 30 + Config.TWILIO_AUTH_TOKEN[-4:] if Config.TWILIO_AUTH_TOKEN else 'NOT SET'}")
-        logger.debug(f"[WHATSAPP] WhatsApp From Number: {Config.TWILIO_WHATSAPP_FROM}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[WHATSAPP] Twilio Account SID: %s", '*' * 30 + Config.TWILIO_ACCOUNT_SID[-4:] if Config.TWILIO_ACCOUNT_SID else 'NOT SET')
+            logger.debug("[WHATSAPP] Twilio Auth Token: %s", '*' * 30 + Config.TWILIO_AUTH_TOKEN[-4:] if Config.TWILIO_AUTH_TOKEN else 'NOT SET')
+            logger.debug("[WHATSAPP] WhatsApp From Number: %s", Config.TWILIO_WHATSAPP_FROM)
         
-        logger.info("[WHATSAPP] Creating Twilio client")
-        client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN)
+        client = _get_twilio_client()
         
         formatted_to = f'whatsapp:{phone_number}'
-        logger.debug(f"[WHATSAPP] Formatted recipient: {formatted_to}")
+        logger.debug("[WHATSAPP] Formatted recipient: %s", formatted_to)
         
         logger.info("[WHATSAPP] Sending message via Twilio")
         message = client.messages.create(
@@ -100,32 +229,32 @@ def send_whatsapp_reminder(phone_number, message_body):
             to=formatted_to
         )
         
-        logger.info(f"[WHATSAPP] Message sent successfully with SID: {message.sid}")
-        logger.debug(f"[WHATSAPP] Message status: {message.status}")
+        logger.info("[WHATSAPP] Message sent successfully with SID: %s", message.sid)
+        logger.debug("[WHATSAPP] Message status: %s", message.status)
         
         return {"success": True, "sid": message.sid}
     except Exception as e:
-        logger.error(f"[WHATSAPP ERROR] Failed to send WhatsApp message: {str(e)}", exc_info=True)
-        logger.debug(f"[WHATSAPP ERROR] Error type: {type(e).__name__}")
+        logger.error("[WHATSAPP ERROR] Failed to send WhatsApp message: %s", str(e), exc_info=True)
+        logger.debug("[WHATSAPP ERROR] Error type: %s", type(e).__name__)
         return {"success": False, "error": str(e)}
     
 #................added by me (satvik kesarwani)................
 def send_voice_reminder(phone_number, message_body):
     """Send voice reminder using Bland AI"""
-    logger.info(f"[VOICE CALL] Starting voice reminder to: {phone_number}")
-    logger.debug(f"[VOICE CALL] Original message length: {len(message_body)} characters")
+    logger.info("[VOICE CALL] Starting voice reminder to: %s", phone_number)
+    logger.debug("[VOICE CALL] Original message length: %s characters", len(message_body))
     
     headers = {
         'Authorization': Config.BLAND_AI_API_KEY,
         'Content-Type': 'application/json'
     }
     
-    logger.debug(f"[VOICE CALL] Bland AI API key: {'*' * 30 + Config.BLAND_AI_API_KEY[-4:] if Config.BLAND_AI_API_KEY else 'NOT SET'}")
+    logger.debug("[VOICE CALL] Bland AI API key: %s", '*' * 30 + Config.BLAND_AI_API_KEY[-4:] if Config.BLAND_AI_API_KEY else 'NOT SET')
     
     # Remove any URLs from voice message
     voice_task = message_body.split("http")[0].strip()
-    logger.debug(f"[VOICE CALL] Voice task after URL removal: {voice_task}")
-    logger.debug(f"[VOICE CALL] Voice task length: {len(voice_task)} characters")
+    logger.debug("[VOICE CALL] Voice task after URL removal: %s", voice_task)
+    logger.debug("[VOICE CALL] Voice task length: %s characters", len(voice_task))
     
     payload = {
         'phone_number': phone_number,
@@ -135,41 +264,42 @@ def send_voice_reminder(phone_number, message_body):
         'speed': 0.85
     }
     
-    logger.debug(f"[VOICE CALL] Request payload: {payload}")
-    logger.debug(f"[VOICE CALL] Using voice_id: {payload['voice_id']}")
-    logger.debug(f"[VOICE CALL] Speed setting: {payload['speed']}")
+    logger.debug("[VOICE CALL] Request payload: %s", payload)
+    logger.debug("[VOICE CALL] Using voice_id: %s", payload['voice_id'])
+    logger.debug("[VOICE CALL] Speed setting: %s", payload['speed'])
     
     try:
         logger.info("[VOICE CALL] Sending POST request to Bland AI API")
-        logger.debug(f"[VOICE CALL] API endpoint: https://api.bland.ai/v1/calls")
+        logger.debug("[VOICE CALL] API endpoint: https://api.bland.ai/v1/calls")
         
-        response = requests.post(
+        response = get_session('bland').post(
             'https://api.bland.ai/v1/calls',
             json=payload,
-            headers=headers
+            headers=headers,
+            timeout=TIMEOUT
         )
         
-        logger.debug(f"[VOICE CALL] Response status code: {response.status_code}")
-        logger.debug(f"[VOICE CALL] Response headers: {dict(response.headers)}")
+        logger.debug("[VOICE CALL] Response status code: %s", response.status_code)
+        logger.debug("[VOICE CALL] Response headers: %s", dict(response.headers))
         
         response.raise_for_status()
         
         call_data = response.json()
-        logger.info(f"[VOICE CALL] Call initiated successfully")
-        logger.debug(f"[VOICE CALL] Response data: {call_data}")
+        logger.info("[VOICE CALL] Call initiated successfully")
+        logger.debug("[VOICE CALL] Response data: %s", call_data)
         
         call_id = call_data.get('call_id')
-        logger.info(f"[VOICE CALL] Call ID: {call_id}")
+        logger.info("[VOICE CALL] Call ID: %s", call_id)
         
         return {"success": True, "call_id": call_id}
     except requests.exceptions.RequestException as e:
-        logger.error(f"[VOICE CALL ERROR] Request failed: {str(e)}", exc_info=True)
-        logger.debug(f"[VOICE CALL ERROR] Request error type: {type(e).__name__}")
+        logger.error("[VOICE CALL ERROR] Request failed: %s", str(e), exc_info=True)
+        logger.debug("[VOICE CALL ERROR] Request error type: %s", type(e).__name__)
         if hasattr(e, 'response') and e.response is not None:
-            logger.debug(f"[VOICE CALL ERROR] Response status: {e.response.status_code}")
-            logger.debug(f"[VOICE CALL ERROR] Response body: {e.response.text}")
+            logger.debug("[VOICE CALL ERROR] Response status: %s", e.response.status_code)
+            logger.debug("[VOICE CALL ERROR] Response body: %s", e.response.text)
         return {"success": False, "error": str(e)}
     except Exception as e:
-        logger.error(f"[VOICE CALL ERROR] Unexpected error: {str(e)}", exc_info=True)
-        logger.debug(f"[VOICE CALL ERROR] Error type: {type(e).__name__}")
+        logger.error("[VOICE CALL ERROR] Unexpected error: %s", str(e), exc_info=True)
+        logger.debug("[VOICE CALL ERROR] Error type: %s", type(e).__name__)
         return {"success": False, "error": str(e)}
\ No newline at end of file
@@ -1,13 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, User, ReminderSettings, Bill
+from models import db, ReminderSettings, Bill
+from reminder_jobs import sync_user_jobs
+from identity import get_identity
 from reminder_service import generate_reminder_message, send_whatsapp_reminder, send_voice_reminder
 from elevenlabs_service import generate_voice_audio
 from datetime import datetime
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 reminders_bp = Blueprint('reminders', __name__)
@@ -16,21 +16,21 @@ reminders_bp = Blueprint('reminders', __name__)
 @jwt_required()
 def get_reminder_settings():
     user_id = get_jwt_identity()
-    logger.info(f"[GET SETTINGS] Request from user_id: {user_id}")
+    logger.info("[GET SETTINGS] Request from user_id: %s", user_id)
     
     settings = ReminderSettings.query.filter_by(user_id=user_id).first()
-    logger.debug(f"[GET SETTINGS] Query result for user {user_id}: {settings}")
+    logger.debug("[GET SETTINGS] Query result for user %s: %s", user_id, settings)
     
     if not settings:
-        logger.info(f"[GET SETTINGS] No settings found for user {user_id}, creating defaults")
+        logger.info("[GET SETTINGS] No settings found for user %s, creating defaults", user_id)
         # Create default settings
         settings = ReminderSettings(user_id=user_id)
         db.session.add(settings)
         try:
             db.session.commit()
-            logger.info(f"[GET SETTINGS] Default settings created successfully for user {user_id}")
+            logger.info("[GET SETTINGS] Default settings created successfully for user %s", user_id)
         except Exception as e:
-            logger.error(f"[GET SETTINGS ERROR] Failed to create default settings for user {user_id}: {str(e)}")
+            logger.error("[GET SETTINGS ERROR] Failed to create default settings for user %s: %s", user_id, str(e))
             db.session.rollback()
             raise
     
@@ -43,25 +43,25 @@ def get_reminder_settings():
         'preferred_time': settings.preferred_time
     }
     
-    logger.debug(f"[GET SETTINGS] Returning settings for user {user_id}: {response_data}")
+    logger.debug("[GET SETTINGS] Returning settings for user %s: %s", user_id, response_data)
     return jsonify(response_data), 200
 
 @reminders_bp.route('/settings', methods=['PUT'])
 @jwt_required()
 def update_reminder_settings():
     user_id = get_jwt_identity()
-    logger.info(f"[UPDATE SETTINGS] Request from user_id: {user_id}")
+    logger.info("[UPDATE SETTINGS] Request from user_id: %s", user_id)
     
     settings = ReminderSettings.query.filter_by(user_id=user_id).first()
-    logger.debug(f"[UPDATE SETTINGS] Current settings found: {settings is not None}")
+    logger.debug("[UPDATE SETTINGS] Current settings found: %s", settings is not None)
     
     if not settings:
-        logger.info(f"[UPDATE SETTINGS] Creating new settings for user {user_id}")
+        logger.info("[UPDATE SETTINGS] Creating new settings for user %s", user_id)
         settings = ReminderSettings(user_id=user_id)
         db.session.add(settings)
     
     data = request.get_json()
-    logger.debug(f"[UPDATE SETTINGS] Received data: {data}")
+    logger.debug("[UPDATE SETTINGS] Received data: %s", data)
     
     # Track what's being updated
     updates = []
@@ -96,13 +96,16 @@ def update_reminder_settings():
         settings.preferred_time = data['preferred_time']
         updates.append(f"preferred_time: {old_value} -> {data['preferred_time']}")
     
-    logger.info(f"[UPDATE SETTINGS] Updates for user {user_id}: {', '.join(updates) if updates else 'No changes'}")
+    logger.info("[UPDATE SETTINGS] Updates for user %s: %s", user_id, ', '.join(updates) if updates else 'No changes')
     
     try:
+        # Reminder timing changed, so every queued job of this user has to move
+        if 'preferred_time' in data or 'days_before' in data:
+            sync_user_jobs(user_id, settings)
         db.session.commit()
-        logger.info(f"[UPDATE SETTINGS] Successfully updated settings for user {user_id}")
+        logger.info("[UPDATE SETTINGS] Successfully updated settings for user %s", user_id)
     except Exception as e:
-        logger.error(f"[UPDATE SETTINGS ERROR] Failed to update settings for user {user_id}: {str(e)}")
+        logger.error("[UPDATE SETTINGS ERROR] Failed to update settings for user %s: %s", user_id, str(e))
         db.session.rollback()
         return jsonify({'message': 'Failed to update settings', 'error': str(e)}), 500
     
@@ -112,27 +115,27 @@ def update_reminder_settings():
 @jwt_required()
 def test_reminder():
     user_id = get_jwt_identity()
-    logger.info(f"[TEST REMINDER] Request from user_id: {user_id}")
+    logger.info("[TEST REMINDER] Request from user_id: %s", user_id)
     
-    user = User.query.get(user_id)
-    logger.debug(f"[TEST REMINDER] User found: {user is not None}")
+    user = get_identity(user_id)
+    logger.debug("[TEST REMINDER] User found: %s", user is not None)
     
     if not user:
-        logger.warning(f"[TEST REMINDER] User {user_id} not found")
+        logger.warning("[TEST REMINDER] User %s not found", user_id)
         return jsonify({'message': 'User not found'}), 404
     
-    logger.debug(f"[TEST REMINDER] User phone: {user.phone_number}")
+    logger.debug("[TEST REMINDER] User phone: %s", user['phone_number'])
     
-    if not user.phone_number:
-        logger.warning(f"[TEST REMINDER] User {user_id} has no phone number")
+    if not user['phone_number']:
+        logger.warning("[TEST REMINDER] User %s has no phone number", user_id)
         return jsonify({'message': 'Phone number required for reminders'}), 400
     
     data = request.get_json()
     reminder_type = data.get('type')
-    logger.info(f"[TEST REMINDER] Type requested: {reminder_type}")
+    logger.info("[TEST REMINDER] Type requested: %s", reminder_type)
     
     if reminder_type not in ['whatsapp', 'call', 'elevenlabs']:
-        logger.warning(f"[TEST REMINDER] Invalid reminder type: {reminder_type}")
+        logger.warning("[TEST REMINDER] Invalid reminder type: %s", reminder_type)
         return jsonify({'message': 'Invalid reminder type'}), 400
     
     # Create test bill data
@@ -141,12 +144,12 @@ def test_reminder():
         'amount': 1000,
         'due_date': datetime.now().strftime('%Y-%m-%d')
     }
-    logger.debug(f"[TEST REMINDER] Test bill data: {test_bill_data}")
+    logger.debug("[TEST REMINDER] Test bill data: %s", test_bill_data)
     
     # Generate message
-    logger.debug(f"[TEST REMINDER] Generating message for user: {user.name}")
-    message = generate_reminder_message(user.name, test_bill_data)
-    logger.debug(f"[TEST REMINDER] Generated message: {message[:100]}...")
+    logger.debug("[TEST REMINDER] Generating message for user: %s", user['name'])
+    message = generate_reminder_message(user['name'], test_bill_data)
+    logger.debug("[TEST REMINDER] Generated message: %s...", message[:100])
     
     # Send reminder based on type
     result = None
@@ -155,40 +158,40 @@ def test_reminder():
             # --- THIS IS THE FIX ---
             # Using a static, pre-saved message for the fastest and correct response.
             message = "Whatsapp Test successfully done! Your number is ready for future reminders :)"
-            logger.info(f"[TEST REMINDER] Sending WhatsApp test to {user.phone_number}")
-            result = send_whatsapp_reminder(user.phone_number, message)
+            logger.info("[TEST REMINDER] Sending WhatsApp test to %s", user['phone_number'])
+            result = send_whatsapp_reminder(user['phone_number'], message)
             
         elif reminder_type == 'call':
             # Using a static message for the call test as well.
-            message = f"Hello {user.name}. This is a test call from your bills reminder application. Your reminders are set up correctly. Goodbye."
-            logger.info(f"[TEST REMINDER] Sending voice call test to {user.phone_number}")
-            result = send_voice_reminder(user.phone_number, message)
+            message = f"Hello {user['name']}. This is a test call from your bills reminder application. Your reminders are set up correctly. Goodbye."
+            logger.info("[TEST REMINDER] Sending voice call test to %s", user['phone_number'])
+            result = send_voice_reminder(user['phone_number'], message)
             
         elif reminder_type == 'elevenlabs':
-            logger.info(f"[TEST REMINDER] Generating ElevenLabs audio")
+            logger.info("[TEST REMINDER] Generating ElevenLabs audio")
             # Generate audio file using ElevenLabs
             audio_result = generate_voice_audio(message)
-            logger.debug(f"[TEST REMINDER] ElevenLabs result: {audio_result}")
+            logger.debug("[TEST REMINDER] ElevenLabs result: %s", audio_result)
             
             if audio_result['success']:
                 result = {'success': True, 'message': 'Audio generated', 'audio_path': audio_result['audio_path']}
-                logger.info(f"[TEST REMINDER] Audio generated at: {audio_result.get('audio_path')}")
+                logger.info("[TEST REMINDER] Audio generated at: %s", audio_result.get('audio_path'))
             else:
                 result = audio_result
-                logger.warning(f"[TEST REMINDER] Audio generation failed: {audio_result}")
+                logger.warning("[TEST REMINDER] Audio generation failed: %s", audio_result)
     except Exception as e:
-        logger.error(f"[TEST REMINDER ERROR] Exception during {reminder_type} test: {str(e)}", exc_info=True)
+        logger.error("[TEST REMINDER ERROR] Exception during %s test: %s", reminder_type, str(e), exc_info=True)
         result = {'success': False, 'error': str(e)}
     
     if result.get('success'):
-        logger.info(f"[TEST REMINDER] Test reminder sent successfully via {reminder_type}")
+        logger.info("[TEST REMINDER] Test reminder sent successfully via %s", reminder_type)
         return jsonify({
             'status': 'success',
             'message': f'Test reminder sent via {reminder_type}',
             'details': result
         }), 200
     else:
-        logger.error(f"[TEST REMINDER] Failed to send test reminder via {reminder_type}: {result}")
+        logger.error("[TEST REMINDER] Failed to send test reminder via %s: %s", reminder_type, result)
         return jsonify({
             'status': 'error',
             'message': f'Failed to send reminder via {reminder_type}',
@@ -200,37 +203,37 @@ def test_reminder():
 def send_reminder():
     """Send reminder for a specific bill"""
     user_id = get_jwt_identity()
-    logger.info(f"[SEND REMINDER] Request from user_id: {user_id}")
+    logger.info("[SEND REMINDER] Request from user_id: %s", user_id)
     
     data = request.get_json()
-    logger.debug(f"[SEND REMINDER] Request data: {data}")
+    logger.debug("[SEND REMINDER] Request data: %s", data)
     
     bill_id = data.get('bill_id')
     reminder_type = data.get('type')
     
-    logger.debug(f"[SEND REMINDER] Bill ID: {bill_id}, Type: {reminder_type}")
+    logger.debug("[SEND REMINDER] Bill ID: %s, Type: %s", bill_id, reminder_type)
     
     if not bill_id or not reminder_type:
-        logger.warning(f"[SEND REMINDER] Missing required fields - bill_id: {bill_id}, type: {reminder_type}")
+        logger.warning("[SEND REMINDER] Missing required fields - bill_id: %s, type: %s", bill_id, reminder_type)
         return jsonify({'message': 'Missing bill_id or type'}), 400
     
     # Get bill and user
     bill = Bill.query.filter_by(id=bill_id, user_id=user_id).first()
-    logger.debug(f"[SEND REMINDER] Bill found: {bill is not None}")
+    logger.debug("[SEND REMINDER] Bill found: %s", bill is not None)
     
     if not bill:
-        logger.warning(f"[SEND REMINDER] Bill {bill_id} not found for user {user_id}")
+        logger.warning("[SEND REMINDER] Bill %s not found for user %s", bill_id, user_id)
         return jsonify({'message': 'Bill not found'}), 404
     
-    logger.debug(f"[SEND REMINDER] Bill details - Name: {bill.name}, Amount: {bill.amount}, Due: {bill.due_date}")
-    logger.debug(f"[SEND REMINDER] Bill settings - WhatsApp: {bill.enable_whatsapp}, Call: {bill.enable_call}")
+    logger.debug("[SEND REMINDER] Bill details - Name: %s, Amount: %s, Due: %s", bill.name, bill.amount, bill.due_date)
+    logger.debug("[SEND REMINDER] Bill settings - WhatsApp: %s, Call: %s", bill.enable_whatsapp, bill.enable_call)
     
-    user = User.query.get(user_id)
-    if not user.phone_number:
-        logger.warning(f"[SEND REMINDER] User {user_id} has no phone number")
+    user = get_identity(user_id)
+    if not user or not user['phone_number']:
+        logger.warning("[SEND REMINDER] User %s has no phone number", user_id)
         return jsonify({'message': 'Phone number required'}), 400
     
-    logger.debug(f"[SEND REMINDER] User phone: {user.phone_number}")
+    logger.debug("[SEND REMINDER] User phone: %s", user['phone_number'])
     
     # Prepare bill data
     bill_data = {
@@ -238,42 +241,42 @@ def send_reminder():
         'amount': bill.amount,
         'due_date': bill.due_date.strftime('%Y-%m-%d')
     }
-    logger.debug(f"[SEND REMINDER] Prepared bill data: {bill_data}")
+    logger.debug("[SEND REMINDER] Prepared bill data: %s", bill_data)
     
     # Generate and send reminder
-    logger.debug(f"[SEND REMINDER] Generating message for user: {user.name}")
-    message = generate_reminder_message(user.name, bill_data)
-    logger.debug(f"[SEND REMINDER] Generated message: {message[:100]}...")
+    logger.debug("[SEND REMINDER] Generating message for user: %s", user['name'])
+    message = generate_reminder_message(user['name'], bill_data)
+    logger.debug("[SEND REMINDER] Generated message: %s...", message[:100])
     
     result = None
     try:
         if reminder_type == 'whatsapp' and bill.enable_whatsapp:
-            logger.info(f"[SEND REMINDER] Sending WhatsApp reminder to {user.phone_number} for bill {bill_id}")
-            result = send_whatsapp_reminder(user.phone_number, message)
-            logger.debug(f"[SEND REMINDER] WhatsApp result: {result}")
+            logger.info("[SEND REMINDER] Sending WhatsApp reminder to %s for bill %s", user['phone_number'], bill_id)
+            result = send_whatsapp_reminder(user['phone_number'], message)
+            logger.debug("[SEND REMINDER] WhatsApp result: %s", result)
             
         elif reminder_type == 'call' and bill.enable_call:
-            logger.info(f"[SEND REMINDER] Sending voice reminder to {user.phone_number} for bill {bill_id}")
-            result = send_voice_reminder(user.phone_number, message)
-            logger.debug(f"[SEND REMINDER] Voice call result: {result}")
+            logger.info("[SEND REMINDER] Sending voice reminder to %s for bill %s", user['phone_number'], bill_id)
+            result = send_voice_reminder(user['phone_number'], message)
+            logger.debug("[SEND REMINDER] Voice call result: %s", result)
             
         else:
-            logger.warning(f"[SEND REMINDER] Reminder type {reminder_type} not enabled for bill {bill_id}")
-            logger.debug(f"[SEND REMINDER] Bill settings - WhatsApp: {bill.enable_whatsapp}, Call: {bill.enable_call}")
+            logger.warning("[SEND REMINDER] Reminder type %s not enabled for bill %s", reminder_type, bill_id)
+            logger.debug("[SEND REMINDER] Bill settings - WhatsApp: %s, Call: %s", bill.enable_whatsapp, bill.enable_call)
             return jsonify({'message': 'Reminder type not enabled for this bill'}), 400
             
     except Exception as e:
-        logger.error(f"[SEND REMINDER ERROR] Exception during {reminder_type} send: {str(e)}", exc_info=True)
+        logger.error("[SEND REMINDER ERROR] Exception during %s send: %s", reminder_type, str(e), exc_info=True)
         result = {'success': False, 'error': str(e)}
     
     if result.get('success'):
-        logger.info(f"[SEND REMINDER] Successfully sent {reminder_type} reminder for bill {bill_id}")
+        logger.info("[SEND REMINDER] Successfully sent %s reminder for bill %s", reminder_type, bill_id)
         return jsonify({
             'status': 'success',
             'message': f'Reminder sent via {reminder_type}'
         }), 200
     else:
-        logger.error(f"[SEND REMINDER] Failed to send {reminder_type} reminder for bill {bill_id}: {result}")
+        logger.error("[SEND REMINDER] Failed to send %s reminder for bill %s: %s", reminder_type, bill_id, result)
         return jsonify({
             'status': 'error',
             'message': 'Failed to send reminder',
@@ -3,6 +3,7 @@ import os
 import sys
 import bcrypt
 import logging
+from config import Config
 
 # --- Configuration ---
 DB_FILE = os.path.join('instance', 'bills_reminder.db')
@@ -17,10 +18,10 @@ logging.basicConfig(
 
 def reset_user_password(email, new_password):
     """Finds a user by email and resets their password."""
-    logging.info(f"Attempting to reset password for email: {email}")
+    logging.info("Attempting to reset password for email: %s", email)
 
     if not os.path.exists(DB_FILE):
-        logging.error(f"Database file '{DB_FILE}' not found. Is the main app running?")
+        logging.error("Database file '%s' not found. Is the main app running?", DB_FILE)
         return
 
     conn = None
@@ -32,29 +33,29 @@ def reset_user_password(email, new_password):
         user = cursor.fetchone()
 
         if not user:
-            logging.error(f"No user found with the email: {email}")
+            logging.error("No user found with the email: %s", email)
             return
 
         user_id = user[0]
-        logging.info(f"User found with ID: {user_id}. Proceeding with password reset.")
+        logging.info("User found with ID: %s. Proceeding with password reset.", user_id)
 
         # Hash the new password using bcrypt
-        hashed_password_bytes = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt())
+        hashed_password_bytes = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt(rounds=Config.BCRYPT_ROUNDS))
         
         # --- THIS IS THE FIX ---
         # Decode the bytes into a string before saving, to match the registration format.
         hashed_password_str = hashed_password_bytes.decode('utf-8')
         
-        logging.info(f"Updating password hash for user ID: {user_id}")
+        logging.info("Updating password hash for user ID: %s", user_id)
         cursor.execute("UPDATE user SET password_hash = ? WHERE id = ?", (hashed_password_str, user_id))
         
         conn.commit()
         
-        logging.info(f"Successfully reset password for {email}.")
+        logging.info("Successfully reset password for %s.", email)
         print(f"\nPassword for '{email}' has been updated successfully!")
 
     except sqlite3.Error as e:
-        logging.error(f"A database error occurred: {e}")
+        logging.error("A database error occurred: %s", e)
         if conn:
             conn.rollback()
     finally:
@@ -2,19 +2,64 @@
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime, timedelta
-from models import db, Bill, User, ReminderSettings
-from reminder_service import generate_reminder_message, send_whatsapp_reminder, send_voice_reminder
+from itertools import groupby
+from models import db, Bill, User
+from reminder_service import generate_reminder_messages, purge_expired_messages, send_whatsapp_reminder, send_voice_reminder
+from delivery_service import get_delivery_pool
+from reminder_jobs import fetch_due_jobs, advance_jobs, backfill_reminder_jobs
+from recurrence import materialize_upcoming
+from local_storage_service import purge_unreferenced_blobs
+from auth_tokens import purge_expired_revocations
+from config import Config
 import pytz
 import logging
 
 # We will not import 'app' in this file at all to avoid circular imports.
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 scheduler = BackgroundScheduler()
 
+# Overdue alerts stop once a bill is more than a week late
+OVERDUE_ALERT_DAYS = 7
+
+def prepare_bill_reminder(user, settings, bill):
+    """Work out which channels a bill's reminder goes to; returns (message payload, deliveries)."""
+    bill_data = {
+        'name': bill.name,
+        'amount': bill.amount,
+        'due_date': bill.due_date.strftime('%Y-%m-%d')
+    }
+    
+    deliveries = []
+    if settings.whatsapp_enabled and bill.enable_whatsapp:
+        logger.info("[WHATSAPP] Queueing WhatsApp reminder to %s for bill %s", user.phone_number, bill.id)
+        deliveries.append(('whatsapp', send_whatsapp_reminder, user.phone_number))
+    else:
+        logger.debug("[WHATSAPP] Skipped - WhatsApp disabled (settings: %s, bill: %s)", settings.whatsapp_enabled, bill.enable_whatsapp)
+    
+    if settings.call_enabled and bill.enable_call:
+        logger.info("[VOICE CALL] Queueing voice reminder to %s for bill %s", user.phone_number, bill.id)
+        deliveries.append(('voice', send_voice_reminder, user.phone_number))
+    else:
+        logger.debug("[VOICE CALL] Skipped - Voice call disabled (settings: %s, bill: %s)", settings.call_enabled, bill.enable_call)
+    
+    return (user.name, bill_data), deliveries
+
+def build_overdue_digest(overdue):
+    """Build one message for all of a user's overdue bills: a list of (name, amount, days_overdue)."""
+    if len(overdue) == 1:
+        name, amount, days_overdue = overdue[0]
+        return f"URGENT: Your {name} payment of ₹{amount} is {days_overdue} days overdue. Please pay immediately to avoid late fees."
+    
+    total = sum(amount for _, amount, _ in overdue)
+    lines = [f"- {name}: ₹{amount} ({days_overdue} days overdue)" for name, amount, days_overdue in overdue]
+    return (
+        f"URGENT: You have {len(overdue)} overdue bills totalling ₹{total}:\n"
+        + "\n".join(lines)
+        + "\nPlease pay immediately to avoid late fees."
+    )
+
 def start_scheduler(app):
     """
     Initializes and starts the background scheduler.
@@ -23,143 +68,131 @@ def start_scheduler(app):
     """
     logger.info("=== SCHEDULER START: Initializing scheduler ===")
 
+    def compose_messages(payloads):
+        """Runs on the delivery pool; the message cache needs the app context for its persistent store."""
+        with app.app_context():
+            return generate_reminder_messages(payloads)
+
     def check_and_send_reminders():
-        """This job runs every minute to check for upcoming reminders."""
+        """This job runs every minute and fires the queued reminders that are due."""
         # This function can now use the 'app' variable from the outer scope
         with app.app_context():
-            current_time = datetime.now().strftime('%H:%M')
-            logger.info(f"[REMINDER CHECK] Starting reminder check at {current_time}")
-            print("Scheduler: Checking for due bills...")
-            
-            # This loop runs every minute
-            
-            users = User.query.filter(User.phone_number.isnot(None)).all()
-            logger.info(f"[REMINDER CHECK] Found {len(users)} users with phone numbers")
+            now = datetime.now()
+            current_date = now.date()
+            logger.info("[REMINDER CHECK] Starting reminder check at %s", now.strftime('%H:%M'))
             
-            for user in users:
-                logger.debug(f"[USER CHECK] Processing user: {user.id} - {user.name}")
+            # The queue already knows which bills are due; the tick only pulls
+            # the jobs whose fire time has passed, a batch at a time.
+            run = get_delivery_pool().start_run('reminder_checker')
+            pending = []
+            while True:
+                rows = fetch_due_jobs(now, Config.REMINDER_BATCH_SIZE)
+                logger.info("[REMINDER CHECK] Fetched %s due reminder jobs", len(rows))
                 
-                settings = ReminderSettings.query.filter_by(user_id=user.id).first()
-                if not settings:
-                    logger.warning(f"[USER CHECK] No reminder settings found for user {user.id}")
-                    continue
-
-                logger.debug(f"[USER CHECK] User {user.id} preferred time: {settings.preferred_time}")
-                logger.debug(f"[USER CHECK] WhatsApp enabled: {settings.whatsapp_enabled}, Call enabled: {settings.call_enabled}")
-
-                # The key change is here: The reminder logic is now executed ONLY
-                # at the exact minute of the user's preferred time.
-                if current_time == settings.preferred_time:
-                    logger.info(f"[TIME MATCH] Current time {current_time} matches user {user.id} preferred time")
-                    
-                    bills_due = Bill.query.filter(
-                        Bill.user_id == user.id,
-                        Bill.is_paid == False
-                    ).all()
-                    
-                    logger.info(f"[BILLS CHECK] Found {len(bills_due)} unpaid bills for user {user.id}")
-                    
-                    for bill in bills_due:
-                        logger.debug(f"[BILL PROCESS] Processing bill: {bill.id} - {bill.name}")
-                        logger.debug(f"[BILL PROCESS] Bill due date: {bill.due_date}, Amount: {bill.amount}")
-                        
-                        # Calculate days left using only the date portion
-                        current_date = datetime.now().date()
-                        bill_due_date = bill.due_date.date()
-                        days_left = (bill_due_date - current_date).days
-                        
-                        logger.debug(f"[BILL PROCESS] Days left for bill {bill.id}: {days_left} days")
-                        logger.debug(f"[BILL PROCESS] Current date: {current_date}, Bill due date: {bill_due_date}")
-                        
-                        # Check if the number of days left is in our reminder list
-                        # This will trigger a message on the 3rd, 2nd, 1st, and 0th day before the deadline.
-                        if days_left in [3, 2, 1, 0]:
-                            logger.info(f"[REMINDER TRIGGER] Bill {bill.id} qualifies for reminder (days_left: {days_left})")
-                            
-                            bill_data = {
-                                'name': bill.name,
-                                'amount': bill.amount,
-                                'due_date': bill.due_date.strftime('%Y-%m-%d')
-                            }
-                            
-                            logger.debug(f"[MESSAGE GEN] Generating message for bill: {bill_data}")
-                            message = generate_reminder_message(user.name, bill_data)
-                            logger.debug(f"[MESSAGE GEN] Generated message: {message[:50]}...")
-                            
-                            if settings.whatsapp_enabled and bill.enable_whatsapp:
-                                logger.info(f"[WHATSAPP] Sending WhatsApp reminder to {user.phone_number} for bill {bill.id}")
-                                try:
-                                    send_whatsapp_reminder(user.phone_number, message)
-                                    logger.info(f"[WHATSAPP] Successfully sent WhatsApp reminder for bill {bill.id}")
-                                except Exception as e:
-                                    logger.error(f"[WHATSAPP ERROR] Failed to send WhatsApp reminder for bill {bill.id}: {str(e)}")
-                            else:
-                                logger.debug(f"[WHATSAPP] Skipped - WhatsApp disabled (settings: {settings.whatsapp_enabled}, bill: {bill.enable_whatsapp})")
-                            
-                            if settings.call_enabled and bill.enable_call:
-                                logger.info(f"[VOICE CALL] Sending voice reminder to {user.phone_number} for bill {bill.id}")
-                                try:
-                                    send_voice_reminder(user.phone_number, message)
-                                    logger.info(f"[VOICE CALL] Successfully sent voice reminder for bill {bill.id}")
-                                except Exception as e:
-                                    logger.error(f"[VOICE CALL ERROR] Failed to send voice reminder for bill {bill.id}: {str(e)}")
-                            else:
-                                logger.debug(f"[VOICE CALL] Skipped - Voice call disabled (settings: {settings.call_enabled}, bill: {bill.enable_call})")
-                        else:
-                            logger.debug(f"[BILL SKIP] Bill {bill.id} not due for reminder (days_left: {days_left})")
-                else:
-                    logger.debug(f"[TIME SKIP] Current time {current_time} does not match user {user.id} preferred time {settings.preferred_time}")
+                for job, bill, user, settings in rows:
+                    # Jobs left over from a missed day are rescheduled, not sent late
+                    if job.next_fire_at.date() == current_date and user.phone_number and settings:
+                        days_left = (bill.due_date.date() - current_date).days
+                        logger.info("[REMINDER TRIGGER] Bill %s qualifies for reminder (days_left: %s)", bill.id, days_left)
+                        payload, deliveries = prepare_bill_reminder(user, settings, bill)
+                        if deliveries:
+                            pending.append((payload, deliveries))
+                    else:
+                        logger.debug("[REMINDER SKIP] Job for bill %s is stale or user cannot be reached", bill.id)
+                
+                # Next slots for the whole batch are computed in one vectorized pass
+                advance_jobs([(job, bill, settings) for job, bill, _, settings in rows], now)
+                db.session.commit()
+                
+                if len(rows) < Config.REMINDER_BATCH_SIZE:
+                    break
             
-            logger.info(f"[REMINDER CHECK] Completed reminder check at {datetime.now().strftime('%H:%M:%S')}")
+            # All messages of the sweep are composed in one batch (cache misses share Gemini
+            # prompts); deliveries keep running on the pool and the run reports when they finish.
+            get_delivery_pool().deliver_composed(run, compose_messages, pending)
+            run.close()
+            logger.info("[REMINDER CHECK] Completed reminder check at %s, queued %s reminders", datetime.now().strftime('%H:%M:%S'), len(pending))
 
     def check_overdue_bills():
-        """This job runs daily to check for overdue bills."""
+        """This job runs daily and sends each user one digest of their overdue bills."""
         # This function can also use the 'app' variable
         with app.app_context():
             logger.info("[OVERDUE CHECK] Starting overdue bills check")
-            print("Scheduler: Checking for overdue bills...")
             
             current_datetime = datetime.now()
-            overdue_bills = Bill.query.filter(
-                Bill.is_paid == False,
-                Bill.due_date < current_datetime
-            ).all()
+            run = get_delivery_pool().start_run('overdue_checker')
             
-            logger.info(f"[OVERDUE CHECK] Found {len(overdue_bills)} overdue bills")
+            # One joined query, streamed in chunks and ordered by user so that each
+            # user's bills arrive together. Only bills that are at most 7 days
+            # overdue and have WhatsApp enabled are of interest.
+            rows = db.session.query(
+                User.id, User.phone_number,
+                Bill.name, Bill.amount, Bill.due_date
+            ).join(
+                User, User.id == Bill.user_id
+            ).filter(
+                Bill.is_paid == False,
+                Bill.enable_whatsapp == True,
+                Bill.due_date < current_datetime,
+                Bill.due_date > current_datetime - timedelta(days=OVERDUE_ALERT_DAYS + 1),
+                User.phone_number.isnot(None)
+            ).order_by(
+                Bill.user_id, Bill.due_date
+            ).yield_per(Config.OVERDUE_CHUNK_SIZE)
             
-            for bill in overdue_bills:
-                logger.debug(f"[OVERDUE PROCESS] Processing overdue bill: {bill.id} - {bill.name}")
-                
-                user = User.query.get(bill.user_id)
-                if not user:
-                    logger.warning(f"[OVERDUE PROCESS] User not found for bill {bill.id} (user_id: {bill.user_id})")
-                    continue
-                
-                if not user.phone_number:
-                    logger.warning(f"[OVERDUE PROCESS] No phone number for user {user.id}")
-                    continue
-                
-                days_overdue = (current_datetime - bill.due_date).days
-                logger.debug(f"[OVERDUE PROCESS] Bill {bill.id} is {days_overdue} days overdue")
-                
-                if days_overdue <= 7:
-                    message = f"URGENT: Your {bill.name} payment of ₹{bill.amount} is {days_overdue} days overdue. Please pay immediately to avoid late fees."
-                    logger.info(f"[OVERDUE ALERT] Sending overdue alert for bill {bill.id} ({days_overdue} days overdue)")
-                    
-                    if bill.enable_whatsapp:
-                        logger.info(f"[OVERDUE WHATSAPP] Sending WhatsApp overdue reminder to {user.phone_number}")
-                        try:
-                            send_whatsapp_reminder(user.phone_number, message)
-                            logger.info(f"[OVERDUE WHATSAPP] Successfully sent overdue reminder for bill {bill.id}")
-                        except Exception as e:
-                            logger.error(f"[OVERDUE WHATSAPP ERROR] Failed to send overdue reminder for bill {bill.id}: {str(e)}")
-                    else:
-                        logger.debug(f"[OVERDUE WHATSAPP] WhatsApp disabled for bill {bill.id}")
-                else:
-                    logger.debug(f"[OVERDUE SKIP] Bill {bill.id} is {days_overdue} days overdue (>7 days, skipping)")
+            users_alerted = 0
+            bills_alerted = 0
+            for (user_id, phone_number), user_rows in groupby(rows, key=lambda row: (row[0], row[1])):
+                overdue = [
+                    (bill_name, amount, (current_datetime - due_date).days)
+                    for _, _, bill_name, amount, due_date in user_rows
+                ]
+                logger.info("[OVERDUE ALERT] Queueing digest of %s overdue bills for user %s", len(overdue), user_id)
+                get_delivery_pool().deliver(run, 'whatsapp', send_whatsapp_reminder, phone_number, build_overdue_digest(overdue))
+                users_alerted += 1
+                bills_alerted += len(overdue)
             
-            logger.info(f"[OVERDUE CHECK] Completed overdue bills check at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            run.close()
+            logger.info("[OVERDUE CHECK] Queued digests for %s users covering %s overdue bills", users_alerted, bills_alerted)
+            logger.info("[OVERDUE CHECK] Completed overdue bills check at %s", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+    def purge_message_cache():
+        """This job runs daily to drop expired generated messages."""
+        with app.app_context():
+            purge_expired_messages()
+
+    def purge_receipt_blobs():
+        """This job runs daily to delete receipt files no bill refers to any more."""
+        with app.app_context():
+            try:
+                purge_unreferenced_blobs()
+            except Exception as e:
+                logger.error("[SCHEDULER ERROR] Receipt blob cleanup failed: %s", str(e), exc_info=True)
+                db.session.rollback()
 
+    def purge_token_revocations():
+        """This job runs daily to drop revocations of tokens that have expired anyway."""
+        with app.app_context():
+            try:
+                purge_expired_revocations()
+            except Exception as e:
+                logger.error("[SCHEDULER ERROR] Token revocation cleanup failed: %s", str(e), exc_info=True)
+                db.session.rollback()
+
+    def materialize_recurring_bills():
+        """This job runs nightly to pre-create upcoming occurrences of recurring bills."""
+        with app.app_context():
+            try:
+                materialize_upcoming()
+            except Exception as e:
+                logger.error("[SCHEDULER ERROR] Recurring bill materialization failed: %s", str(e), exc_info=True)
+                db.session.rollback()
+
+    # Make sure bills created before the reminder queue existed get a job
+    with app.app_context():
+        backfilled = backfill_reminder_jobs()
+        logger.info("[SCHEDULER CONFIG] Reminder queue backfilled with %s bills", backfilled)
+    
     # Add the jobs to the scheduler
     logger.info("[SCHEDULER CONFIG] Adding reminder_checker job (runs every minute)")
     scheduler.add_job(
@@ -180,6 +213,46 @@ def start_scheduler(app):
         replace_existing=True
     )
     
+    logger.info("[SCHEDULER CONFIG] Adding message_cache_purge job (runs daily at 03:00)")
+    scheduler.add_job(
+        func=purge_message_cache,
+        trigger="cron",
+        hour=3,
+        minute=0,
+        id='message_cache_purge',
+        replace_existing=True
+    )
+    
+    logger.info("[SCHEDULER CONFIG] Adding receipt_blob_gc job (runs daily at 03:30)")
+    scheduler.add_job(
+        func=purge_receipt_blobs,
+        trigger="cron",
+        hour=3,
+        minute=30,
+        id='receipt_blob_gc',
+        replace_existing=True
+    )
+    
+    logger.info("[SCHEDULER CONFIG] Adding token_revocation_purge job (runs daily at 04:00)")
+    scheduler.add_job(
+        func=purge_token_revocations,
+        trigger="cron",
+        hour=4,
+        minute=0,
+        id='token_revocation_purge',
+        replace_existing=True
+    )
+    
+    logger.info("[SCHEDULER CONFIG] Adding recurrence_materializer job (runs daily at 02:30)")
+    scheduler.add_job(
+        func=materialize_recurring_bills,
+        trigger="cron",
+        hour=2,
+        minute=30,
+        id='recurrence_materializer',
+        replace_existing=True
+    )
+    
     # Start the scheduler if it's not already running
     if not scheduler.running:
         logger.info("[SCHEDULER START] Starting the scheduler")
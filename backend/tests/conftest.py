@@ -0,0 +1,57 @@
+# conftest.py
+#
+# The backend modules import each other by bare name (from models import ...),
+# so the backend directory goes on sys.path, and Config is pointed at an
+# in-memory database before anything imports it. The fixtures build a bare
+# app with the blueprints under test; no scheduler, no external services.
+
+import os
+import sys
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('JWT_SECRET_KEY', 'test-jwt-secret-key-0123456789abcdef')
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from models import db, User
+from auth import auth_bp
+from auth_tokens import register_token_callbacks
+from bills import bills_bp
+from payments import payments_bp
+from receipts import receipts_bp
+from config import Config
+import pytest
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Receipt storage paths are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    register_token_callbacks(JWTManager(app))
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(bills_bp, url_prefix='/api/bills')
+    app.register_blueprint(payments_bp, url_prefix='/api/payments')
+    app.register_blueprint(receipts_bp, url_prefix='/api/receipts')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def make_user(email='a@example.com'):
+    user = User(email=email, password_hash='x', name='A', phone_number='+911234567890')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def user(app):
+    return make_user()
+
+def auth_headers(user):
+    return {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
@@ -0,0 +1,51 @@
+# test_auth_tokens.py
+
+from models import db, Bill, User, RevokedToken
+from auth_tokens import revoke_family, is_token_revoked, issue_tokens, _denylist
+from identity import get_identity, identity_cache_stats
+from datetime import datetime, timedelta
+import time
+import pytest
+
+def _denied(key):
+    return key in _denylist._entries
+
+def test_revocation_enters_the_denylist_only_when_committed(app, user):
+    revoke_family('family-rolled-back', user.id)
+    assert not _denied('family-rolled-back')
+    db.session.rollback()
+    assert not _denied('family-rolled-back')
+
+    revoke_family('family-committed', user.id)
+    db.session.commit()
+    assert _denied('family-committed')
+
+def test_failed_commit_leaves_the_denylist_alone(app, user):
+    revoke_family('family-failed', user.id)
+    # A row that cannot be written fails the whole commit
+    db.session.add(Bill(user_id=user.id, name=None, amount=1, due_date=datetime(2026, 11, 1), category='c', frequency='once'))
+    with pytest.raises(Exception):
+        db.session.commit()
+    db.session.rollback()
+    assert not _denied('family-failed')
+    assert RevokedToken.query.count() == 0
+
+def test_refresh_reuse_revokes_the_family_without_committing_the_request(app, user):
+    expires = datetime.utcnow() + timedelta(days=1)
+    _denylist.add('rotated-jti', expires)
+    payload = {'jti': 'rotated-jti', 'type': 'refresh', 'fam': 'family-reused', 'sub': user.id, 'exp': int(time.time()) + 3600}
+
+    db.session.add(User(email='pending@example.com', password_hash='x', name='P', phone_number='+911234567890'))
+    assert is_token_revoked(payload)
+    assert _denied('family-reused')
+    db.session.rollback()
+    assert User.query.filter_by(email='pending@example.com').count() == 0
+    assert db.session.get(RevokedToken, 'family-reused') is not None
+
+def test_logout_evicts_the_cached_identity(app, user):
+    get_identity(user.id)
+    size = identity_cache_stats()['size']
+    tokens = issue_tokens(user.id)
+    response = app.test_client().post('/api/auth/logout', headers={'Authorization': f"Bearer {tokens['refresh_token']}"})
+    assert response.status_code == 200
+    assert identity_cache_stats()['size'] == size - 1
@@ -0,0 +1,35 @@
+# test_bill_import.py
+
+from models import db, Bill, Payment
+from conftest import auth_headers
+from datetime import datetime
+
+def _row(**overrides):
+    return dict({'name': 'Water', 'amount': 30, 'due_date': '2026-11-05', 'category': 'Utilities', 'frequency': 'monthly'}, **overrides)
+
+def _import(app, user, rows):
+    return app.test_client().post('/api/bills/bulk', headers=auth_headers(user), json=rows)
+
+def test_invalid_notes_and_amounts_are_rejected_per_row(app, user):
+    response = _import(app, user, [
+        _row(),
+        _row(notes={'nested': True}),
+        _row(amount='nan'),
+        _row(amount='inf'),
+        _row(notes=None)
+    ])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['created'] == 2
+    assert [error['row'] for error in body['errors']] == [2, 3, 4]
+
+def test_import_updates_cannot_mark_bills_paid(app, user):
+    bill = Bill(user_id=user.id, name='Water', amount=30, due_date=datetime(2026, 11, 5), category='Utilities', frequency='monthly')
+    db.session.add(bill)
+    db.session.commit()
+
+    body = _import(app, user, [{'id': bill.id, 'is_paid': True}]).get_json()
+    assert body['updated'] == 0
+    assert body['errors'][0]['row'] == 1
+    assert db.session.query(Bill.is_paid).filter_by(id=bill.id).scalar() is False
+    assert Payment.query.count() == 0
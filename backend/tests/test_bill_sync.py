@@ -0,0 +1,65 @@
+# test_bill_sync.py
+
+from models import db, Bill, BillSyncState
+import bill_sync
+from conftest import auth_headers
+
+BILL = {'name': 'Rent', 'amount': 100.0, 'due_date': '2026-10-20T00:00:00', 'category': 'Housing', 'frequency': 'once'}
+
+def test_first_write_increments_a_concurrently_created_row(app, user, monkeypatch):
+    increment = bill_sync._increment
+    calls = []
+
+    def racing_increment(user_id):
+        # Another writer creates the row between our UPDATE and INSERT
+        calls.append(user_id)
+        if len(calls) == 1:
+            updated = increment(user_id)
+            db.session.execute(BillSyncState.__table__.insert(), {'user_id': user_id, 'version': 4})
+            return updated
+        return increment(user_id)
+
+    monkeypatch.setattr(bill_sync, '_increment', racing_increment)
+    assert bill_sync.next_version(user.id) == 5
+    db.session.commit()
+    assert bill_sync.current_version(user.id) == 5
+    assert len(calls) == 2
+
+def test_first_write_creates_the_row(app, user):
+    assert bill_sync.current_version(user.id) == 0
+    assert bill_sync.next_version(user.id) == 1
+    assert bill_sync.next_version(user.id) == 2
+    db.session.commit()
+    assert bill_sync.current_version(user.id) == 2
+
+def test_etag_revalidates_until_bills_change(app, user):
+    client = app.test_client()
+    first = client.get('/api/bills', headers=auth_headers(user))
+    etag = first.headers['ETag']
+
+    cached = client.get('/api/bills', headers={**auth_headers(user), 'If-None-Match': etag})
+    assert cached.status_code == 304
+
+    assert client.post('/api/bills', json=BILL, headers=auth_headers(user)).status_code == 201
+    changed = client.get('/api/bills', headers={**auth_headers(user), 'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert [bill['name'] for bill in changed.get_json()] == ['Rent']
+
+def test_changes_return_updates_and_deletions_since_a_version(app, user):
+    client = app.test_client()
+    keep = client.post('/api/bills', json=BILL, headers=auth_headers(user)).get_json()['id']
+    drop = client.post('/api/bills', json={**BILL, 'name': 'Gym'}, headers=auth_headers(user)).get_json()['id']
+    since = client.get('/api/bills/changes', headers=auth_headers(user)).get_json()['version']
+
+    client.put(f'/api/bills/{keep}', json={'amount': 120.0}, headers=auth_headers(user))
+    client.delete(f'/api/bills/{drop}', headers=auth_headers(user))
+
+    body = client.get(f'/api/bills/changes?since={since}', headers=auth_headers(user)).get_json()
+    assert [bill['id'] for bill in body['changed']] == [keep]
+    assert body['deleted'] == [drop]
+    assert body['version'] == since + 2
+    assert not body['reset']
+
+    ahead = client.get(f'/api/bills/changes?since={body["version"] + 5}', headers=auth_headers(user)).get_json()
+    assert ahead['reset'] and ahead['changed'] == [] and ahead['deleted'] == []
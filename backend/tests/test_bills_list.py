@@ -0,0 +1,54 @@
+# test_bills_list.py
+
+from models import db, Bill
+import bills
+from conftest import auth_headers
+from datetime import datetime
+
+def _add_bills(user, due_days):
+    for index, day in enumerate(due_days):
+        db.session.add(Bill(
+            user_id=user.id, name=f'Bill {index}', amount=10.0 * (index + 1), due_date=datetime(2026, 10, day),
+            category='Utilities' if index % 2 else 'Housing', frequency='monthly'
+        ))
+    db.session.commit()
+
+def _pages(client, user, query):
+    pages, cursor = [], None
+    while True:
+        url = f'/api/bills?{query}' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url, headers=auth_headers(user))
+        assert response.status_code == 200
+        pages.append([bill['name'] for bill in response.get_json()])
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return pages
+
+def test_cursor_walks_every_bill_once_in_due_order(app, user):
+    # Three bills share a due date, so the id tiebreak has to carry across page boundaries
+    _add_bills(user, [5, 3, 3, 3, 9, 1, 7])
+    pages = _pages(app.test_client(), user, 'limit=2')
+
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    names = [name for page in pages for name in page]
+    expected = [bill.name for bill in Bill.query.order_by(Bill.due_date, Bill.id)]
+    assert names == expected
+
+def test_sparse_fields_and_filters(app, user):
+    _add_bills(user, [1, 2, 3, 4])
+    response = app.test_client().get('/api/bills?fields=amount&category=Utilities&due_from=2026-10-02T00:00:00', headers=auth_headers(user))
+    listed = response.get_json()
+    assert [set(bill) for bill in listed] == [{'id', 'amount'}, {'id', 'amount'}]
+    assert [bill['amount'] for bill in listed] == [20.0, 40.0]
+
+def test_invalid_parameters_are_rejected(app, user):
+    client = app.test_client()
+    for query in ('fields=password', 'limit=0', 'cursor=not-a-cursor', 'is_paid=maybe'):
+        assert client.get(f'/api/bills?{query}', headers=auth_headers(user)).status_code == 400
+
+def test_unpaginated_list_stays_a_full_array(app, user):
+    _add_bills(user, [2, 1])
+    response = app.test_client().get('/api/bills', headers=auth_headers(user))
+    assert [bill['name'] for bill in response.get_json()] == ['Bill 1', 'Bill 0']
+    assert 'X-Next-Cursor' not in response.headers
+    assert set(response.get_json()[0]) == set(bills.BILL_FIELD_COLUMNS)
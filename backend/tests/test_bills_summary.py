@@ -0,0 +1,43 @@
+# test_bills_summary.py
+
+from models import db, Bill
+from bills import _build_summary
+from conftest import auth_headers
+from datetime import datetime, timedelta
+
+TODAY = datetime(2026, 10, 17)
+
+def _add_bill(user, name, amount, due_date, category='Utilities', is_paid=False):
+    db.session.add(Bill(user_id=user.id, name=name, amount=amount, due_date=due_date, category=category, frequency='monthly', is_paid=is_paid))
+
+def test_each_unpaid_bill_falls_in_one_bucket(app, user):
+    _add_bill(user, 'Late', 10.0, datetime(2026, 10, 10))
+    _add_bill(user, 'Soon', 20.0, datetime(2026, 10, 20))
+    _add_bill(user, 'Month', 30.0, datetime(2026, 10, 28), category='Housing')
+    _add_bill(user, 'Later', 40.0, datetime(2026, 11, 2), category='Housing')
+    _add_bill(user, 'Done', 50.0, datetime(2026, 10, 12), is_paid=True)
+    db.session.commit()
+
+    summary = _build_summary(user.id, TODAY, 2)
+    assert summary['totals'] == {'count': 5, 'amount': 150.0, 'paid': {'count': 1, 'amount': 50.0}, 'unpaid': {'count': 4, 'amount': 100.0}}
+    assert {name: bucket['amount'] for name, bucket in summary['by_due_bucket'].items()} == {
+        'overdue': 10.0, 'this_week': 20.0, 'this_month': 30.0, 'later': 40.0
+    }
+    assert summary['by_category']['Housing'] == {'count': 2, 'amount': 70.0, 'unpaid_count': 2, 'unpaid_amount': 70.0}
+    assert summary['by_category']['Utilities']['unpaid_count'] == 2
+    assert [bill['name'] for bill in summary['next_due']] == ['Soon', 'Month']
+
+def test_summary_is_recomputed_after_a_bill_write(app, user):
+    client = app.test_client()
+    first = client.get('/api/bills/summary?limit=1', headers=auth_headers(user)).get_json()
+    assert first['totals']['count'] == 0
+
+    due_date = (datetime.now() + timedelta(days=40)).isoformat()
+    client.post('/api/bills', json={'name': 'Rent', 'amount': 100.0, 'due_date': due_date, 'category': 'Housing', 'frequency': 'once'}, headers=auth_headers(user))
+    second = client.get('/api/bills/summary?limit=1', headers=auth_headers(user)).get_json()
+    cached = client.get('/api/bills/summary?limit=1', headers=auth_headers(user)).get_json()
+
+    assert second['totals']['unpaid'] == {'count': 1, 'amount': 100.0}
+    assert second['version'] > first['version']
+    assert cached == second
+    assert [bill['name'] for bill in second['next_due']] == ['Rent']
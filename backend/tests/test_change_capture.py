@@ -0,0 +1,69 @@
+# test_change_capture.py
+
+from sqlalchemy import event
+from models import db, Bill, AuditLog
+import change_capture
+from datetime import datetime
+import json
+import pytest
+
+@pytest.fixture
+def capture(app, monkeypatch):
+    # init_change_capture registers its hook once per process; record it so the test can take it off again
+    listeners = []
+    listen = event.listen
+
+    def recording_listen(target, identifier, fn, *args, **kwargs):
+        listeners.append((target, identifier, fn))
+        listen(target, identifier, fn, *args, **kwargs)
+
+    monkeypatch.setattr(change_capture, '_enabled_mode', None)
+    with monkeypatch.context() as patched:
+        patched.setattr(change_capture.event, 'listen', recording_listen)
+        change_capture.init_change_capture('table')
+    yield
+    for listener in listeners:
+        event.remove(*listener)
+
+@pytest.fixture
+def statements(app):
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement.split()[0].upper())
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+def _audit(action):
+    return [json.loads(row.changes) if row.changes else None for row in AuditLog.query.filter_by(entity='Bill', action=action)]
+
+def test_update_records_only_changed_columns_without_extra_selects(capture, user, statements):
+    bill = Bill(user_id=user.id, name='Rent', amount=100.0, due_date=datetime(2026, 10, 20), category='Housing', frequency='monthly')
+    db.session.add(bill)
+    db.session.commit()
+    assert _audit('insert') == [None]
+
+    bill = db.session.get(Bill, bill.id)
+    bill.amount = 120.0
+    statements.clear()
+    db.session.commit()
+
+    assert 'SELECT' not in statements
+    assert _audit('update') == [{'amount': {'new': 120.0, 'old': 100.0}}]
+
+def test_update_of_an_expired_bill_records_the_new_value(capture, user):
+    bill = Bill(user_id=user.id, name='Rent', amount=100.0, due_date=datetime(2026, 10, 20), category='Housing', frequency='monthly')
+    db.session.add(bill)
+    db.session.commit()
+
+    # After the commit every attribute is expired, so the old amount is not known
+    bill.amount = 80.0
+    db.session.commit()
+    assert _audit('update') == [{'amount': {'new': 80.0}}]
+
+def test_capture_off_registers_nothing(app, monkeypatch):
+    monkeypatch.setattr(change_capture, '_enabled_mode', None)
+    change_capture.init_change_capture('off')
+    assert change_capture.change_capture_stats()['mode'] == 'off'
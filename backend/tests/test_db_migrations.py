@@ -0,0 +1,47 @@
+# test_db_migrations.py
+
+from sqlalchemy import inspect, text
+from models import db, Bill, Receipt
+from db_migrations import create_missing_indexes, migrate_receipt_notes
+from datetime import datetime
+import json
+
+def _index_names(table):
+    return {index['name'] for index in inspect(db.engine).get_indexes(table)}
+
+def test_dropped_indexes_are_recreated_once(app):
+    with db.engine.begin() as connection:
+        connection.execute(text('DROP INDEX ix_bill_user_paid_due'))
+        connection.execute(text('DROP INDEX ix_bill_paid_due'))
+    assert 'ix_bill_user_paid_due' not in _index_names('bill')
+
+    assert sorted(create_missing_indexes()) == ['ix_bill_paid_due', 'ix_bill_user_paid_due']
+    assert {'ix_bill_user_paid_due', 'ix_bill_paid_due'} <= _index_names('bill')
+    assert create_missing_indexes() == []
+
+def test_unpaid_lookup_uses_the_composite_index(app):
+    plan = db.session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM bill WHERE user_id = 'u' AND is_paid = 0 AND due_date >= '2026-10-17'"
+    )).all()
+    assert any('ix_bill_user_paid_due' in row[-1] for row in plan)
+
+def _bill_with_notes(user, notes):
+    bill = Bill(user_id=user.id, name='Power', amount=40.0, due_date=datetime(2026, 11, 1), category='Utilities', frequency='once', notes=notes)
+    db.session.add(bill)
+    return bill
+
+def test_receipt_filenames_move_out_of_bill_notes(app, user):
+    legacy = _bill_with_notes(user, json.dumps({'receipt_filename': f'{user.id}/old.pdf', 'original_notes': 'paid by card'}))
+    bare = _bill_with_notes(user, json.dumps({'receipt_filename': f'{user.id}/bare.png'}))
+    plain = _bill_with_notes(user, 'receipt_filename is mentioned in free text')
+    db.session.commit()
+
+    assert migrate_receipt_notes() == 2
+    assert migrate_receipt_notes() == 0
+
+    receipts = {receipt.bill_id: receipt for receipt in Receipt.query}
+    assert set(receipts) == {legacy.id, bare.id}
+    assert receipts[legacy.id].storage_key == f'{user.id}/old.pdf'
+    assert receipts[legacy.id].mime_type == 'application/pdf'
+    assert (legacy.notes, bare.notes) == ('paid by card', None)
+    assert plain.notes == 'receipt_filename is mentioned in free text'
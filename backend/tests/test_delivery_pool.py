@@ -0,0 +1,86 @@
+# test_delivery_pool.py
+
+from delivery_service import DeliveryPool
+import threading
+import time
+import pytest
+
+@pytest.fixture
+def pool():
+    pool = DeliveryPool({'compose': 1, 'whatsapp': 2, 'voice': 1})
+    yield pool
+    for executor in pool._executors.values():
+        executor.shutdown(wait=True)
+
+def _wait_for_report(pool, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not pool.recent_runs:
+        assert time.monotonic() < deadline, 'delivery run never reported'
+        time.sleep(0.01)
+    return pool.recent_runs[-1]
+
+def test_channel_concurrency_never_exceeds_its_limit(pool):
+    active = {'whatsapp': 0, 'voice': 0}
+    peak = {'whatsapp': 0, 'voice': 0}
+    lock = threading.Lock()
+
+    def sender(channel):
+        with lock:
+            active[channel] += 1
+            peak[channel] = max(peak[channel], active[channel])
+        time.sleep(0.02)
+        with lock:
+            active[channel] -= 1
+        return {'success': True}
+
+    run = pool.start_run('reminders')
+    for _ in range(6):
+        pool.deliver(run, 'whatsapp', sender, 'whatsapp')
+        pool.deliver(run, 'voice', sender, 'voice')
+    run.close()
+
+    report = _wait_for_report(pool)
+    assert report['deliveries'] == 12 and report['succeeded'] == 12
+    assert peak == {'whatsapp': 2, 'voice': 1}
+    assert pool.stats()['channels']['whatsapp']['workers'] == 2
+
+def test_failed_and_raising_senders_count_as_failures(pool):
+    def raising(recipient):
+        raise RuntimeError('provider down')
+
+    run = pool.start_run('reminders')
+    pool.deliver(run, 'whatsapp', lambda recipient: {'success': True}, '+1')
+    pool.deliver(run, 'whatsapp', lambda recipient: {'success': False}, '+2')
+    pool.deliver(run, 'voice', raising, '+3')
+    run.close()
+
+    report = _wait_for_report(pool)
+    assert (report['succeeded'], report['failed']) == (1, 2)
+
+def test_composed_batch_fans_out_each_message(pool):
+    sent = []
+
+    def sender(recipient, message):
+        sent.append((recipient, message))
+        return {'success': True}
+
+    run = pool.start_run('digest')
+    pool.deliver_composed(run, lambda payloads: [f'hello {p}' for p in payloads], [
+        ('a', [('whatsapp', sender, '+1'), ('voice', sender, '+1')]),
+        ('b', [('whatsapp', sender, '+2')])
+    ])
+    run.close()
+
+    assert _wait_for_report(pool)['succeeded'] == 3
+    assert sorted(sent) == [('+1', 'hello a'), ('+1', 'hello a'), ('+2', 'hello b')]
+
+def test_failed_composition_fails_every_delivery(pool):
+    def compose_many(payloads):
+        raise ValueError('template missing')
+
+    run = pool.start_run('digest')
+    pool.deliver_composed(run, compose_many, [('a', [('whatsapp', None, '+1'), ('voice', None, '+1')])])
+    run.close()
+
+    report = _wait_for_report(pool)
+    assert (report['succeeded'], report['failed']) == (0, 2)
@@ -0,0 +1,17 @@
+# test_http_transport.py
+
+from http_transport import _build_retry
+
+def test_post_is_retried_only_when_throttled():
+    retry = _build_retry()
+    assert retry.is_retry('POST', 429)
+    assert not retry.is_retry('POST', 503)
+    assert not retry.is_retry('POST', 500)
+
+def test_idempotent_requests_are_retried_on_503():
+    retry = _build_retry()
+    assert retry.is_retry('GET', 503)
+    assert retry.is_retry('GET', 429)
+    assert retry.is_retry('DELETE', 503)
+    # Copies made while retrying keep the POST rule
+    assert not retry.increment('GET', '/').is_retry('POST', 503)
@@ -0,0 +1,64 @@
+# test_logging_setup.py
+
+from logging_setup import JsonFormatter, configure_logging
+import logging_setup
+import atexit
+import json
+import logging
+import logging.handlers
+import sys
+import pytest
+
+@pytest.fixture
+def root_logger(monkeypatch):
+    # configure_logging owns the root logger for the process; put it back afterwards
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    monkeypatch.setattr(logging_setup, '_configured', False)
+    monkeypatch.setattr(logging_setup, '_listener', None)
+    yield root
+    if logging_setup._listener is not None:
+        logging_setup._listener.stop()
+        atexit.unregister(logging_setup._listener.stop)
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+class Unformattable:
+    formatted = 0
+
+    def __str__(self):
+        Unformattable.formatted += 1
+        return 'formatted'
+
+def test_queued_json_records_below_the_level_are_never_formatted(root_logger, capsys):
+    configure_logging(level='warning', log_format='json', use_queue=True)
+    assert any(isinstance(handler, logging.handlers.QueueHandler) for handler in root_logger.handlers)
+
+    logger = logging.getLogger('bills')
+    logger.debug("[GET BILLS] %s", Unformattable())
+    logger.warning("[GET BILLS] Invalid query parameters from user %s", 'u1')
+    # Drains the queue; the fixture would otherwise stop the listener after the output is read
+    logging_setup._listener.stop()
+    atexit.unregister(logging_setup._listener.stop)
+    logging_setup._listener = None
+
+    assert Unformattable.formatted == 0
+    [line] = capsys.readouterr().err.splitlines()
+    entry = json.loads(line)
+    assert (entry['level'], entry['logger'], entry['message']) == ('WARNING', 'bills', '[GET BILLS] Invalid query parameters from user u1')
+
+def test_later_calls_keep_the_first_configuration(root_logger):
+    configure_logging(level='info', log_format='text', use_queue=False)
+    handlers = list(root_logger.handlers)
+    configure_logging(level='debug', log_format='json', use_queue=True)
+    assert root_logger.handlers == handlers
+    assert root_logger.level == logging.INFO
+
+def test_json_formatter_includes_the_traceback():
+    try:
+        raise ValueError('bad amount')
+    except ValueError:
+        record = logging.getLogger('bill_import').makeRecord('bill_import', logging.ERROR, __file__, 1, 'Row %s failed', (3,), exc_info=sys.exc_info())
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['message'] == 'Row 3 failed'
+    assert 'ValueError: bad amount' in entry['exc_info']
@@ -0,0 +1,25 @@
+# test_message_templates.py
+
+from message_templates import greeting_bucket, get_greeting, render_reminder
+import pytest
+
+BILL = {'name': 'Electricity', 'amount': 1200.5, 'due_date': '2026-10-20'}
+
+@pytest.mark.parametrize('hour, bucket', [(0, 'evening'), (5, 'morning'), (11, 'morning'), (12, 'afternoon'), (16, 'afternoon'), (17, 'evening'), (23, 'evening')])
+def test_greeting_buckets(hour, bucket):
+    assert greeting_bucket(hour) == bucket
+
+def test_reminder_is_rendered_locally():
+    assert render_reminder('Asha', BILL, 9, 'en') == (
+        "Hey Asha, Good morning. Just a reminder that your Electricity payment of "
+        "₹1200.5 is due on 2026-10-20. Hope you have a nice day."
+    )
+
+def test_hindi_template_and_unknown_locale_fallback():
+    assert get_greeting(19, 'hi') == 'शुभ संध्या'
+    assert 'Electricity' in render_reminder('Asha', BILL, 19, 'hi')
+    assert render_reminder('Asha', BILL, 14, 'xx') == render_reminder('Asha', BILL, 14, 'en')
+
+def test_braces_in_values_are_not_reinterpreted():
+    message = render_reminder('{name}', dict(BILL, name='{0}'), 9, 'en')
+    assert message.startswith('Hey {name}, Good morning.') and 'your {0} payment' in message
@@ -0,0 +1,74 @@
+# test_overdue_digest.py
+#
+# scheduler imports the provider clients through reminder_service, so these
+# tests only run where the full requirements are installed.
+
+import pytest
+
+pytest.importorskip('apscheduler')
+pytest.importorskip('twilio')
+pytest.importorskip('google.generativeai')
+
+from models import db, Bill
+from conftest import make_user
+from datetime import datetime, timedelta
+import scheduler
+
+class FakeScheduler:
+    running = True
+
+    def __init__(self):
+        self.jobs = {}
+
+    def add_job(self, func, id, **kwargs):
+        self.jobs[id] = func
+
+class FakePool:
+    def __init__(self):
+        self.sent = []
+
+    def start_run(self, name):
+        return FakeRun()
+
+    def deliver(self, run, channel, sender, recipient, message):
+        self.sent.append((channel, recipient, message))
+
+class FakeRun:
+    def close(self):
+        pass
+
+def _add_bill(user, name, amount, days_overdue, **kwargs):
+    db.session.add(Bill(
+        user_id=user.id, name=name, amount=amount, category='Utilities', frequency='monthly',
+        due_date=datetime.now() - timedelta(days=days_overdue, hours=1), **kwargs
+    ))
+
+def test_one_digest_per_user_for_alertable_bills(app, monkeypatch):
+    jobs, pool = FakeScheduler(), FakePool()
+    monkeypatch.setattr(scheduler, 'scheduler', jobs)
+    monkeypatch.setattr(scheduler, 'get_delivery_pool', lambda: pool)
+
+    first = make_user('a@example.com')
+    second = make_user('b@example.com')
+    second.phone_number = '+919999999999'
+    _add_bill(first, 'Power', 40.0, 2)
+    _add_bill(first, 'Water', 10.0, 3)
+    _add_bill(first, 'Old', 99, scheduler.OVERDUE_ALERT_DAYS + 3)
+    _add_bill(first, 'Paid', 99, 1, is_paid=True)
+    _add_bill(first, 'Muted', 99, 1, enable_whatsapp=False)
+    _add_bill(second, 'Gas', 25.0, 1)
+    db.session.commit()
+
+    scheduler.start_scheduler(app)
+    jobs.jobs['overdue_checker']()
+
+    digests = {recipient: message for _, recipient, message in pool.sent}
+    assert len(pool.sent) == 2 and {channel for channel, _, _ in pool.sent} == {'whatsapp'}
+    assert digests[first.phone_number] == scheduler.build_overdue_digest([('Water', 10.0, 3), ('Power', 40.0, 2)])
+    assert digests['+919999999999'] == scheduler.build_overdue_digest([('Gas', 25.0, 1)])
+
+def test_digest_wording():
+    assert scheduler.build_overdue_digest([('Rent', 100, 2)]).startswith('URGENT: Your Rent payment of ₹100 is 2 days overdue.')
+    digest = scheduler.build_overdue_digest([('Rent', 100, 2), ('Gym', 20, 1)])
+    assert 'You have 2 overdue bills totalling ₹120' in digest
+    assert '- Gym: ₹20 (1 days overdue)' in digest
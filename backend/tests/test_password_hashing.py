@@ -0,0 +1,39 @@
+# test_password_hashing.py
+
+from password_hashing import PasswordHasher, HasherBusy, hash_cost
+from config import Config
+import bcrypt
+import pytest
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    yield hasher
+    hasher._executor.shutdown()
+
+def test_pool_is_replaced_after_a_worker_dies(hasher):
+    password_hash = hasher.hash_password('secret')
+    for process in list(hasher._executor._processes.values()):
+        process.kill()
+        process.join()
+
+    assert hasher.verify_password('secret', password_hash) == (True, None)
+    assert hasher.stats()['restarts'] == 1
+    assert hasher.verify_password('wrong', password_hash) == (False, None)
+    assert hasher.stats()['restarts'] == 1
+
+def test_full_queue_rejects_instead_of_waiting(hasher):
+    hasher._slots.acquire()
+    try:
+        with pytest.raises(HasherBusy):
+            hasher.hash_password('secret')
+    finally:
+        hasher._slots.release()
+    assert hasher.stats()['rejected'] == 1
+    assert hash_cost(hasher.hash_password('secret')) == Config.BCRYPT_ROUNDS
+
+def test_check_rehashes_at_the_configured_cost(hasher):
+    old_hash = bcrypt.hashpw(b'secret', bcrypt.gensalt(rounds=Config.BCRYPT_ROUNDS + 1)).decode()
+    valid, new_hash = hasher.verify_password('secret', old_hash)
+    assert valid
+    assert hash_cost(new_hash) == Config.BCRYPT_ROUNDS
@@ -0,0 +1,24 @@
+# test_payments.py
+
+from models import db, Bill, Payment
+from conftest import auth_headers
+from datetime import datetime
+
+def _pay(user, paid_at):
+    bill = Bill(user_id=user.id, name='Internet', amount=25.0, due_date=paid_at, category='Utilities', frequency='once', is_paid=True)
+    db.session.add(bill)
+    db.session.flush()
+    db.session.add(Payment(bill_id=bill.id, amount=25.0, payment_method='manual', payment_date=paid_at))
+    db.session.commit()
+
+def _payment_dates(app, user, **params):
+    response = app.test_client().get('/api/payments', headers=auth_headers(user), query_string=params)
+    assert response.status_code == 200
+    return [payment['payment_date'] for payment in response.get_json()]
+
+def test_offset_filters_are_compared_in_utc(app, user):
+    _pay(user, datetime(2026, 10, 10, 4, 0))
+    assert _payment_dates(app, user, **{'from': '2026-10-10T09:00:00+05:30'}) == ['2026-10-10T04:00:00']
+    assert _payment_dates(app, user, **{'from': '2026-10-10T10:00:00+05:30'}) == []
+    assert _payment_dates(app, user, to='2026-10-10T04:30:00Z') == ['2026-10-10T04:00:00']
+    assert _payment_dates(app, user, to='2026-10-10T03:30:00Z') == []
@@ -0,0 +1,48 @@
+# test_rate_limit.py
+
+from rate_limit import MemoryTokenBucketStore, rate_limit_stats
+import rate_limit
+import pytest
+
+IP = ('login:ip:1.2.3.4', 3, 1 / 60)
+EMAIL = ('login:email:a@example.com', 1, 1 / 60)
+
+@pytest.fixture(autouse=True)
+def fresh_store(monkeypatch):
+    # Buckets are process-wide; each test starts from full ones and puts the old store back
+    store = MemoryTokenBucketStore(100)
+    monkeypatch.setattr(rate_limit, '_store', store)
+    monkeypatch.setattr(rate_limit, '_fallback_store', None)
+    monkeypatch.setattr(rate_limit, '_store_errors', 0)
+    return store
+
+def test_rejected_take_spends_no_token_from_any_bucket(fresh_store):
+    assert fresh_store.take([IP, EMAIL]) == (True, 0)
+    allowed, retry_after = fresh_store.take([IP, EMAIL])
+    assert not allowed and retry_after > 0
+    # The email bucket refused, so the IP bucket still has its two remaining tokens
+    assert fresh_store.take([IP]) == (True, 0)
+    assert fresh_store.take([IP]) == (True, 0)
+    assert not fresh_store.take([IP])[0]
+
+def test_failing_store_falls_back_to_memory(monkeypatch):
+    class Down:
+        def take(self, buckets):
+            raise ConnectionError('redis unavailable')
+
+    rate_limit.set_rate_limit_store(Down())
+    assert rate_limit._take([EMAIL])[0]
+    assert not rate_limit._take([EMAIL])[0]
+    assert rate_limit_stats()['store_errors'] == 2
+
+def test_login_is_throttled_per_email(app, user):
+    client = app.test_client()
+    credentials = {'email': 'a@example.com', 'password': 'wrong'}
+    statuses = [client.post('/api/auth/login', json=credentials).status_code for _ in range(6)]
+    assert 429 not in statuses[:5]
+    assert statuses[5] == 429
+
+    response = client.post('/api/auth/login', json=credentials)
+    assert int(response.headers['Retry-After']) >= 1
+    # Another account from the same address still gets through
+    assert client.post('/api/auth/login', json={'email': 'b@example.com', 'password': 'x'}).status_code != 429
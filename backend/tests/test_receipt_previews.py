@@ -0,0 +1,54 @@
+# test_receipt_previews.py
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+from models import db, Bill
+from local_storage_service import init_storage
+from receipt_previews import PREVIEW_SIZES, preview_path, render_previews
+from conftest import auth_headers
+from datetime import datetime
+import io
+import os
+
+@pytest.fixture(autouse=True)
+def storage(app):
+    init_storage()
+
+def _png(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'white').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+def _upload_image(app, user, content):
+    bill = Bill(user_id=user.id, name='Power', amount=40.0, due_date=datetime(2026, 11, 1), category='Utilities', frequency='once')
+    db.session.add(bill)
+    db.session.commit()
+    return app.test_client().post(
+        f'/api/receipts/{bill.id}/receipt',
+        headers=auth_headers(user),
+        data={'receipt': (io.BytesIO(content), 'receipt.png')},
+        content_type='multipart/form-data'
+    ).get_json()
+
+def test_previews_are_scaled_to_their_longest_edge(app, user):
+    receipt = _upload_image(app, user, _png(2000, 1000))
+    client = app.test_client()
+    for size, edge in PREVIEW_SIZES.items():
+        response = client.get(f"{receipt['receipt_url']}?size={size}", headers=auth_headers(user))
+        assert response.status_code == 200
+        assert 'immutable' in response.headers['Cache-Control']
+        with Image.open(io.BytesIO(response.data)) as preview:
+            assert preview.size == (edge, edge // 2)
+
+    original = client.get(receipt['receipt_url'], headers=auth_headers(user))
+    with Image.open(io.BytesIO(original.data)) as image:
+        assert image.size == (2000, 1000)
+    assert client.get(f"{receipt['receipt_url']}?size=huge", headers=auth_headers(user)).status_code == 400
+
+def test_previews_are_rendered_once_per_blob(app, user):
+    receipt = _upload_image(app, user, _png(600, 300))
+    render_previews(receipt['sha256'], 'png')
+    assert all(os.path.exists(preview_path(receipt['sha256'], size)) for size in PREVIEW_SIZES)
+    assert render_previews(receipt['sha256'], 'png') == []
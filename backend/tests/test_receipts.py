@@ -0,0 +1,191 @@
+# test_receipts.py
+
+from models import db, Bill, ReceiptBlob
+from local_storage_service import init_storage, blob_path, purge_unreferenced_blobs
+from conftest import make_user, auth_headers
+from config import Config
+from datetime import datetime
+import local_storage_service
+import io
+import os
+import time
+import pytest
+
+CONTENT = b'%PDF-1.4 receipt'
+
+@pytest.fixture(autouse=True)
+def storage(app):
+    init_storage()
+
+def _add_bill(user):
+    bill = Bill(user_id=user.id, name='Power', amount=40.0, due_date=datetime(2026, 11, 1), category='Utilities', frequency='once')
+    db.session.add(bill)
+    db.session.commit()
+    return bill
+
+def _upload(client, user, bill, content=CONTENT):
+    return client.post(
+        f'/api/receipts/{bill.id}/receipt',
+        headers=auth_headers(user),
+        data={'receipt': (io.BytesIO(content), 'receipt.pdf')},
+        content_type='multipart/form-data'
+    )
+
+def test_blob_is_only_served_to_users_holding_it(app, user):
+    client = app.test_client()
+    receipt = _upload(client, user, _add_bill(user)).get_json()
+    assert client.get(receipt['receipt_url'], headers=auth_headers(user)).status_code == 200
+
+    other = make_user('b@example.com')
+    sha_name = receipt['receipt_url'].rsplit('/', 1)[-1]
+    assert client.get(f'/api/receipts/view/{other.id}/{sha_name}', headers=auth_headers(other)).status_code == 404
+
+    # Uploading the same content gives the other user their own reference to it
+    _upload(client, other, _add_bill(other))
+    assert client.get(f'/api/receipts/view/{other.id}/{sha_name}', headers=auth_headers(other)).status_code == 200
+
+def test_scan_can_be_viewed_by_its_uploader_only(app, user):
+    client = app.test_client()
+    scan = client.post(
+        '/api/receipts/scan-receipt',
+        headers=auth_headers(user),
+        data={'receipt': (io.BytesIO(CONTENT), 'scan.pdf')},
+        content_type='multipart/form-data'
+    ).get_json()
+    assert 'deduplicated' not in scan
+    assert client.get(scan['receipt_url'], headers=auth_headers(user)).status_code == 200
+
+    other = make_user('b@example.com')
+    sha_name = scan['receipt_url'].rsplit('/', 1)[-1]
+    assert client.get(f'/api/receipts/view/{other.id}/{sha_name}', headers=auth_headers(other)).status_code == 404
+
+def _blob():
+    return ReceiptBlob.query.one()
+
+def test_refcount_follows_receipts_and_gc_waits_for_zero(app, user, monkeypatch):
+    client = app.test_client()
+    first, second = _add_bill(user), _add_bill(user)
+    _upload(client, user, first)
+    _upload(client, user, second)
+    assert _blob().refcount == 2
+    path = blob_path(_blob().sha256, 'pdf')
+
+    monkeypatch.setattr(Config, 'RECEIPT_BLOB_GRACE_SECONDS', 0)
+    assert client.delete(f'/api/receipts/{first.id}/receipt', headers=auth_headers(user)).status_code == 200
+    assert _blob().refcount == 1
+    assert purge_unreferenced_blobs() == 0 and os.path.exists(path)
+
+    assert client.delete(f'/api/receipts/{second.id}/receipt', headers=auth_headers(user)).status_code == 200
+    assert purge_unreferenced_blobs() == 1
+    assert ReceiptBlob.query.count() == 0 and not os.path.exists(path)
+
+def test_unreferenced_blob_is_kept_for_the_grace_period(app, user):
+    client = app.test_client()
+    bill = _add_bill(user)
+    _upload(client, user, bill)
+    client.delete(f'/api/receipts/{bill.id}/receipt', headers=auth_headers(user))
+    assert purge_unreferenced_blobs() == 0
+    assert ReceiptBlob.query.count() == 1
+
+def test_concurrent_first_upload_references_the_winning_row(app, user, monkeypatch):
+    reference_blob = local_storage_service._reference_blob
+    calls = []
+
+    def racing_reference(sha256, delta):
+        found = reference_blob(sha256, delta)
+        if not calls:
+            # Another request inserts the row between this upload's lookup and its insert
+            calls.append(sha256)
+            db.session.execute(ReceiptBlob.__table__.insert(), {'sha256': sha256, 'extension': 'pdf', 'size': len(CONTENT), 'refcount': 1})
+        return found
+
+    monkeypatch.setattr(local_storage_service, '_reference_blob', racing_reference)
+    assert _upload(app.test_client(), user, _add_bill(user)).status_code == 200
+    assert _blob().refcount == 2
+
+def test_gc_does_not_delete_a_blob_referenced_after_its_select(app, user, monkeypatch):
+    client = app.test_client()
+    bill = _add_bill(user)
+    _upload(client, user, bill)
+    client.delete(f'/api/receipts/{bill.id}/receipt', headers=auth_headers(user))
+    sha256 = _blob().sha256
+    monkeypatch.setattr(Config, 'RECEIPT_BLOB_GRACE_SECONDS', 0)
+
+    real_delete = local_storage_service.delete
+    def delete_after_upload(table):
+        # An upload of the same content lands between the GC's select and its DELETE
+        local_storage_service._reference_blob(sha256, 1)
+        return real_delete(table)
+
+    monkeypatch.setattr(local_storage_service, 'delete', delete_after_upload)
+    assert purge_unreferenced_blobs() == 0
+    assert _blob().refcount == 1
+    assert os.path.exists(blob_path(sha256, 'pdf'))
+
+def test_gc_removes_orphaned_blob_files_and_stale_temp_files(app, monkeypatch):
+    monkeypatch.setattr(Config, 'RECEIPT_BLOB_GRACE_SECONDS', 3600)
+    orphan = blob_path('ab' + '0' * 62, 'pdf')
+    stale_part = os.path.join(local_storage_service.TMP_FOLDER, 'stale.part')
+    fresh_part = os.path.join(local_storage_service.TMP_FOLDER, 'fresh.part')
+    for path in (orphan, stale_part, fresh_part):
+        with open(path, 'wb') as out:
+            out.write(b'x')
+    two_hours_ago = time.time() - 7200
+    os.utime(orphan, (two_hours_ago, two_hours_ago))
+    os.utime(stale_part, (two_hours_ago, two_hours_ago))
+
+    assert purge_unreferenced_blobs() == 2
+    assert not os.path.exists(orphan) and not os.path.exists(stale_part)
+    assert os.path.exists(fresh_part)
+
+def test_storage_lives_under_the_configured_upload_folder():
+    assert local_storage_service.UPLOAD_FOLDER == Config.UPLOAD_FOLDER
+    assert local_storage_service.BLOB_FOLDER.startswith(Config.UPLOAD_FOLDER)
+
+def test_blob_serving_honours_range_and_validators(app, user):
+    client = app.test_client()
+    url = _upload(client, user, _add_bill(user)).get_json()['receipt_url']
+
+    full = client.get(url, headers=auth_headers(user))
+    assert full.data == CONTENT
+    assert 'immutable' in full.headers['Cache-Control']
+
+    partial = client.get(url, headers={**auth_headers(user), 'Range': 'bytes=0-3'})
+    assert partial.status_code == 206
+    assert partial.data == CONTENT[:4]
+    assert partial.headers['Content-Range'] == f'bytes 0-3/{len(CONTENT)}'
+
+    cached = client.get(url, headers={**auth_headers(user), 'If-None-Match': full.headers['ETag']})
+    assert cached.status_code == 304 and cached.data == b''
+
+def test_accel_mode_hands_the_body_to_the_proxy(app, user, monkeypatch):
+    monkeypatch.setattr(Config, 'RECEIPT_SENDFILE_MODE', 'x-accel')
+    client = app.test_client()
+    url = _upload(client, user, _add_bill(user)).get_json()['receipt_url']
+
+    response = client.get(url, headers=auth_headers(user))
+    name = url.rsplit('/', 1)[-1]
+    # The proxy is pointed at the shared blob on disk, not at the per-user URL
+    assert response.headers['X-Accel-Redirect'] == f"{Config.RECEIPT_ACCEL_PREFIX.rstrip('/')}/blobs/{name[:2]}/{name}"
+    assert response.data == b''
+
+    cached = client.get(url, headers={**auth_headers(user), 'If-None-Match': response.headers['ETag']})
+    assert cached.status_code == 304
+    assert 'X-Accel-Redirect' not in cached.headers
+
+def test_receipt_metadata_lives_in_its_own_row(app, user):
+    client = app.test_client()
+    bill = _add_bill(user)
+    other_bill = _add_bill(user)
+    _upload(client, user, bill)
+
+    response = client.get(f'/api/receipts?bill_ids={bill.id},{other_bill.id}', headers=auth_headers(user))
+    receipts = response.get_json()
+    assert list(receipts) == [bill.id]
+    assert receipts[bill.id]['size'] == len(CONTENT)
+    assert receipts[bill.id]['mime_type'] == 'application/pdf'
+    assert db.session.get(Bill, bill.id).notes is None
+
+    assert client.get('/api/receipts', headers=auth_headers(user)).status_code == 400
+    other = make_user('b@example.com')
+    assert client.get(f'/api/receipts?bill_ids={bill.id}', headers=auth_headers(other)).get_json() == {}
@@ -0,0 +1,63 @@
+# test_recurrence.py
+
+from models import db, Bill, Payment
+from recurrence import materialize_upcoming
+import bills
+from conftest import auth_headers
+from datetime import datetime
+
+NOW = datetime(2026, 10, 17, 9)
+
+def _add_bill(user, due_date, frequency='monthly'):
+    bill = Bill(user_id=user.id, name='Rent', amount=100.0, due_date=due_date, category='Housing', frequency=frequency)
+    db.session.add(bill)
+    db.session.commit()
+    return bill
+
+def _delete(app, user, bill_id):
+    return app.test_client().delete(f'/api/bills/{bill_id}', headers=auth_headers(user))
+
+def _due_dates(user):
+    return sorted(bill.due_date.date().isoformat() for bill in Bill.query.filter_by(user_id=user.id))
+
+def test_deleted_latest_occurrence_is_skipped(app, user):
+    _add_bill(user, datetime(2026, 10, 20))
+    assert materialize_upcoming(now=NOW, horizon_days=35) == 1
+    upcoming = Bill.query.filter_by(due_date=datetime(2026, 11, 20)).one()
+
+    assert _delete(app, user, upcoming.id).status_code == 204
+    assert materialize_upcoming(now=NOW, horizon_days=35) == 0
+    assert materialize_upcoming(now=NOW, horizon_days=70) == 1
+    assert _due_dates(user) == ['2026-10-20', '2026-12-20']
+    assert {bill.frequency for bill in Bill.query} == {'monthly'}
+
+def test_rollover_skips_a_deleted_next_occurrence(app, user):
+    bill = _add_bill(user, datetime(2026, 10, 20))
+    materialize_upcoming(now=NOW, horizon_days=35)
+    _delete(app, user, Bill.query.filter_by(due_date=datetime(2026, 11, 20)).one().id)
+
+    response = app.test_client().post(f'/api/bills/{bill.id}/pay', headers=auth_headers(user))
+    assert response.get_json()['next_bill_id'] is None
+    assert _due_dates(user) == ['2026-10-20']
+
+def test_deleted_middle_occurrence_is_skipped(app, user):
+    _add_bill(user, datetime(2026, 10, 20))
+    assert materialize_upcoming(now=NOW, horizon_days=70) == 2
+    middle = Bill.query.filter_by(due_date=datetime(2026, 11, 20)).one()
+
+    assert _delete(app, user, middle.id).status_code == 204
+    assert materialize_upcoming(now=NOW, horizon_days=70) == 0
+    assert materialize_upcoming(now=NOW, horizon_days=100) == 1
+    assert _due_dates(user) == ['2026-10-20', '2026-12-20', '2027-01-20']
+
+def test_failed_rollover_rolls_back_the_payment(app, user, monkeypatch):
+    bill = _add_bill(user, datetime(2026, 10, 20))
+
+    def failing_rollover(bill):
+        raise RuntimeError('database unavailable')
+
+    monkeypatch.setattr(bills, 'rollover_bill', failing_rollover)
+    response = app.test_client().post(f'/api/bills/{bill.id}/pay', headers=auth_headers(user))
+    assert response.status_code == 500
+    assert Payment.query.count() == 0
+    assert Bill.query.one().is_paid is False
@@ -0,0 +1,63 @@
+# test_reminder_jobs.py
+
+from models import db, Bill, ReminderSettings, ReminderJob
+from reminder_jobs import compute_fire_times, compute_next_fire_at, fetch_due_jobs, advance_jobs, backfill_reminder_jobs, sync_user_jobs
+from datetime import datetime
+
+DUE = datetime(2026, 10, 20)
+NINE = 9 * 60
+
+def test_first_slot_opens_days_before_the_due_date():
+    assert compute_fire_times([DUE], [3], [NINE], datetime(2026, 10, 10, 8)) == [datetime(2026, 10, 17, 9)]
+
+def test_slot_moves_to_the_next_day_once_fired():
+    assert compute_fire_times([DUE], [3], [NINE], datetime(2026, 10, 17, 9)) == [datetime(2026, 10, 18, 9)]
+    assert compute_fire_times([DUE], [3], [NINE], datetime(2026, 10, 18, 8)) == [datetime(2026, 10, 18, 9)]
+
+def test_no_slot_after_the_due_day():
+    assert compute_fire_times([DUE], [3], [NINE], datetime(2026, 10, 20, 9)) == [None]
+    assert compute_fire_times([DUE], [0], [NINE], datetime(2026, 10, 19, 8)) == [datetime(2026, 10, 20, 9)]
+
+def test_batch_matches_the_scalar_computation():
+    after = datetime(2026, 10, 16, 12)
+    due_dates = [DUE, datetime(2026, 10, 16), datetime(2026, 11, 1), datetime(2026, 10, 17, 23)]
+    days_before = [3, 1, 7, 0]
+    minutes = [NINE, NINE, 18 * 60, 30]
+    batch = compute_fire_times(due_dates, days_before, minutes, after)
+    scalar = [
+        compute_next_fire_at(due, ReminderSettings(days_before=days, preferred_time=f'{m // 60:02d}:{m % 60:02d}'), after)
+        for due, days, m in zip(due_dates, days_before, minutes)
+    ]
+    assert batch == scalar == [datetime(2026, 10, 17, 9), None, datetime(2026, 10, 25, 18), datetime(2026, 10, 17, 0, 30)]
+
+def test_queue_fires_daily_until_the_due_date(app, user):
+    db.session.add(ReminderSettings(user_id=user.id, days_before=1, preferred_time='08:30'))
+    db.session.add(Bill(user_id=user.id, name='Rent', amount=100.0, due_date=DUE, category='Housing', frequency='monthly'))
+    db.session.commit()
+    assert backfill_reminder_jobs(now=datetime(2026, 10, 10)) == 1
+    assert backfill_reminder_jobs(now=datetime(2026, 10, 10)) == 0
+
+    assert fetch_due_jobs(datetime(2026, 10, 19, 8), 10) == []
+    fired = []
+    for now in (datetime(2026, 10, 19, 8, 30), datetime(2026, 10, 20, 8, 30)):
+        rows = fetch_due_jobs(now, 10)
+        fired.append(rows[0][0].next_fire_at)
+        advance_jobs([(job, bill, settings) for job, bill, _, settings in rows], now)
+        db.session.commit()
+
+    assert fired == [datetime(2026, 10, 19, 8, 30), datetime(2026, 10, 20, 8, 30)]
+    assert ReminderJob.query.count() == 0
+
+def test_settings_change_reschedules_the_users_jobs(app, user):
+    settings = ReminderSettings(user_id=user.id, days_before=3, preferred_time='09:00')
+    db.session.add(settings)
+    db.session.add(Bill(user_id=user.id, name='Rent', amount=100.0, due_date=DUE, category='Housing', frequency='monthly'))
+    db.session.commit()
+    backfill_reminder_jobs(now=datetime(2026, 10, 10))
+    assert ReminderJob.query.one().next_fire_at == datetime(2026, 10, 17, 9)
+
+    settings.days_before = 1
+    settings.preferred_time = '18:00'
+    sync_user_jobs(user.id, settings, now=datetime(2026, 10, 10))
+    db.session.commit()
+    assert ReminderJob.query.one().next_fire_at == datetime(2026, 10, 19, 18)
@@ -0,0 +1,66 @@
+# test_reminder_messages.py
+#
+# reminder_service imports the Twilio and Gemini clients at module level, so
+# these tests only run where the full requirements are installed.
+
+import pytest
+
+pytest.importorskip('twilio')
+pytest.importorskip('google.generativeai')
+
+from models import ReminderMessage
+from cache import TTLCache
+from config import Config
+import reminder_service
+
+ITEMS = [
+    ('Asha', {'name': 'Power', 'amount': 40.0, 'due_date': '2026-10-20'}),
+    ('Ravi', {'name': 'Water', 'amount': 10.0, 'due_date': '2026-10-21'}),
+    ('Asha', {'name': 'Power', 'amount': 40.0, 'due_date': '2026-10-20'})
+]
+
+@pytest.fixture
+def gemini(app, monkeypatch):
+    prompts = []
+
+    def generate_batch(items, greeting, locale):
+        prompts.append(items)
+        return [f'LLM {bill_data["name"]} for {name}' for name, bill_data in items]
+
+    monkeypatch.setattr(Config, 'LLM_ENRICHMENT_ENABLED', True)
+    monkeypatch.setattr(reminder_service, '_message_cache', TTLCache(100, 3600))
+    monkeypatch.setattr(reminder_service, '_generate_batch_with_gemini', generate_batch)
+    return prompts
+
+def _wait_for_enrichment():
+    # One enrichment worker, so a no-op queued behind the batch finishes after it
+    reminder_service._enrichment_executor.submit(lambda: None).result()
+
+def test_misses_are_sent_from_templates_and_enriched_once(app, gemini):
+    first = reminder_service.generate_reminder_messages(ITEMS)
+    assert all(message.startswith('Hey ') for message in first)
+    assert first[0] == first[2]
+
+    _wait_for_enrichment()
+    assert len(gemini) == 1 and len(gemini[0]) == 2
+
+    second = reminder_service.generate_reminder_messages(ITEMS)
+    assert second == ['LLM Power for Asha', 'LLM Water for Ravi', 'LLM Power for Asha']
+    _wait_for_enrichment()
+    assert len(gemini) == 1
+
+def test_persisted_variants_survive_a_cold_memory_cache(app, gemini, monkeypatch):
+    reminder_service.generate_reminder_messages(ITEMS)
+    _wait_for_enrichment()
+    assert ReminderMessage.query.count() == 2
+
+    monkeypatch.setattr(reminder_service, '_message_cache', TTLCache(100, 3600))
+    assert reminder_service.generate_reminder_messages(ITEMS[:1]) == ['LLM Power for Asha']
+    _wait_for_enrichment()
+    assert len(gemini) == 1
+
+def test_enrichment_disabled_never_calls_gemini(app, gemini, monkeypatch):
+    monkeypatch.setattr(Config, 'LLM_ENRICHMENT_ENABLED', False)
+    reminder_service.generate_reminder_messages(ITEMS)
+    _wait_for_enrichment()
+    assert gemini == []
@@ -0,0 +1,76 @@
+# test_reminder_sweep.py
+#
+# scheduler imports the provider clients through reminder_service, so these
+# tests only run where the full requirements are installed.
+
+import pytest
+
+pytest.importorskip('apscheduler')
+pytest.importorskip('twilio')
+pytest.importorskip('google.generativeai')
+
+from models import db, Bill, ReminderSettings, ReminderJob
+from conftest import make_user
+from config import Config
+from datetime import datetime, timedelta
+import scheduler
+
+class FakeScheduler:
+    running = True
+
+    def __init__(self):
+        self.jobs = {}
+
+    def add_job(self, func, id, **kwargs):
+        self.jobs[id] = func
+
+class FakePool:
+    def __init__(self):
+        self.batches = []
+
+    def start_run(self, name):
+        return FakeRun()
+
+    def deliver_composed(self, run, compose_many, items):
+        self.batches.append(items)
+
+class FakeRun:
+    def close(self):
+        pass
+
+def _add_bill(user, name, **kwargs):
+    bill = Bill(user_id=user.id, name=name, amount=10.0, category='Utilities', frequency='monthly',
+                due_date=datetime.now() + timedelta(days=2), **kwargs)
+    db.session.add(bill)
+    return bill
+
+def test_sweep_fires_due_jobs_in_batches_and_advances_them(app, monkeypatch):
+    jobs, pool = FakeScheduler(), FakePool()
+    monkeypatch.setattr(scheduler, 'scheduler', jobs)
+    monkeypatch.setattr(scheduler, 'get_delivery_pool', lambda: pool)
+    monkeypatch.setattr(Config, 'REMINDER_BATCH_SIZE', 1)
+
+    first = make_user('a@example.com')
+    second = make_user('b@example.com')
+    db.session.add(ReminderSettings(user_id=first.id, whatsapp_enabled=True, call_enabled=True, days_before=3))
+    db.session.add(ReminderSettings(user_id=second.id, whatsapp_enabled=True, days_before=3))
+    both = _add_bill(first, 'Power', enable_call=True)
+    quiet = _add_bill(first, 'Muted', enable_whatsapp=False)
+    whatsapp_only = _add_bill(second, 'Water', enable_call=True)
+    stale = _add_bill(second, 'Stale')
+    db.session.commit()
+
+    scheduler.start_scheduler(app)
+    midnight = datetime.combine(datetime.now().date(), datetime.min.time())
+    for bill in (both, quiet, whatsapp_only):
+        bill.reminder_job.next_fire_at = midnight
+    # Left over from a missed day: rescheduled, not sent late
+    stale.reminder_job.next_fire_at = midnight - timedelta(minutes=1)
+    db.session.commit()
+
+    jobs.jobs['reminder_checker']()
+
+    [pending] = pool.batches
+    channels = {payload[1]['name']: [channel for channel, _, _ in deliveries] for payload, deliveries in pending}
+    assert channels == {'Power': ['whatsapp', 'voice'], 'Water': ['whatsapp']}
+    assert all(job.next_fire_at > datetime.now() for job in ReminderJob.query)